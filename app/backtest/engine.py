@@ -0,0 +1,262 @@
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Optional
+
+import numpy as np
+
+from app.backtest.panel import MarketPanel
+from app.stock.datastore import StockDatastore
+from app.strategy._strategy import BaseStrategy
+
+logger = logging.getLogger(__name__)
+
+# 撮合必需的行情字段
+PRICE_FIELDS = ["open", "close"]
+
+# 涨跌停幅度：创业板、科创板20%，北交所30%，其余10%，主板ST股票5%
+_LIMIT_PREFIXES = {
+    ("300", "301", "688", "689"): 0.2,
+    ("4", "8", "92"): 0.3,
+}
+_DEFAULT_LIMIT = 0.1
+_ST_LIMIT = 0.05
+# 最小价格变动单位
+_TICK = 0.01
+
+
+@dataclass
+class BacktestConfig:
+    """回测交易成本"""
+
+    # 佣金费率，买卖双向收取
+    commission: float = 0.00025
+    # 印花税率，仅卖出收取
+    stamp_tax: float = 0.0005
+    # 每年的交易日数，用于年化
+    periods_per_year: int = 250
+
+
+@dataclass
+class BacktestResult:
+    """一个策略的回测结果"""
+
+    strategy: str
+    dates: np.ndarray
+    # 组合每日收益率
+    returns: np.ndarray
+    # 净值曲线，初始为1
+    equity: np.ndarray
+    total_return: float
+    annual_return: float
+    volatility: float
+    sharpe: float
+    max_drawdown: float
+    # 平均每日单边换手率
+    turnover: float
+    # 成交笔数(买入和卖出)
+    trades: int
+    # 因停牌或涨跌停未能成交的委托次数
+    blocked: int
+    elapsed: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "strategy": self.strategy,
+            "total_return": round(self.total_return, 4),
+            "annual_return": round(self.annual_return, 4),
+            "volatility": round(self.volatility, 4),
+            "sharpe": round(self.sharpe, 2),
+            "max_drawdown": round(self.max_drawdown, 4),
+            "turnover": round(self.turnover, 4),
+            "trades": self.trades,
+            "blocked": self.blocked,
+            "elapsed": round(self.elapsed, 3),
+        }
+
+
+def price_limits(codes: np.ndarray, names: Optional[np.ndarray] = None) -> np.ndarray:
+    """按股票代码前缀和名称确定每只股票的涨跌停幅度"""
+    codes = np.asarray(codes).astype(str)
+    limits = np.full(len(codes), _DEFAULT_LIMIT)
+    for prefixes, limit in _LIMIT_PREFIXES.items():
+        for prefix in prefixes:
+            limits[np.char.startswith(codes, prefix)] = limit
+    if names is not None:
+        st = np.char.find(np.asarray(names).astype(str), "ST") >= 0
+        limits[st & (limits == _DEFAULT_LIMIT)] = _ST_LIMIT
+    return limits
+
+
+def _round_price(price: np.ndarray) -> np.ndarray:
+    """按交易所规则四舍五入到分"""
+    return np.floor(price / _TICK + 0.5) * _TICK
+
+
+class BacktestEngine:
+    """向量化回测引擎
+
+    区间内的行情和指标一次加载为 (交易日 × 股票) 矩阵，策略在整个矩阵上计算买卖信号掩码，
+    撮合按交易日循环、在全部股票上做向量运算：
+
+    - 收盘产生的信号在下一交易日开盘成交(T+1)，当日买入最早下一交易日卖出；
+    - 停牌或开盘即涨停时买入委托作废，停牌或开盘即跌停时卖出委托顺延到下一交易日；
+    - 买入收取佣金，卖出收取佣金和印花税；
+    - 组合每日等权持有所有持仓股票，不考虑再平衡成本。
+    """
+
+    def __init__(self, panel: MarketPanel, config: Optional[BacktestConfig] = None):
+        self.panel = panel
+        self.config = config or BacktestConfig()
+        self._prepare()
+
+    @classmethod
+    def from_datastore(
+        cls,
+        datastore: StockDatastore,
+        start_date: date,
+        end_date: date,
+        codes: Optional[list[str]] = None,
+        fields: Optional[list[str]] = None,
+        config: Optional[BacktestConfig] = None,
+    ) -> "BacktestEngine":
+        """从数据库加载区间内的行情和指标，fields 为策略用到的字段，为空时加载全部"""
+        if fields is not None:
+            fields = sorted(set(fields) | set(PRICE_FIELDS))
+        # 使用 Parquet 镜像时，同一区间的反复回测直接内存映射联表结果
+        history = datastore.get_history_with_indicators(
+            codes, start_date, end_date, fields, memory_map=True
+        )
+        return cls(MarketPanel.from_frame(history), config)
+
+    def _prepare(self):
+        """预先计算与策略无关的可成交掩码和各类收益率矩阵"""
+        panel = self.panel
+        open_ = panel["open"]
+        close = panel["close"]
+        prev_close = panel["prev_close"]
+        limits = price_limits(panel.codes, panel.names)
+        limit_up = _round_price(prev_close * (1 + limits))
+        limit_down = _round_price(prev_close * (1 - limits))
+        suspended = np.isnan(open_)
+        # 上一收盘价未知(上市首日)时不限制
+        self._can_buy = ~suspended & ~(open_ >= limit_up - _TICK / 2)
+        self._can_sell = ~suspended & ~(open_ <= limit_down + _TICK / 2)
+
+        config = self.config
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # 持有: 昨收到今收；买入: 开盘成交到收盘；卖出: 昨收到开盘成交
+            self._hold_return = np.nan_to_num(close / prev_close - 1)
+            self._buy_return = np.nan_to_num(
+                close / open_ * (1 - config.commission) - 1
+            )
+            self._sell_return = np.nan_to_num(
+                open_ / prev_close * (1 - config.commission - config.stamp_tax) - 1
+            )
+
+    def run(self, strategy: BaseStrategy) -> BacktestResult:
+        """回测单个策略"""
+        started = time.perf_counter()
+        panel = self.panel.with_fields(strategy.indicators(self.panel))
+        buy = np.asarray(strategy.buy_signals(panel), dtype=bool)
+        sell = np.asarray(strategy.sell_signals(panel), dtype=bool)
+        returns, turnover, trades, blocked = self._simulate(buy, sell)
+        result = self._result(
+            strategy.name or type(strategy).__name__, returns, turnover, trades, blocked
+        )
+        result.elapsed = time.perf_counter() - started
+        logger.info(f"回测完成: {result.to_dict()}")
+        return result
+
+    def run_grid(
+        self, strategies: list[BaseStrategy], max_workers: Optional[int] = None
+    ) -> list[BacktestResult]:
+        """回测多个策略(如同一策略的不同参数)，结果顺序与 strategies 一致
+
+        max_workers 大于1时使用进程池，矩阵在每个工作进程初始化时传递一次。
+        """
+        if (max_workers is not None and max_workers <= 1) or len(strategies) <= 1:
+            return [self.run(strategy) for strategy in strategies]
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(self.panel, self.config),
+        ) as executor:
+            return list(executor.map(_run_in_worker, strategies))
+
+    def _simulate(
+        self, buy: np.ndarray, sell: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, int, int]:
+        days, stocks = self.panel.shape
+        held = np.zeros(stocks, dtype=bool)
+        exiting = np.zeros(stocks, dtype=bool)
+        returns = np.zeros(days)
+        turnover = np.zeros(days)
+        trades = blocked = 0
+        for t in range(1, days):
+            # 前一交易日收盘的信号在今日开盘撮合
+            exiting |= sell[t - 1] & held
+            orders = buy[t - 1] & ~held
+            bought = orders & self._can_buy[t]
+            sold = exiting & self._can_sell[t]
+            blocked += np.count_nonzero(orders & ~bought)
+            blocked += np.count_nonzero(exiting & ~sold)
+
+            exposed = held | bought
+            count = np.count_nonzero(exposed)
+            if count:
+                daily = np.where(
+                    bought,
+                    self._buy_return[t],
+                    np.where(sold, self._sell_return[t], self._hold_return[t]),
+                )
+                returns[t] = daily[exposed].mean()
+                traded = np.count_nonzero(bought) + np.count_nonzero(sold)
+                turnover[t] = traded / count / 2
+                trades += traded
+
+            held = (held & ~sold) | bought
+            exiting &= ~sold
+        return returns, turnover, trades, blocked
+
+    def _result(
+        self,
+        name: str,
+        returns: np.ndarray,
+        turnover: np.ndarray,
+        trades: int,
+        blocked: int,
+    ) -> BacktestResult:
+        periods = self.config.periods_per_year
+        equity = np.cumprod(1 + returns)
+        std = returns.std()
+        drawdown = 1 - equity / np.maximum.accumulate(equity)
+        return BacktestResult(
+            strategy=name,
+            dates=self.panel.dates,
+            returns=returns,
+            equity=equity,
+            total_return=float(equity[-1] - 1),
+            annual_return=float(equity[-1] ** (periods / len(returns)) - 1),
+            volatility=float(std * np.sqrt(periods)),
+            sharpe=float(returns.mean() / std * np.sqrt(periods)) if std > 0 else 0.0,
+            max_drawdown=float(drawdown.max()),
+            turnover=float(turnover.mean()),
+            trades=trades,
+            blocked=blocked,
+        )
+
+
+# 进程池中每个工作进程持有的回测引擎
+_worker_engine: Optional[BacktestEngine] = None
+
+
+def _init_worker(panel: MarketPanel, config: BacktestConfig):
+    global _worker_engine
+    _worker_engine = BacktestEngine(panel, config)
+
+
+def _run_in_worker(strategy: BaseStrategy) -> BacktestResult:
+    return _worker_engine.run(strategy)
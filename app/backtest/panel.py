@@ -0,0 +1,99 @@
+from typing import Iterator, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+# 不作为矩阵字段的列
+_KEY_COLUMNS = ["code", "name", "trade_date"]
+_PREV_PREFIX = "prev_"
+
+
+def forward_fill(x: np.ndarray) -> np.ndarray:
+    """沿时间轴用最近的有效值填充 NaN，开头的 NaN 保持不变"""
+    index = np.where(np.isnan(x), 0, np.arange(len(x))[:, None])
+    np.maximum.accumulate(index, axis=0, out=index)
+    return x[index, np.arange(x.shape[1])]
+
+
+def shift(x: np.ndarray, n: int = 1) -> np.ndarray:
+    """沿时间轴后移 n 个交易日，前 n 行为 NaN"""
+    result = np.full_like(x, np.nan)
+    result[n:] = x[:-n]
+    return result
+
+
+class MarketPanel(Mapping[str, np.ndarray]):
+    """(交易日 × 股票) 的行情和指标矩阵
+
+    每个字段是一个 float64 二维矩阵，停牌或缺失的数据为 NaN。
+    按 prev_ 前缀访问时返回每只股票上一个有数据的交易日的取值，
+    与 prepare_frame 生成的截面语义一致，因此策略可以直接在整个区间上计算信号掩码。
+    """
+
+    def __init__(
+        self,
+        dates: np.ndarray,
+        codes: np.ndarray,
+        fields: dict[str, np.ndarray],
+        names: Optional[np.ndarray] = None,
+    ):
+        self.dates = dates
+        self.codes = codes
+        self.names = names if names is not None else codes
+        self._fields = fields
+        self._previous: dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_frame(cls, history: pd.DataFrame) -> "MarketPanel":
+        """由联表读取的长表构建矩阵，数值列都转换为字段"""
+        dates, date_index = np.unique(
+            history["trade_date"].to_numpy(), return_inverse=True
+        )
+        codes, code_index = np.unique(history["code"].to_numpy(), return_inverse=True)
+        names = None
+        if "name" in history:
+            # 同一只股票取区间内最后的名称
+            names = np.empty(len(codes), dtype=object)
+            names[code_index] = history["name"].to_numpy()
+        fields = {}
+        for column in history.columns:
+            if column in _KEY_COLUMNS:
+                continue
+            matrix = np.full((len(dates), len(codes)), np.nan)
+            matrix[date_index, code_index] = history[column].to_numpy(np.float64)
+            fields[column] = matrix
+        return cls(dates, codes, fields, names)
+
+    def with_fields(self, fields: dict[str, np.ndarray]) -> "MarketPanel":
+        """增加或替换字段，返回共享原有矩阵的新面板"""
+        if not fields:
+            return self
+        return MarketPanel(
+            self.dates, self.codes, {**self._fields, **fields}, self.names
+        )
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return len(self.dates), len(self.codes)
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        if key in self._fields:
+            return self._fields[key]
+        field = key[len(_PREV_PREFIX) :]
+        if key.startswith(_PREV_PREFIX) and field in self._fields:
+            if key not in self._previous:
+                self._previous[key] = shift(forward_fill(self._fields[field]))
+            return self._previous[key]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def __getstate__(self) -> dict:
+        # 进程间传递时不带前一日取值的缓存
+        state = self.__dict__.copy()
+        state["_previous"] = {}
+        return state
@@ -0,0 +1,156 @@
+import itertools
+import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.backtest.engine import BacktestConfig, BacktestEngine
+from app.backtest.panel import MarketPanel
+from app.strategy._strategy import BaseStrategy
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PanelHandle:
+    """共享面板的句柄，只包含文件位置和坐标轴，传递给工作进程的开销与数据量无关"""
+
+    directory: str
+    fields: list[str]
+    dates: np.ndarray
+    codes: np.ndarray
+    names: Optional[np.ndarray] = None
+
+    def open(self) -> MarketPanel:
+        """以只读内存映射打开各字段矩阵，多个进程共享同一份页缓存"""
+        fields = {
+            name: np.load(os.path.join(self.directory, f"{name}.npy"), mmap_mode="r")
+            for name in self.fields
+        }
+        return MarketPanel(self.dates, self.codes, fields, self.names)
+
+
+class SharedPanel:
+    """把面板的字段矩阵写入临时目录下的 .npy 文件，供工作进程内存映射
+
+    用作上下文管理器，退出时删除临时文件。
+    """
+
+    def __init__(self, panel: MarketPanel, directory: Optional[str] = None):
+        self.directory = tempfile.mkdtemp(prefix="todify-panel-", dir=directory)
+        for name in panel:
+            np.save(os.path.join(self.directory, f"{name}.npy"), panel[name])
+        self.handle = PanelHandle(
+            self.directory, list(panel), panel.dates, panel.codes, panel.names
+        )
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self) -> "SharedPanel":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ParameterSweep:
+    """策略参数扫描
+
+    对 strategy_class 的参数网格逐一回测，行情矩阵只构建一次并以内存映射共享给工作进程，
+    进程间只传递参数和回测指标。每个组合完成即加入按 rank_by 降序排列的结果表。
+    """
+
+    def __init__(
+        self,
+        panel: MarketPanel,
+        strategy_class: type[BaseStrategy],
+        grid: dict[str, Iterable],
+        config: Optional[BacktestConfig] = None,
+        max_workers: Optional[int] = None,
+        rank_by: str = "sharpe",
+    ):
+        self.panel = panel
+        self.strategy_class = strategy_class
+        self.params = [
+            dict(zip(grid, values)) for values in itertools.product(*grid.values())
+        ]
+        self.config = config or BacktestConfig()
+        self.max_workers = max_workers or os.cpu_count()
+        self.rank_by = rank_by
+        self.rows: list[dict[str, Any]] = []
+
+    def stream(self) -> Iterator[dict[str, Any]]:
+        """按完成顺序逐个返回参数组合的回测结果"""
+        self.rows = []
+        started = time.perf_counter()
+        if self.max_workers <= 1:
+            engine = BacktestEngine(self.panel, self.config)
+            results = (
+                _run(engine, self.strategy_class, params) for params in self.params
+            )
+            yield from self._collect(results)
+        else:
+            with SharedPanel(self.panel) as shared, ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(shared.handle, self.config),
+            ) as executor:
+                futures = [
+                    executor.submit(_run_in_worker, self.strategy_class, params)
+                    for params in self.params
+                ]
+                yield from self._collect(
+                    future.result() for future in as_completed(futures)
+                )
+        logger.info(
+            f"参数扫描完成: {self.strategy_class.__name__} {len(self.rows)}组参数, "
+            f"{self.max_workers}个进程, 耗时{time.perf_counter() - started:.2f}s"
+        )
+
+    def _collect(self, results: Iterable[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+        for row in results:
+            self.rows.append(row)
+            yield row
+
+    def table(self) -> pd.DataFrame:
+        """当前已完成组合的结果，按 rank_by 降序排列"""
+        df = pd.DataFrame(self.rows)
+        if df.empty:
+            return df
+        return df.sort_values(self.rank_by, ascending=False, ignore_index=True)
+
+    def run(self) -> pd.DataFrame:
+        """运行全部参数组合，返回排序后的结果表"""
+        for _ in self.stream():
+            pass
+        return self.table()
+
+
+def _run(
+    engine: BacktestEngine, strategy_class: type[BaseStrategy], params: dict
+) -> dict[str, Any]:
+    result = engine.run(strategy_class(**params))
+    row = result.to_dict()
+    row.pop("strategy")
+    return {**params, **row}
+
+
+# 工作进程持有的回测引擎，面板字段为共享的内存映射
+_worker_engine: Optional[BacktestEngine] = None
+
+
+def _init_worker(handle: PanelHandle, config: BacktestConfig):
+    global _worker_engine
+    _worker_engine = BacktestEngine(handle.open(), config)
+
+
+def _run_in_worker(strategy_class: type[BaseStrategy], params: dict) -> dict:
+    return _run(_worker_engine, strategy_class, params)
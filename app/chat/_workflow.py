@@ -1,6 +1,44 @@
+import logging
+import threading
+import time
+from typing import Callable
+
 from langchain_core.runnables import Runnable, RunnableConfig
+from langgraph.graph.graph import CompiledGraph
 from langgraph.prebuilt.chat_agent_executor import AgentState, _validate_chat_history
 
+logger = logging.getLogger(__name__)
+
+
+class GraphRegistry:
+    """编译后的工作流注册表
+
+    每个名称的工作流只在第一次使用时构建、编译一次，之后所有请求共用同一个编译结果；
+    编译后的图不保存请求状态，可以被并发请求同时执行。
+    """
+
+    def __init__(self):
+        self._graphs: dict[str, CompiledGraph] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, build: Callable[[], CompiledGraph]) -> CompiledGraph:
+        graph = self._graphs.get(name)
+        if graph is not None:
+            return graph
+        with self._lock:
+            graph = self._graphs.get(name)
+            if graph is None:
+                started = time.perf_counter()
+                graph = self._graphs[name] = build()
+                logger.info(
+                    f"编译工作流{name}, 耗时{time.perf_counter() - started:.3f}s"
+                )
+        return graph
+
+    def clear(self):
+        with self._lock:
+            self._graphs.clear()
+
 
 def call_model(
     runnable: Runnable, state: AgentState, config: RunnableConfig
@@ -1,7 +1,8 @@
+import asyncio
 import json
 import logging
 import uuid
-from typing import AsyncGenerator, Literal
+from typing import AsyncGenerator, Literal, Optional
 
 from langchain_core.messages import AIMessage, BaseMessage
 from langchain_core.prompts import ChatPromptTemplate
@@ -11,6 +12,13 @@ from langgraph.graph import MessagesState, StateGraph
 from langgraph.graph.graph import CompiledGraph
 from langgraph.managed import IsLastStep
 
+from app.chat._workflow import GraphRegistry
+from app.chat.intent import (
+    STOCK,
+    IntentClassifier,
+    get_intent_classifier,
+    parse_category,
+)
 from app.chat.schemas import (
     ChatCompletionRequest,
     ChatCompletionResponse,
@@ -18,9 +26,10 @@ from app.chat.schemas import (
     Message,
     Usage,
 )
-from app.chat.stock_workflow import StockWorkflow
-from app.config.setting import settings
+from app.chat.stock_workflow import STOCK_MODEL, StockWorkflow
+from app.config.chat import settings as chat_settings
 from app.core.singleton import Singleton
+from app.llm.model_pool import SILICON_FLOW, get_chat_model_pool
 from app.tools.tool_manager import ToolManager
 from app.utils.date import get_now_millis, now_format
 
@@ -37,35 +46,45 @@ class ChatManager(metaclass=Singleton):
         self.tool_manager = tool_manager
         self.agent_model = self._init_agent_model()
         self.stock_workflow = StockWorkflow(tool_manager)
+        # 第一次分类时构建，构建时读取数据库
+        self.intent_classifier: Optional[IntentClassifier] = None
+        self.graphs = GraphRegistry()
 
     @classmethod
     def _init_agent_model(cls) -> BaseChatOpenAI:
-        return BaseChatOpenAI(
-            model_name="Qwen/Qwen2.5-32B-Instruct",
-            openai_api_base="https://api.siliconflow.cn/v1",
-            openai_api_key=settings.silicon_flow_api_key,
-            temperature=0,
-            verbose=True,
-        )
+        return get_chat_model_pool().get(SILICON_FLOW, STOCK_MODEL, temperature=0)
 
     def get_work_flow(self) -> CompiledGraph:
-        def categorize(state: State) -> State:
-            """Categorize the customer query into Technical, Billing, or General."""
+        """对话工作流，只编译一次，并发请求共用"""
+        return self.graphs.get("chat", self._build_work_flow)
+
+    def _build_work_flow(self) -> CompiledGraph:
+        async def categorize(state: State) -> State:
+            """先用本地分类器判断问题类别，置信度不足时再交给大模型"""
+            if self.intent_classifier is None:
+                self.intent_classifier = await asyncio.to_thread(get_intent_classifier)
+            intent = await self.intent_classifier.aclassify(
+                state["messages"][-1].content
+            )
+            if intent is not None:
+                logger.debug(f"意图分类: {intent}")
+                state["category"] = intent.category
+                return state
             prompt = ChatPromptTemplate.from_template(
                 "根据用户问题，给出对应的分类，你只需要输出结果:"
                 "Stock, General. \n Messages: {messages}"
             )
             chain = prompt | self.agent_model
-            category = chain.invoke({"messages": state["messages"]}).content
-            state["category"] = category
+            reply = (await chain.ainvoke({"messages": state["messages"]})).content
+            state["category"] = parse_category(reply)
             return state
 
-        def default_handler(state: State) -> State:
+        async def default_handler(state: State) -> State:
             prompt = ChatPromptTemplate.from_template(
                 "你是一个智能助手，需要分析用户提出的问题，并给出合适的回答。\n Messages: {messages}"
             )
             chain = prompt | self.agent_model
-            response = chain.invoke({"messages": state["messages"]})
+            response = await chain.ainvoke({"messages": state["messages"]})
             state["messages"] = [response]
             return state
 
@@ -78,7 +97,7 @@ class ChatManager(metaclass=Singleton):
         builder.add_conditional_edges(
             "switch_agent",
             lambda state: (
-                "stock_agent" if state["category"] == "Stock" else "default_handler"
+                "stock_agent" if state["category"] == STOCK else "default_handler"
             ),
             {
                 "stock_agent": "stock_agent",
@@ -89,7 +108,7 @@ class ChatManager(metaclass=Singleton):
         builder.set_entry_point("switch_agent")
         builder.set_finish_point("default_handler")
         workflow = builder.compile(
-            debug=True,
+            debug=chat_settings.graph_debug,
         )
         # byte_buffer = io.BytesIO(workflow.get_graph().draw_mermaid_png())
         # image = Image.open(byte_buffer)
@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cache
+from typing import Collection, Optional
+
+import numpy as np
+from langchain_community.embeddings import DashScopeEmbeddings
+from langchain_core.embeddings import Embeddings
+
+from app.config.chat import settings as chat_settings
+from app.config.setting import settings
+from app.core.database import get_db
+from app.stock.datastore import StockDatastore
+
+logger = logging.getLogger(__name__)
+
+STOCK = "Stock"
+GENERAL = "General"
+
+# 带交易所前缀或后缀的股票代码，如 sh600519、000001.SZ
+_PREFIXED_CODE_PATTERN = re.compile(
+    r"(?<![\dA-Za-z])(?:(?:s[hz]|bj)\d{6}|\d{6}\.(?:s[hz]|bj))(?![\dA-Za-z])",
+    re.IGNORECASE,
+)
+# 不带前后缀的六位数字，可能是验证码、金额、邮编，只有是已知股票代码时才判定
+_BARE_CODE_PATTERN = re.compile(r"(?<![\dA-Za-z.])\d{6}(?![\dA-Za-z])")
+# 只在股票语境中出现的关键词；行情、持仓、分红、成交额等通用词不在此列，交给后续阶段判断
+STOCK_KEYWORDS = (
+    "股票",
+    "个股",
+    "股价",
+    "股市",
+    "A股",
+    "港股",
+    "美股",
+    "上证指数",
+    "深证成指",
+    "沪深300",
+    "创业板",
+    "科创板",
+    "北交所",
+    "涨停",
+    "跌停",
+    "概念股",
+    "龙虎榜",
+    "大宗交易",
+    "K线",
+    "MACD",
+    "KDJ",
+    "市盈率",
+    "市净率",
+    "换手率",
+    "主力资金",
+    "北向资金",
+    "融资融券",
+)
+_KEYWORD_PATTERN = re.compile(
+    "|".join(re.escape(keyword) for keyword in STOCK_KEYWORDS), re.IGNORECASE
+)
+
+# 相似度分类的示例问题
+INTENT_EXAMPLES: dict[str, list[str]] = {
+    STOCK: [
+        "贵州茅台今天的收盘价是多少",
+        "宁德时代最近一周走势怎么样",
+        "今天哪些股票涨停了",
+        "帮我看看半导体板块的资金流向",
+        "最近北向资金买了哪些票",
+        "比亚迪的市盈率是多少",
+        "上证指数今天收了多少点",
+        "新能源车概念股有哪些",
+        "招商银行去年分红多少",
+        "最近有哪些公司发布了业绩预告",
+        "今天龙虎榜上有哪些游资",
+        "白酒行业的估值现在高吗",
+    ],
+    GENERAL: [
+        "你好",
+        "你是谁",
+        "帮我写一首关于春天的诗",
+        "明天北京天气怎么样",
+        "把这段话翻译成英文",
+        "用 Python 写一个快速排序",
+        "推荐几本好看的小说",
+        "红烧肉怎么做",
+        "解释一下什么是量子计算",
+        "帮我写一封请假邮件",
+        "周末去哪里玩比较好",
+        "今天是几号",
+    ],
+}
+
+
+@dataclass(frozen=True)
+class Intent:
+    """意图分类结果，source 为 rule、embedding 或 llm"""
+
+    category: str
+    confidence: float
+    source: str
+
+
+def match_rule(text: str, known_codes: Collection[str] = ()) -> Optional[Intent]:
+    """股票代码或股票关键词匹配，命中时判定为股票问题
+
+    不带前后缀的六位数字只有在 known_codes 中时才算股票代码。
+    """
+    if _PREFIXED_CODE_PATTERN.search(text) or _KEYWORD_PATTERN.search(text):
+        return Intent(STOCK, 1.0, "rule")
+    if any(code in known_codes for code in _BARE_CODE_PATTERN.findall(text)):
+        return Intent(STOCK, 1.0, "rule")
+    return None
+
+
+def parse_category(reply: str) -> str:
+    """解析大模型返回的分类，容忍大小写、标点和多余说明，无法识别时按通用问题处理"""
+    text = reply.strip().lower()
+    if "stock" in text or "股票" in text:
+        return STOCK
+    return GENERAL
+
+
+class IntentClassifier:
+    """问题意图的本地分类器，在大模型路由之前执行
+
+    先按股票代码和关键词匹配，不带前后缀的代码需在 known_codes 中，
+    未命中时与示例问题做向量相似度最近邻分类，
+    两个类别最高相似度之差作为置信度，低于 min_margin 时返回 None，交给大模型判断。
+    示例问题的向量在第一次使用时一次性计算，问题的向量按最近使用缓存 cache_size 个。
+    """
+
+    def __init__(
+        self,
+        embeddings: Optional[Embeddings] = None,
+        known_codes: Collection[str] = (),
+        examples: Optional[dict[str, list[str]]] = None,
+        min_margin: Optional[float] = None,
+        cache_size: Optional[int] = None,
+    ):
+        self.embeddings = embeddings
+        self.known_codes = known_codes
+        self.examples = examples or INTENT_EXAMPLES
+        self.min_margin = (
+            chat_settings.intent_min_margin if min_margin is None else min_margin
+        )
+        self.cache_size = cache_size or chat_settings.intent_cache_size
+        self._labels: Optional[np.ndarray] = None
+        self._matrix: Optional[np.ndarray] = None
+        self._vectors: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def classify(self, text: str) -> Optional[Intent]:
+        """本地分类，置信度不足时返回 None"""
+        intent = match_rule(text, self.known_codes)
+        if intent is not None or self.embeddings is None:
+            return intent
+        try:
+            return self._nearest(text)
+        except Exception as e:
+            logger.warning(f"意图向量分类失败: {str(e)}")
+            return None
+
+    async def aclassify(self, text: str) -> Optional[Intent]:
+        """classify 的异步版本，规则未命中时在线程中计算向量"""
+        intent = match_rule(text, self.known_codes)
+        if intent is not None or self.embeddings is None:
+            return intent
+        return await asyncio.to_thread(self.classify, text)
+
+    def _nearest(self, text: str) -> Optional[Intent]:
+        labels, matrix = self._example_matrix()
+        scores = matrix @ self._vector(text)
+        best = {label: scores[labels == label].max() for label in self.examples}
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+        margin = float(ranked[0][1] - ranked[1][1])
+        if margin < self.min_margin:
+            return None
+        return Intent(ranked[0][0], margin, "embedding")
+
+    def _example_matrix(self) -> tuple[np.ndarray, np.ndarray]:
+        if self._matrix is None:
+            with self._lock:
+                if self._matrix is None:
+                    labels, texts = [], []
+                    for label, examples in self.examples.items():
+                        labels += [label] * len(examples)
+                        texts += examples
+                    self._labels = np.array(labels)
+                    self._matrix = _normalize(
+                        np.array(self.embeddings.embed_documents(texts))
+                    )
+        return self._labels, self._matrix
+
+    def _vector(self, text: str) -> np.ndarray:
+        with self._lock:
+            vector = self._vectors.get(text)
+            if vector is not None:
+                self._vectors.move_to_end(text)
+                return vector
+        vector = _normalize(np.array(self.embeddings.embed_query(text)))
+        with self._lock:
+            self._vectors[text] = vector
+            while len(self._vectors) > self.cache_size:
+                self._vectors.popitem(last=False)
+        return vector
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norm == 0, 1, norm)
+
+
+def load_stock_codes() -> frozenset[str]:
+    """已入库日线的股票代码，读取失败时返回空集合"""
+    try:
+        with get_db() as session:
+            return frozenset(StockDatastore(session).get_stock_codes())
+    except Exception as e:
+        logger.warning(
+            f"获取股票代码列表失败，不带前后缀的代码交给后续阶段判断: {str(e)}"
+        )
+        return frozenset()
+
+
+@cache
+def get_intent_classifier() -> IntentClassifier:
+    """进程内共用的意图分类器，未启用向量分类时只做规则匹配
+
+    构建时从数据库读取股票代码，不要在事件循环中直接调用。
+    """
+    embeddings = None
+    if chat_settings.intent_embedding_enabled:
+        embeddings = DashScopeEmbeddings(
+            model=settings.embeddings_model_name,
+            dashscope_api_key=settings.dash_scope_api_key,
+        )
+    return IntentClassifier(embeddings, load_stock_codes())
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from typing import List, Optional
 
@@ -6,23 +7,26 @@ from langchain_core.messages import AIMessage, BaseMessage, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import Runnable, RunnableConfig
 from langchain_core.tools import Tool
-from langchain_openai.chat_models.base import BaseChatOpenAI, _DictOrPydanticClass
-from langgraph.graph import StateGraph
+from langchain_openai.chat_models.base import _DictOrPydanticClass
+from langgraph.graph import START, StateGraph
 from langgraph.graph.graph import CompiledGraph
 from langgraph.prebuilt import ToolNode
 from langgraph.prebuilt.chat_agent_executor import AgentState
 from langgraph.utils.runnable import RunnableCallable
 from pydantic import BaseModel, Field
 
-from app.chat._workflow import acall_model
-from app.config.setting import settings
+from app.chat._workflow import GraphRegistry, acall_model
+from app.config.chat import settings as chat_settings
 from app.core.singleton import Singleton
+from app.llm.model_pool import SILICON_FLOW, get_chat_model_pool
 from app.stock.trade_calendar import TradeCalendar
 from app.tools.tool_manager import ToolManager
 from app.utils.date import SIMPLE_FORMAT, date_format, now_format
 
 logger = logging.getLogger(__name__)
 
+STOCK_MODEL = "Qwen/Qwen2.5-32B-Instruct"
+
 STOCK_PROMPT = """你是一个专业的股票分析师，你能根据用户提出的问题，通过提供给你的工具帮助用户解决问题，并给出权威的总结。
 
 今天是{today}，最后交易日是{last_trade_date}"""
@@ -38,12 +42,14 @@ class StockState(AgentState):
     today: str
     last_trade_date: str
     keywords: list[str]
+    question_tool_ids: list[int]
 
 
 class StockWorkflow(metaclass=Singleton):
     def __init__(self, tool_manager: ToolManager):
         self.tool_manager = tool_manager
         self.trade_calendar = TradeCalendar()
+        self.graphs = GraphRegistry()
 
     @classmethod
     def _get_model(
@@ -51,18 +57,9 @@ class StockWorkflow(metaclass=Singleton):
         tools: List[Tool] = None,
         schema: Optional[_DictOrPydanticClass] = None,
     ) -> Runnable[LanguageModelInput, BaseMessage] | BaseChatModel:
-        model = BaseChatOpenAI(
-            model_name="Qwen/Qwen2.5-32B-Instruct",
-            openai_api_base="https://api.siliconflow.cn/v1",
-            openai_api_key=settings.silicon_flow_api_key,
-            temperature=0,
-            verbose=True,
+        return get_chat_model_pool().get(
+            SILICON_FLOW, STOCK_MODEL, temperature=0, tools=tools, schema=schema
         )
-        if tools:
-            return model.bind_tools(tools=tools)
-        elif schema:
-            return model.with_structured_output(schema)
-        return model
 
     async def _agent_handler(
         self, state: StockState, config: RunnableConfig
@@ -71,17 +68,29 @@ class StockWorkflow(metaclass=Singleton):
         return await acall_model(model, state, config)
 
     def get_stock_graph(self) -> CompiledGraph:
+        """股票子工作流，只编译一次，并发请求共用"""
+        return self.graphs.get("stock", self._build_stock_graph)
+
+    def _build_stock_graph(self) -> CompiledGraph:
         workflow = StateGraph(StockState)
         workflow.add_node("keywords_agent", self._get_keywords)
         workflow.add_node("agent", RunnableCallable(self._agent_handler))
         workflow.add_node("choose_tool_agent", self._choose_tool)
         workflow.add_node("call_tool_agent", self._call_tool)
-        workflow.add_edge("keywords_agent", "choose_tool_agent")
         workflow.add_conditional_edges("choose_tool_agent", self._router_choose_tool)
 
         workflow.set_entry_point("keywords_agent")
-
-        return workflow.compile(debug=True)
+        if chat_settings.retrieve_from_question:
+            # 按原问题检索工具与生成关键词并行，两者都完成后再选择工具
+            workflow.add_node("question_tools_agent", self._search_question_tools)
+            workflow.add_edge(START, "question_tools_agent")
+            workflow.add_edge(
+                ["keywords_agent", "question_tools_agent"], "choose_tool_agent"
+            )
+        else:
+            workflow.add_edge("keywords_agent", "choose_tool_agent")
+
+        return workflow.compile(debug=chat_settings.graph_debug)
 
     @classmethod
     def _router_choose_tool(cls, state: StockState, config: RunnableConfig) -> str:
@@ -90,22 +99,30 @@ class StockWorkflow(metaclass=Singleton):
             return "call_tool_agent"
         return "__end__"
 
-    def _call_tool(self, state: StockState, config: RunnableConfig) -> StockState:
+    async def _call_tool(self, state: StockState, config: RunnableConfig) -> StockState:
         message = state.get("messages")[-1]
-        tools = []
-        for call in message.tool_calls:
-            tool = self.tool_manager.get_tool("akshare", call["name"])
-            if tool:
-                tools.append(tool)
-        return ToolNode(tools).invoke({"messages": state["messages"]}, config)
-
-    def _choose_tool(self, state: StockState, config: RunnableConfig) -> StockState:
-        tools = self.tool_manager.search_and_create_tools(state["keywords"])
+        tools = await asyncio.gather(
+            *(
+                self.tool_manager.aget_tool("akshare", call["name"])
+                for call in message.tool_calls
+            )
+        )
+        # 多个工具调用并发执行，akshare 调用在有界线程池中进行
+        return await ToolNode([tool for tool in tools if tool]).ainvoke(
+            {"messages": state["messages"]}, config
+        )
+
+    async def _choose_tool(
+        self, state: StockState, config: RunnableConfig
+    ) -> StockState:
+        ids = await self.tool_manager.asearch_tool_ids(state["keywords"])
+        ids = list(dict.fromkeys([*ids, *state.get("question_tool_ids", [])]))
+        tools = await self.tool_manager.acreate_tools(ids)
         prompt = ChatPromptTemplate.from_messages(
             [STOCK_PROMPT, ("placeholder", "{messages}")]
         )
         runnable = prompt | self._get_model(tools=tools)
-        response = runnable.invoke(
+        response = await runnable.ainvoke(
             {
                 "messages": state["messages"],
                 "today": now_format(SIMPLE_FORMAT),
@@ -116,7 +133,11 @@ class StockWorkflow(metaclass=Singleton):
         )
         return {"messages": [response]}
 
-    def _get_keywords(self, state: StockState):
+    async def _search_question_tools(self, state: StockState):
+        question = state["messages"][-1].content
+        return {"question_tool_ids": await self.tool_manager.asearch_tool_ids(question)}
+
+    async def _get_keywords(self, state: StockState):
         prompt = ChatPromptTemplate.from_messages(
             [
                 SystemMessage(
@@ -126,5 +147,5 @@ class StockWorkflow(metaclass=Singleton):
             ]
         )
         runnable = prompt | self._get_model(schema=Keywords)
-        message = runnable.invoke({"messages": state["messages"]})
+        message = await runnable.ainvoke({"messages": state["messages"]})
         return {"keywords": message.keys}
@@ -0,0 +1,33 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class AkshareSettings(BaseSettings):
+    """akshare 接口调用配置"""
+
+    # 是否缓存 akshare 接口的返回结果
+    cache_enabled: bool = True
+    # 进程内 LRU 缓存的最大条目数
+    cache_size: int = 256
+    # 共享缓存层，redis 或 disk，为空时只使用进程内缓存
+    cache_backend: str = ""
+    # redis 共享缓存地址
+    cache_redis_url: str = "redis://localhost:6379/1"
+    # 本地磁盘共享缓存目录
+    cache_dir: str = ".cache/akshare"
+    # 默认缓存时间(秒)
+    cache_ttl: int = 3600
+    # 实时行情类接口(名称包含 spot、realtime、分钟线等)的缓存时间(秒)
+    cache_realtime_ttl: int = 60
+    # 结束日期早于今天的历史数据的缓存时间(秒)，收盘后的历史数据不会再变化
+    cache_history_ttl: int = 7 * 24 * 3600
+    # 按函数名指定缓存时间(秒)，优先于上面的规则，0 表示不缓存；环境变量中为 JSON
+    cache_ttls: dict[str, int] = {}
+    # 每个进程同时请求 akshare 的最大数量，0 表示不限制
+    max_concurrency: int = 8
+    # 异步对话中执行阻塞工具调用的线程数
+    tool_max_workers: int = 16
+
+    model_config = SettingsConfigDict(env_prefix="akshare_")
+
+
+settings = AkshareSettings()
@@ -0,0 +1,29 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class ChatSettings(BaseSettings):
+    """对话工作流配置"""
+
+    # 编译工作流时是否开启 LangGraph 调试输出，会逐步打印完整状态，只用于本地排查
+    graph_debug: bool = False
+    # 模型池保留的绑定工具或结构化输出的模型数
+    model_pool_size: int = 128
+    # 每个模型服务的最大连接数
+    http_max_connections: int = 20
+    # 空闲 keep-alive 连接的保留时间(秒)
+    http_keepalive_expiry: float = 60
+
+    # 生成关键词的同时按用户原问题检索工具，检索结果与关键词检索的工具合并
+    retrieve_from_question: bool = False
+    # 意图分类是否使用向量相似度，关闭时规则未命中的问题都交给大模型判断
+    intent_embedding_enabled: bool = False
+    # 向量分类两个类别相似度之差低于该值时交给大模型判断；
+    # 与向量模型相关，启用前需用 test/benchmark/test_intent.py 按实际模型校准
+    intent_min_margin: float = 0.05
+    # 缓存的问题向量数
+    intent_cache_size: int = 1024
+
+    model_config = SettingsConfigDict(env_prefix="chat_")
+
+
+settings = ChatSettings()
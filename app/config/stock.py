@@ -0,0 +1,37 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class StockSettings(BaseSettings):
+    """股票数据抓取配置"""
+
+    # 日线抓取并发数
+    ingestion_max_workers: int = 16
+    # 每秒最多请求数据源的次数
+    ingestion_rate_limit: float = 20
+    # 单只股票失败后的最大重试次数
+    ingestion_max_retries: int = 3
+    # 重试退避基数(秒)，第n次重试等待 backoff * 2^(n-1)
+    ingestion_retry_backoff: float = 0.5
+    # 每批写库的股票数
+    ingestion_batch_size: int = 200
+    # 每个指标计算任务处理的股票数，0 表示每个交易日只发布一个全市场任务
+    indicator_chunk_size: int = 500
+    # 同时计算交易信号的策略数
+    signal_max_concurrency: int = 4
+    # 交易日历快照的有效期(秒)，过期后在后台线程从数据库重新加载
+    calendar_ttl: int = 3600
+    # 行情、指标、龙虎榜和大宗交易的 Parquet 镜像目录，为空时不写入镜像
+    parquet_dir: str = ""
+    # 历史行情和指标的分析类读取是否使用 Parquet 镜像
+    parquet_read: bool = False
+    # 按股票内存映射的日线缓存目录，为空时不启用
+    bar_cache_dir: str = ""
+    # 历史回补的抓取并发数
+    backfill_max_workers: int = 8
+    # 历史回补每个检查点覆盖的月数
+    backfill_chunk_months: int = 1
+
+    model_config = SettingsConfigDict(env_prefix="stock_")
+
+
+settings = StockSettings()
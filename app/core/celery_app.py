@@ -28,6 +28,14 @@ def init_celery_app() -> Celery:
             "schedule": crontab(hour="23", minute="00"),
             # "kwargs": ({"start_date": "20240701", "end_date": "20241229"}),
         },
+        "refresh-trade-calendar": {
+            "task": "app.tasks.stock_tasks.refresh_trade_calendar_task",
+            "schedule": crontab(hour="8", minute="30"),
+        },
+        "sync-bar-cache": {
+            "task": "app.tasks.stock_tasks.sync_bar_cache_task",
+            "schedule": crontab(hour="6", minute="00"),
+        },
     }
 
     # 其他 Celery 配置
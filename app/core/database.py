@@ -1,8 +1,15 @@
 import logging
-from contextlib import contextmanager
-from typing import Generator
+from contextlib import asynccontextmanager, contextmanager
+from functools import cache
+from typing import AsyncGenerator, Generator
 
-from sqlalchemy import QueuePool, create_engine
+from sqlalchemy import QueuePool, create_engine, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
 from app.config.setting import settings
@@ -21,6 +28,9 @@ engine = create_engine(
     pool_timeout=3600,
 )
 
+# 同步驱动对应的异步驱动
+ASYNC_DRIVERS = {"mysql": "aiomysql", "sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
 # 创建基础模型类
 Base = declarative_base()
 
@@ -37,6 +47,35 @@ def get_celery_db() -> Session:
     return session()
 
 
+def get_async_database_url() -> str:
+    """异步数据库地址，未配置时按同步地址换成对应的异步驱动"""
+    if settings.async_database_url:
+        return settings.async_database_url
+    url = make_url(settings.database_url)
+    backend = url.get_backend_name()
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(
+        hide_password=False
+    )
+
+
+@cache
+def get_async_engine() -> AsyncEngine:
+    """异步引擎，首次使用时创建"""
+    return create_async_engine(
+        get_async_database_url(),
+        future=True,
+        pool_pre_ping=True,
+        pool_recycle=300,
+    )
+
+
+@asynccontextmanager
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    session = async_sessionmaker(bind=get_async_engine(), expire_on_commit=False)
+    async with session() as session:
+        yield session
+
+
 # FastAPI 依赖注入使用的函数
 async def get_async_db():
     """
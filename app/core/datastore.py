@@ -1,14 +1,73 @@
-from typing import Generic, TypeVar
+from datetime import date
+from typing import Any, Generic, Optional, TypeVar
 
-from sqlalchemy import Executable
+import numpy as np
+import pandas as pd
+from sqlalchemy import (
+    Column,
+    Date,
+    Executable,
+    Float,
+    Insert,
+    Integer,
+    Label,
+    Numeric,
+    Select,
+    Table,
+    insert,
+    type_coerce,
+)
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.database import Base
+from app.utils.data_frame import df_to_records
 from app.utils.list import batch_list
 
 # 定义泛型类型变量
 T = TypeVar("T", bound=Base)
 
+# 1970-01-01 的序数，date.toordinal() 减去它即为 datetime64[D] 的取值
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_NAT = np.iinfo(np.int64).min
+
+
+def _to_datetime64(values) -> np.ndarray:
+    """date 序列转为 datetime64，比逐个解析日期快一个数量级"""
+    days = np.array(
+        [
+            _NAT if value is None else value.toordinal() - _EPOCH_ORDINAL
+            for value in values
+        ],
+        dtype=np.int64,
+    )
+    return days.astype("datetime64[D]").astype("datetime64[ns]")
+
+
+def _rows_to_frame(
+    statement: Select, keys: list[str], rows: list, index: Optional[str] = None
+) -> pd.DataFrame:
+    """查询结果按列转为 DataFrame，数值字段为 float64，日期字段为 datetime64"""
+    values = zip(*rows) if rows else ([] for _ in keys)
+    data = {}
+    for key, column, selected in zip(keys, values, statement.selected_columns):
+        if isinstance(selected.type, (Numeric, Integer)):
+            data[key] = np.array(column, dtype=np.float64)
+        elif isinstance(selected.type, Date):
+            data[key] = _to_datetime64(column)
+        else:
+            data[key] = np.array(column, dtype=object)
+    df = pd.DataFrame(data, columns=keys, copy=False)
+    if index:
+        df = df.set_index(index)
+    return df
+
+
+def float_columns(*columns: Column) -> list[Label]:
+    """按 float 读取 Numeric 字段，避免逐个构造 Decimal"""
+    return [type_coerce(column, Float).label(column.key) for column in columns]
+
 
 class BaseDatastore(Generic[T]):
     def __init__(self, db_session: Session):
@@ -26,6 +85,20 @@ class BaseDatastore(Generic[T]):
         else:
             return results.all()
 
+    def _fetch_frame(
+        self, statement: Select, index: Optional[str] = None
+    ) -> pd.DataFrame:
+        """执行 Core 查询并按列直接构造 DataFrame，不构造 ORM 对象
+
+        数值字段转为 float64，日期字段转为 datetime64，其余字段保持原值；
+        指定 index 时以该字段作为索引。
+        """
+        # 直接在连接上执行，跳过 ORM 的结果加载
+        result = self.db_session.connection().execute(statement)
+        return _rows_to_frame(statement, list(result.keys()), result.all(), index)
+
+    _float_columns = staticmethod(float_columns)
+
     def upsert(self, instance: T) -> T:
         self.db_session.add(instance)
         self.db_session.commit()
@@ -40,3 +113,132 @@ class BaseDatastore(Generic[T]):
     def _execute(self, statement: Executable):
         self.db_session.execute(statement)
         self.db_session.commit()
+
+    def rollback(self) -> None:
+        """回滚会话中未提交的写入，写入失败后调用，避免残留数据被后续 commit 提交"""
+        self.db_session.rollback()
+
+    def bulk_upsert(
+        self,
+        model: type[Base],
+        records: list[dict[str, Any]],
+        index_elements: list[str],
+        update_columns: Optional[list[str]] = None,
+        batch_size: int = 1000,
+    ) -> int:
+        """批量插入，唯一键冲突时更新 update_columns
+
+        按数据库方言生成 INSERT ... ON DUPLICATE KEY UPDATE / ON CONFLICT DO UPDATE，
+        每个批次只执行一条语句。update_columns 为空列表时冲突行保持不变。
+        """
+        if not records:
+            return 0
+        if update_columns is None:
+            update_columns = [c for c in records[0] if c not in index_elements]
+        statement = self._upsert_statement(
+            model.__table__, index_elements, update_columns
+        )
+        for items in batch_list(records, batch_size):
+            self.db_session.execute(statement, items)
+        self.db_session.commit()
+        return len(records)
+
+    def bulk_insert_frame(
+        self,
+        model: type[Base],
+        df: pd.DataFrame,
+        column_map: Optional[dict[str, str]] = None,
+        batch_size: int = 1000,
+        index_elements: Optional[list[str]] = None,
+    ) -> int:
+        """按列批量写入 DataFrame，不构造 ORM 对象
+
+        column_map 为 DataFrame 列名到模型字段的映射，未映射且不是模型字段的列会被丢弃；
+        日期字段按列统一转换。数据按 batch_size 分批以 executemany 方式执行 Core INSERT，
+        指定 index_elements 时改为 upsert。
+        """
+        if df.empty:
+            return 0
+        table = model.__table__
+        if column_map:
+            df = df.rename(columns=column_map)
+        columns = [c for c in df.columns if c in table.columns]
+        df = df[columns].copy()
+        for column in columns:
+            if isinstance(table.columns[column].type, Date):
+                df[column] = pd.to_datetime(df[column]).dt.date
+        if index_elements:
+            statement = self._upsert_statement(
+                table, index_elements, [c for c in columns if c not in index_elements]
+            )
+        else:
+            statement = insert(table)
+        for start in range(0, len(df), batch_size):
+            records = df_to_records(df.iloc[start : start + batch_size])
+            self.db_session.execute(statement, records)
+        self.db_session.commit()
+        return len(df)
+
+    def _upsert_statement(
+        self, table: Table, index_elements: list[str], update_columns: list[str]
+    ) -> Insert:
+        dialect = self.db_session.get_bind().dialect.name
+        if dialect in ("mysql", "mariadb"):
+            statement = mysql.insert(table)
+            if not update_columns:
+                return statement.prefix_with("IGNORE")
+            return statement.on_duplicate_key_update(
+                {column: statement.inserted[column] for column in update_columns}
+            )
+        if dialect in ("postgresql", "sqlite"):
+            statement = (postgresql if dialect == "postgresql" else sqlite).insert(
+                table
+            )
+            if not update_columns:
+                return statement.on_conflict_do_nothing(index_elements=index_elements)
+            return statement.on_conflict_do_update(
+                index_elements=index_elements,
+                set_={column: statement.excluded[column] for column in update_columns},
+            )
+        raise NotImplementedError(f"bulk upsert is not supported for {dialect}")
+
+
+class AsyncBaseDatastore(Generic[T]):
+    """基于 AsyncSession 的数据访问基类，查询不阻塞事件循环"""
+
+    def __init__(self, db_session: AsyncSession):
+        self.model = T
+        self.db_session = db_session
+
+    _float_columns = staticmethod(float_columns)
+
+    async def _fetch_one(self, statement: Executable):
+        results = await self.db_session.execute(statement=statement)
+        return results.scalar_one_or_none()
+
+    async def _fetch_all(self, statement: Executable, return_dicts: bool = False):
+        results = await self.db_session.execute(statement=statement)
+        if not return_dicts:
+            return results.scalars().all()
+        else:
+            return results.all()
+
+    async def _fetch_frame(
+        self, statement: Select, index: Optional[str] = None
+    ) -> pd.DataFrame:
+        """执行 Core 查询并按列直接构造 DataFrame，不构造 ORM 对象"""
+        connection = await self.db_session.connection()
+        result = await connection.execute(statement)
+        return _rows_to_frame(statement, list(result.keys()), result.all(), index)
+
+    async def bulk_insert(
+        self, model: type[Base], records: list[dict[str, Any]], batch_size: int = 1000
+    ) -> int:
+        """按 batch_size 分批以 executemany 方式执行 Core INSERT"""
+        if not records:
+            return 0
+        statement = insert(model.__table__)
+        for items in batch_list(records, batch_size):
+            await self.db_session.execute(statement, items)
+        await self.db_session.commit()
+        return len(records)
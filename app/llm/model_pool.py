@@ -0,0 +1,182 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cache
+from typing import Any, Optional, Sequence
+
+import httpx
+from langchain_core.language_models import BaseChatModel, LanguageModelInput
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_openai.chat_models.base import BaseChatOpenAI
+from pydantic import BaseModel
+
+from app.config.chat import settings as chat_settings
+from app.config.setting import settings
+
+logger = logging.getLogger(__name__)
+
+SILICON_FLOW = "siliconflow"
+DASH_SCOPE = "dashscope"
+
+
+@dataclass(frozen=True)
+class Provider:
+    """OpenAI 兼容的模型服务"""
+
+    base_url: str
+    api_key: str
+
+
+def default_providers() -> dict[str, Provider]:
+    return {
+        SILICON_FLOW: Provider(
+            "https://api.siliconflow.cn/v1", settings.silicon_flow_api_key
+        ),
+        DASH_SCOPE: Provider(
+            "https://dashscope.aliyuncs.com/compatible-mode/v1",
+            settings.dash_scope_api_key,
+        ),
+    }
+
+
+def _digest(value: Any) -> str:
+    text = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def tools_digest(tools: Optional[Sequence]) -> Optional[str]:
+    """工具列表的 schema 摘要，名称、描述和参数都相同的工具集得到同一个摘要"""
+    if not tools:
+        return None
+    return _digest([convert_to_openai_tool(tool) for tool in tools])
+
+
+def schema_digest(schema: Any) -> Optional[str]:
+    if schema is None:
+        return None
+    if isinstance(schema, type) and issubclass(schema, BaseModel):
+        return _digest(
+            [f"{schema.__module__}.{schema.__qualname__}", schema.model_json_schema()]
+        )
+    return _digest(schema)
+
+
+ModelKey = tuple[str, str, Optional[float], Optional[str], Optional[str]]
+
+
+class ChatModelPool:
+    """对话模型客户端池
+
+    按 (服务, 模型, 温度, 绑定工具的 schema, 结构化输出的 schema) 复用模型实例，
+    bind_tools / with_structured_output 的结果一并缓存；同一服务的所有模型共用一组
+    httpx 同步、异步客户端，请求之间复用连接池和 keep-alive 连接，不再每轮对话重新建连。
+    绑定工具的模型按最近使用保留 max_size 个。
+    """
+
+    def __init__(
+        self,
+        providers: Optional[dict[str, Provider]] = None,
+        max_size: Optional[int] = None,
+    ):
+        self.providers = providers or default_providers()
+        self.max_size = max_size or chat_settings.model_pool_size
+        self._http_clients: dict[str, tuple[httpx.Client, httpx.AsyncClient]] = {}
+        self._models: OrderedDict[ModelKey, Runnable] = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _http_client(self, provider: str) -> tuple[httpx.Client, httpx.AsyncClient]:
+        clients = self._http_clients.get(provider)
+        if clients is None:
+            limits = httpx.Limits(
+                max_connections=chat_settings.http_max_connections,
+                max_keepalive_connections=chat_settings.http_max_connections,
+                keepalive_expiry=chat_settings.http_keepalive_expiry,
+            )
+            clients = self._http_clients[provider] = (
+                httpx.Client(limits=limits),
+                httpx.AsyncClient(limits=limits),
+            )
+        return clients
+
+    def get(
+        self,
+        provider: str,
+        model: str,
+        temperature: Optional[float] = None,
+        tools: Optional[Sequence] = None,
+        schema: Any = None,
+    ) -> Runnable[LanguageModelInput, BaseMessage] | BaseChatModel:
+        """获取模型，传入 tools 时返回绑定工具的模型，传入 schema 时返回结构化输出的模型"""
+        key = (
+            provider,
+            model,
+            temperature,
+            tools_digest(tools),
+            schema_digest(schema),
+        )
+        with self._lock:
+            runnable = self._models.get(key)
+            if runnable is not None:
+                self._models.move_to_end(key)
+                return runnable
+            base = self._base_model(provider, model, temperature)
+            if tools:
+                runnable = base.bind_tools(tools=tools)
+            elif schema is not None:
+                runnable = base.with_structured_output(schema)
+            else:
+                return base
+            self._models[key] = runnable
+            while len(self._models) > self.max_size:
+                self._evict()
+            return runnable
+
+    def _base_model(
+        self, provider: str, model: str, temperature: Optional[float]
+    ) -> BaseChatOpenAI:
+        key = (provider, model, temperature, None, None)
+        base = self._models.get(key)
+        if base is None:
+            config = self.providers[provider]
+            http_client, http_async_client = self._http_client(provider)
+            # 不指定温度时使用模型的默认值
+            options = {} if temperature is None else {"temperature": temperature}
+            base = BaseChatOpenAI(
+                model_name=model,
+                openai_api_base=config.base_url,
+                openai_api_key=config.api_key,
+                http_client=http_client,
+                http_async_client=http_async_client,
+                **options,
+            )
+            self._models[key] = base
+            logger.info(f"创建对话模型: {provider}/{model}, temperature={temperature}")
+        self._models.move_to_end(key)
+        return base
+
+    def _evict(self):
+        # 优先淘汰绑定工具或结构化输出的模型，基础模型创建成本高且数量少
+        for key in self._models:
+            if key[3] is not None or key[4] is not None:
+                del self._models[key]
+                return
+        self._models.popitem(last=False)
+
+    def close(self):
+        """关闭同步客户端的连接，异步客户端随事件循环结束释放"""
+        with self._lock:
+            for http_client, _ in self._http_clients.values():
+                http_client.close()
+            self._http_clients.clear()
+            self._models.clear()
+
+
+@cache
+def get_chat_model_pool() -> ChatModelPool:
+    """进程内共用的对话模型池"""
+    return ChatModelPool()
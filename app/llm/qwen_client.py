@@ -1,19 +1,14 @@
 from typing import Iterator, Union
 
-from langchain_openai.chat_models.base import BaseChatOpenAI
-
 from app.config.setting import settings
 from app.llm._llm_api_client import LLMClient
+from app.llm.model_pool import DASH_SCOPE, get_chat_model_pool
 
 
 class QwenClient(LLMClient):
 
     def __init__(self):
-        self.client = BaseChatOpenAI(
-            openai_api_key=settings.dash_scope_api_key,
-            model_name=settings.qwen_default_model,
-            openai_api_base="https://dashscope.aliyuncs.com/compatible-mode/v1",
-        )
+        self.client = get_chat_model_pool().get(DASH_SCOPE, settings.qwen_default_model)
 
     def text_chat(
         self, message: Union[str, list[str]], stream: bool = False
@@ -1,19 +1,17 @@
 from typing import Iterator, Union
 
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai.chat_models.base import BaseChatOpenAI
 
 from app.config.setting import settings
 from app.llm._llm_api_client import LLMClient
+from app.llm.model_pool import SILICON_FLOW, get_chat_model_pool
 
 
 class SiliconFlowClient(LLMClient):
 
     def __init__(self):
-        self.client = BaseChatOpenAI(
-            openai_api_key=settings.silicon_flow_api_key,
-            model_name=settings.silicon_flow_model,
-            openai_api_base="https://api.siliconflow.cn/v1",
+        self.client = get_chat_model_pool().get(
+            SILICON_FLOW, settings.silicon_flow_model
         )
 
     def text_chat(
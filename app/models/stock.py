@@ -1,4 +1,4 @@
-from sqlalchemy import BigInteger, Column, Date, Numeric, String
+from sqlalchemy import JSON, BigInteger, Column, Date, Numeric, String, UniqueConstraint
 
 from app.core.database import Base
 from app.utils.date import get_now_millis
@@ -8,6 +8,9 @@ class StockDaily(Base):
     """每日股票数据"""
 
     __tablename__ = "cn_stock_daily"
+    __table_args__ = (
+        UniqueConstraint("code", "trade_date", name="uk_stock_daily_code_date"),
+    )
 
     id = Column(BigInteger, primary_key=True, index=True)
     code = Column(String(10), index=True, nullable=False, comment="股票代码")
@@ -27,6 +30,11 @@ class StockLhb(Base):
     """龙虎榜数据"""
 
     __tablename__ = "cn_stock_lhb"
+    __table_args__ = (
+        UniqueConstraint(
+            "code", "trade_date", "reason", name="uk_stock_lhb_code_date_reason"
+        ),
+    )
 
     id = Column(BigInteger, primary_key=True, index=True)
     code = Column(String(10), index=True, nullable=False, comment="股票代码")
@@ -44,6 +52,17 @@ class StockBlockTrade(Base):
     """大宗交易数据"""
 
     __tablename__ = "cn_stock_block_trade"
+    __table_args__ = (
+        UniqueConstraint(
+            "code",
+            "trade_date",
+            "price",
+            "volume",
+            "buyer",
+            "seller",
+            name="uk_stock_block_trade_deal",
+        ),
+    )
 
     id = Column(BigInteger, primary_key=True, index=True)
     code = Column(String(10), index=True, nullable=False, comment="股票代码")
@@ -62,6 +81,9 @@ class StockIndicator(Base):
     """股票技术指标"""
 
     __tablename__ = "cn_stock_indicator"
+    __table_args__ = (
+        UniqueConstraint("code", "trade_date", name="uk_stock_indicator_code_date"),
+    )
 
     id = Column(BigInteger, primary_key=True, index=True)
     code = Column(String(10), index=True, nullable=False, comment="股票代码")
@@ -119,6 +141,28 @@ class StockIndicator(Base):
     created_at = Column(BigInteger, default=get_now_millis())
 
 
+class StockIndicatorState(Base):
+    """股票指标增量计算状态"""
+
+    __tablename__ = "cn_stock_indicator_state"
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    code = Column(String(10), unique=True, nullable=False, comment="股票代码")
+    trade_date = Column(Date, nullable=False, comment="状态对应的最后交易日期")
+    state = Column(JSON, nullable=False, comment="指标递推状态")
+    created_at = Column(BigInteger, default=get_now_millis())
+
+
+class TradeCalendarDay(Base):
+    """交易日历快照"""
+
+    __tablename__ = "cn_trade_calendar"
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    trade_date = Column(Date, unique=True, nullable=False, comment="交易日期")
+    created_at = Column(BigInteger, default=get_now_millis())
+
+
 class StockSignal(Base):
     """股票交易信号"""
 
@@ -132,3 +176,24 @@ class StockSignal(Base):
     signal_type = Column(String(10), nullable=False, comment="信号类型(buy/sell)")
     signal_desc = Column(String(200), comment="信号描述")
     created_at = Column(BigInteger, default=get_now_millis())
+
+
+class StockBackfillChunk(Base):
+    """历史日线回补的检查点，每只股票每个区间一条"""
+
+    __tablename__ = "cn_stock_backfill_chunk"
+    __table_args__ = (
+        UniqueConstraint(
+            "code", "start_date", "end_date", name="uk_stock_backfill_chunk"
+        ),
+    )
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    code = Column(String(10), nullable=False, comment="股票代码")
+    start_date = Column(Date, index=True, nullable=False, comment="区间开始日期")
+    end_date = Column(Date, nullable=False, comment="区间结束日期")
+    status = Column(String(10), nullable=False, comment="状态(done/empty/failed)")
+    rows = Column(BigInteger, comment="写入的行数")
+    error = Column(String(500), comment="失败原因")
+    updated_at = Column(BigInteger, comment="更新时间")
+    created_at = Column(BigInteger, default=get_now_millis())
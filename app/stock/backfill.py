@@ -0,0 +1,174 @@
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from functools import partial
+from typing import Any, Optional
+
+from app.config.stock import settings
+from app.stock.ingestion import DailyIngestionEngine, StockBars
+from app.stock.service import StockService
+from app.utils.date import SHORT_DATE_FORMAT, date_format, get_now_millis
+
+logger = logging.getLogger(__name__)
+
+DONE = "done"
+EMPTY = "empty"
+FAILED = "failed"
+# 重新运行时跳过的状态，失败的区间会重新抓取
+_FINISHED = {DONE, EMPTY}
+# 检查点失败原因的最大长度
+_ERROR_LENGTH = 500
+
+
+def month_ranges(
+    start_date: date, end_date: date, months: int = 1
+) -> list[tuple[date, date]]:
+    """把区间按自然月切分，每段 months 个月，首尾两段按区间截断"""
+    ranges = []
+    current = start_date
+    while current <= end_date:
+        month = current.month - 1 + months
+        next_start = date(current.year + month // 12, month % 12 + 1, 1)
+        ranges.append((current, min(next_start - timedelta(days=1), end_date)))
+        current = next_start
+    return ranges
+
+
+@dataclass
+class BackfillReport:
+    """一次回补的运行报告"""
+
+    start_date: date
+    end_date: date
+    chunks: int = 0
+    skipped: int = 0
+    done: int = 0
+    empty: int = 0
+    failed: dict[str, str] = field(default_factory=dict)
+    rows: int = 0
+    elapsed: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "start_date": date_format(self.start_date, SHORT_DATE_FORMAT),
+            "end_date": date_format(self.end_date, SHORT_DATE_FORMAT),
+            "chunks": self.chunks,
+            "skipped": self.skipped,
+            "done": self.done,
+            "empty": self.empty,
+            "failed": self.failed,
+            "rows": self.rows,
+            "elapsed": round(self.elapsed, 3),
+        }
+
+
+class DailyBackfillJob:
+    """可断点续跑的历史日线回补
+
+    区间按股票和月份切分为检查点(cn_stock_backfill_chunk)，逐段用抓取引擎并发下载；
+    每批数据写库后立即记录检查点，任务中断或部分失败后重新运行只抓取未完成的区间。
+    检查点以 (股票代码, 开始日期, 结束日期) 区分，结束日期变化的区间会重新抓取。
+    """
+
+    def __init__(
+        self,
+        service: StockService,
+        engine: Optional[DailyIngestionEngine] = None,
+        chunk_months: Optional[int] = None,
+    ):
+        self.service = service
+        self.datastore = service.datastore
+        self.engine = engine or DailyIngestionEngine(
+            max_workers=settings.backfill_max_workers
+        )
+        self.chunk_months = chunk_months or settings.backfill_chunk_months
+
+    def run(
+        self, start_date: date, end_date: date, codes: Optional[list[str]] = None
+    ) -> BackfillReport:
+        """回补 [start_date, end_date] 的日线，codes 为空时回补全部股票"""
+        report = BackfillReport(start_date=start_date, end_date=end_date)
+        started = time.perf_counter()
+        stocks = self.engine.list_stocks()
+        if codes:
+            stocks = stocks[stocks["code"].isin(codes)]
+        finished = self.datastore.get_backfill_chunks(start_date, end_date, codes)
+        for chunk_start, chunk_end in month_ranges(
+            start_date, end_date, self.chunk_months
+        ):
+            pending = stocks[
+                [
+                    finished.get((code, chunk_start, chunk_end)) not in _FINISHED
+                    for code in stocks["code"]
+                ]
+            ]
+            report.chunks += len(stocks)
+            report.skipped += len(stocks) - len(pending)
+            if pending.empty:
+                continue
+            result = self.engine.run(
+                pending,
+                chunk_start,
+                chunk_end,
+                partial(self._save, chunk_start, chunk_end),
+                batch_size=settings.ingestion_batch_size,
+            )
+            self._checkpoint(
+                chunk_start,
+                chunk_end,
+                [(code, EMPTY, 0, None) for code in result.empty]
+                + [
+                    (code, FAILED, 0, error[:_ERROR_LENGTH])
+                    for code, error in result.failed.items()
+                ],
+            )
+            report.done += len(result.succeeded)
+            report.empty += len(result.empty)
+            report.rows += result.rows
+            for code, error in result.failed.items():
+                report.failed[
+                    f"{code}:{date_format(chunk_start, SHORT_DATE_FORMAT)}"
+                ] = error
+        report.elapsed = time.perf_counter() - started
+        logger.info(f"历史日线回补完成: {report.to_dict()}")
+        return report
+
+    def _save(
+        self, start_date: date, end_date: date, batch: list[StockBars]
+    ) -> dict[str, int]:
+        # 写库成功后再记录检查点，写库失败的股票由抓取引擎记为失败
+        try:
+            written = self.service.save_daily_bars(batch)
+            self._checkpoint(
+                start_date,
+                end_date,
+                [(bars.code, DONE, written[bars.code], None) for bars in batch],
+            )
+            return written
+        except Exception:
+            # 回滚未提交的部分数据，避免随后续检查点一起提交
+            self.datastore.rollback()
+            raise
+
+    def _checkpoint(
+        self,
+        start_date: date,
+        end_date: date,
+        chunks: list[tuple[str, str, int, Optional[str]]],
+    ):
+        updated_at = get_now_millis()
+        self.datastore.save_backfill_chunks(
+            [
+                {
+                    "code": code,
+                    "start_date": start_date,
+                    "end_date": end_date,
+                    "status": status,
+                    "rows": rows,
+                    "error": error,
+                    "updated_at": updated_at,
+                }
+                for code, status, rows, error in chunks
+            ]
+        )
@@ -0,0 +1,218 @@
+import fcntl
+import logging
+import os
+from contextlib import contextmanager
+from datetime import date
+from functools import cache
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.config.stock import settings
+
+logger = logging.getLogger(__name__)
+
+# 每根日线一条定长记录，日期为 1970-01-01 起的天数
+BAR_DTYPE = np.dtype(
+    [
+        ("date", "<i8"),
+        ("open", "<f4"),
+        ("high", "<f4"),
+        ("low", "<f4"),
+        ("close", "<f4"),
+        ("volume", "<i8"),
+        ("amount", "<i8"),
+    ]
+)
+PRICE_FIELDS = ["open", "high", "low", "close"]
+BAR_FIELDS = [*PRICE_FIELDS, "volume", "amount"]
+
+
+def _to_days(values) -> np.ndarray:
+    return (
+        pd.to_datetime(pd.Series(values)).to_numpy().astype("datetime64[D]")
+    ).astype(np.int64)
+
+
+def _day(value: date) -> int:
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+
+class BarCache:
+    """按股票代码存放日线的本地缓存
+
+    每只股票一个定长记录文件({code}.bin)，记录按日期升序，读取时内存映射整个文件，
+    按日期列二分定位区间，返回的窗口是映射内存的切片，不复制数据。
+    文件只追加，只有已经从数据库重建过(rebuild)的股票才会追加，保证缓存的历史完整；
+    与 cn_stock_daily 的一致性由 StockService.sync_bar_cache 按 summary 比对。
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        # 代码到 (文件大小和修改时间, 映射) 的缓存，文件追加或重建后重新映射
+        self._maps: dict[str, tuple[tuple[int, int], np.ndarray]] = {}
+
+    def _path(self, code: str) -> str:
+        return os.path.join(self.root, f"{code}.bin")
+
+    def _name_path(self, code: str) -> str:
+        return os.path.join(self.root, f"{code}.name")
+
+    @contextmanager
+    def _locked(self, code: str) -> Iterator[None]:
+        # 锁加在单独的锁文件上，重建替换数据文件后锁仍然有效
+        with open(os.path.join(self.root, f"{code}.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def has(self, code: str) -> bool:
+        return os.path.exists(self._path(code))
+
+    def codes(self) -> list[str]:
+        return sorted(
+            name[:-4] for name in os.listdir(self.root) if name.endswith(".bin")
+        )
+
+    def bars(self, code: str) -> np.ndarray:
+        """股票全部日线的只读映射，没有缓存时为空数组"""
+        try:
+            stat = os.stat(self._path(code))
+        except FileNotFoundError:
+            return np.empty(0, dtype=BAR_DTYPE)
+        size, version = stat.st_size, (stat.st_size, stat.st_mtime_ns)
+        cached = self._maps.get(code)
+        if cached and cached[0] == version:
+            return cached[1]
+        if size == 0:
+            bars = np.empty(0, dtype=BAR_DTYPE)
+        else:
+            bars = np.memmap(
+                self._path(code),
+                dtype=BAR_DTYPE,
+                mode="r",
+                shape=(size // BAR_DTYPE.itemsize,),
+            )
+        self._maps[code] = (version, bars)
+        return bars
+
+    def window(
+        self,
+        code: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> np.ndarray:
+        """区间内(含首尾)的日线，为映射内存的切片"""
+        bars = self.bars(code)
+        days = bars["date"]
+        left = np.searchsorted(days, _day(start_date), "left") if start_date else 0
+        right = (
+            np.searchsorted(days, _day(end_date), "right") if end_date else len(bars)
+        )
+        return bars[left:right]
+
+    def frame(
+        self,
+        code: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> pd.DataFrame:
+        """区间内的日线 DataFrame，与 StockDatastore.get_stock_history_frame 的结果一致"""
+        bars = self.window(code, start_date, end_date)
+        index = pd.DatetimeIndex(
+            bars["date"].astype("datetime64[D]").astype("datetime64[ns]"),
+            name="trade_date",
+        )
+        data = {"code": np.full(len(bars), code, dtype=object)}
+        for field in BAR_FIELDS:
+            values = bars[field].astype(np.float64)
+            # float32 保存的两位小数价格还原为数据库中的值
+            data[field] = values.round(2) if field in PRICE_FIELDS else values
+        return pd.DataFrame(data, index=index)
+
+    def last_date(self, code: str) -> Optional[date]:
+        bars = self.bars(code)
+        if not len(bars):
+            return None
+        return np.datetime64(int(bars["date"][-1]), "D").astype(date)
+
+    def name(self, code: str) -> Optional[str]:
+        try:
+            with open(self._name_path(code), encoding="utf-8") as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _to_records(df: pd.DataFrame) -> np.ndarray:
+        records = np.zeros(len(df), dtype=BAR_DTYPE)
+        records["date"] = _to_days(df["trade_date"])
+        for field in BAR_FIELDS:
+            values = pd.to_numeric(df[field], errors="coerce").fillna(0)
+            records[field] = values.to_numpy()
+        records.sort(order="date")
+        return records
+
+    def _save_name(self, code: str, name: Optional[str]):
+        if name and name != self.name(code):
+            with open(self._name_path(code), "w", encoding="utf-8") as file:
+                file.write(name)
+
+    def append(self, code: str, df: pd.DataFrame, name: Optional[str] = None) -> int:
+        """追加晚于最后缓存日期的日线，没有建立缓存的股票不追加，返回追加条数"""
+        path = self._path(code)
+        if df.empty or not os.path.exists(path):
+            return 0
+        records = self._to_records(df)
+        # 持锁后再打开文件，保证写入的是重建后的当前文件
+        with self._locked(code):
+            if not os.path.exists(path):
+                return 0
+            with open(path, "ab") as file:
+                size = os.fstat(file.fileno()).st_size
+                if size:
+                    with open(path, "rb") as reader:
+                        reader.seek(size - BAR_DTYPE.itemsize)
+                        last = np.frombuffer(reader.read(), dtype=BAR_DTYPE)
+                    records = records[records["date"] > last["date"][0]]
+                file.write(records.tobytes())
+        self._save_name(code, name)
+        return len(records)
+
+    def append_frame(self, df: pd.DataFrame) -> int:
+        """按股票追加一批日线(抓取入库的数据)，返回追加条数"""
+        count = 0
+        for code, group in df.groupby("code", sort=False):
+            name = group["name"].iat[-1] if "name" in group else None
+            count += self.append(code, group, name)
+        return count
+
+    def rebuild(self, code: str, df: pd.DataFrame, name: Optional[str] = None):
+        """用数据库中的完整历史重建一只股票的缓存"""
+        path = self._path(code)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(self._to_records(df).tobytes())
+        # 与 append 互斥，避免追加写入被替换掉的旧文件
+        with self._locked(code):
+            os.replace(temp_path, path)
+        self._maps.pop(code, None)
+        self._save_name(code, name)
+
+    def summary(self, code: str) -> tuple[int, Optional[date], float]:
+        """条数、最后日期和收盘价之和，用于与数据库比对"""
+        bars = self.bars(code)
+        close = bars["close"].astype(np.float64).round(2)
+        return len(bars), self.last_date(code), round(float(close.sum()), 2)
+
+
+@cache
+def get_bar_cache() -> Optional[BarCache]:
+    """配置了缓存目录时返回日线缓存"""
+    if not settings.bar_cache_dir:
+        return None
+    return BarCache(settings.bar_cache_dir)
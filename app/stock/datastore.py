@@ -1,14 +1,199 @@
+import asyncio
+import logging
 from datetime import date
+from functools import cache
 from typing import Optional
 
-from sqlalchemy import select
+import pandas as pd
+from sqlalchemy import Integer, Numeric, Select, and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
+from app.config.stock import settings
 from app.core.database import Base
-from app.core.datastore import BaseDatastore
-from app.models.stock import StockBlockTrade, StockDaily, StockIndicator, StockLhb
+from app.core.datastore import AsyncBaseDatastore, BaseDatastore, float_columns
+from app.models.stock import (
+    StockBackfillChunk,
+    StockBlockTrade,
+    StockDaily,
+    StockIndicator,
+    StockIndicatorState,
+    StockLhb,
+    TradeCalendarDay,
+)
+from app.stock.bar_cache import BarCache, get_bar_cache
+from app.stock.parquet_store import (
+    MIRRORED_TABLES,
+    StockParquetStore,
+    get_parquet_store,
+    table_schema,
+)
+
+logger = logging.getLogger(__name__)
+
+# 按列读取的行情字段
+STOCK_PRICE_COLUMNS = [
+    StockDaily.open,
+    StockDaily.high,
+    StockDaily.low,
+    StockDaily.close,
+    StockDaily.volume,
+    StockDaily.amount,
+]
+
+# 按列读取的指标字段
+INDICATOR_VALUE_COLUMNS = [
+    column
+    for column in StockIndicator.__table__.columns
+    if column.key not in ("id", "code", "trade_date", "created_at")
+]
+
+
+def _history_with_indicators_query(
+    codes: Optional[str | list[str]],
+    start_date: Optional[date],
+    end_date: Optional[date],
+    fields: Optional[list[str]] = None,
+) -> Select:
+    """行情与指标按 (股票代码, 交易日期) 联表的查询，fields 为空时读取全部字段"""
+    columns = [
+        column
+        for column in STOCK_PRICE_COLUMNS + INDICATOR_VALUE_COLUMNS
+        if fields is None or column.key in fields
+    ]
+    query = (
+        select(
+            StockDaily.code,
+            StockDaily.name,
+            StockDaily.trade_date,
+            *float_columns(*columns),
+        )
+        .select_from(StockDaily)
+        .join(
+            StockIndicator,
+            and_(
+                StockIndicator.code == StockDaily.code,
+                StockIndicator.trade_date == StockDaily.trade_date,
+            ),
+        )
+    )
+    if isinstance(codes, str):
+        query = query.where(StockDaily.code == codes)
+    elif codes:
+        query = query.where(StockDaily.code.in_(codes))
+    if start_date:
+        query = query.where(StockDaily.trade_date >= start_date)
+    if end_date:
+        query = query.where(StockDaily.trade_date <= end_date)
+    return query.order_by(StockDaily.code, StockDaily.trade_date)
+
+
+def _selected_columns(fields: Optional[list[str]]) -> tuple[list[str], list[str]]:
+    """fields 中的行情字段和指标字段，fields 为空时为全部字段"""
+    return (
+        [c.key for c in STOCK_PRICE_COLUMNS if fields is None or c.key in fields],
+        [c.key for c in INDICATOR_VALUE_COLUMNS if fields is None or c.key in fields],
+    )
+
+
+def _mirror_ready(datastore, *models: type[Base]) -> bool:
+    """是否从镜像读取；镜像中还没有某张表时回退到数据库，避免读到空数据"""
+    if not datastore.read_mirror:
+        return False
+    missing = [model for model in models if not datastore.mirror.has_table(model)]
+    for model in missing:
+        _warn_missing_mirror(model.__tablename__)
+    return not missing
+
+
+@cache
+def _warn_missing_mirror(table_name: str):
+    # 每张表只提示一次，避免逐只股票读取时刷屏
+    logger.warning(
+        f"Parquet 镜像中没有{table_name}，从数据库读取，可通过 export_to_mirror 导出"
+    )
 
 
 class StockDatastore(BaseDatastore[Base]):
+    """股票数据访问
+
+    配置了 Parquet 镜像时，行情、指标、龙虎榜和大宗交易写库后同步写入镜像；
+    read_mirror 为 True 时历史行情和指标的按列读取改为读取镜像，不访问数据库，
+    镜像中还没有的表仍从数据库读取。
+    配置了日线缓存时，写入的日线同时追加到缓存。
+    """
+
+    def __init__(
+        self,
+        db_session: Session,
+        mirror: Optional[StockParquetStore] = None,
+        read_mirror: Optional[bool] = None,
+        bar_cache: Optional[BarCache] = None,
+    ):
+        super().__init__(db_session)
+        self.mirror = mirror if mirror is not None else get_parquet_store()
+        if read_mirror is None:
+            read_mirror = settings.parquet_read
+        self.read_mirror = self.mirror is not None and read_mirror
+        self.bar_cache = bar_cache if bar_cache is not None else get_bar_cache()
+
+    def bulk_insert_frame(
+        self,
+        model: type[Base],
+        df: pd.DataFrame,
+        column_map: Optional[dict[str, str]] = None,
+        batch_size: int = 1000,
+        index_elements: Optional[list[str]] = None,
+    ) -> int:
+        count = super().bulk_insert_frame(
+            model, df, column_map, batch_size, index_elements
+        )
+        if self.mirror is not None and model in MIRRORED_TABLES:
+            # 镜像写入失败不影响入库，可以通过 export_to_mirror 补齐
+            try:
+                self.mirror.write(model, df, column_map)
+            except Exception as e:
+                logger.exception(
+                    f"写入{model.__tablename__}的 Parquet 镜像失败: {str(e)}"
+                )
+        if self.bar_cache is not None and model is StockDaily:
+            # 缓存不一致时由一致性检查重建
+            try:
+                self.bar_cache.append_frame(
+                    df.rename(columns=column_map) if column_map else df
+                )
+            except Exception as e:
+                logger.exception(f"追加日线缓存失败: {str(e)}")
+        return count
+
+    def export_to_mirror(
+        self,
+        model: type[Base],
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> int:
+        """把数据库中区间内的数据写入 Parquet 镜像，用于初始化或补齐镜像"""
+        if self.mirror is None:
+            raise ValueError(
+                "Parquet mirror is not configured, set STOCK_PARQUET_DIR to export"
+            )
+        table = model.__table__
+        columns = [table.columns[name] for name in table_schema(model).names]
+        query = select(
+            *(
+                (
+                    float_columns(column)[0]
+                    if isinstance(column.type, (Numeric, Integer))
+                    else column
+                )
+                for column in columns
+            )
+        )
+        if start_date:
+            query = query.where(table.columns.trade_date >= start_date)
+        if end_date:
+            query = query.where(table.columns.trade_date <= end_date)
+        return self.mirror.write(model, self._fetch_frame(query))
 
     def get_stock_by_code_and_date(self, code: str, trade_date: date) -> StockDaily:
         """根据股票代码和日期获取数据"""
@@ -17,6 +202,17 @@ class StockDatastore(BaseDatastore[Base]):
         )
         return self._fetch_one(st)
 
+    def get_existing_trade_dates(
+        self, codes: list[str], start_date: date, end_date: date
+    ) -> set[tuple[str, date]]:
+        """批量获取已入库的 (股票代码, 交易日期)，用于写库前去重"""
+        st = select(StockDaily.code, StockDaily.trade_date).where(
+            StockDaily.code.in_(codes),
+            StockDaily.trade_date >= start_date,
+            StockDaily.trade_date <= end_date,
+        )
+        return {(code, trade_date) for code, trade_date in self._fetch_all(st, True)}
+
     def get_stocks_by_date(self, trade_date: date) -> list[StockDaily]:
         """获取某日所有股票数据"""
         st = select(StockDaily).where(StockDaily.trade_date == trade_date)
@@ -33,14 +229,83 @@ class StockDatastore(BaseDatastore[Base]):
         return self._fetch_all(st)
 
     def get_stock_history(
-        self, code: str, trade_date: Optional[date] = None
+        self,
+        code: str,
+        trade_date: Optional[date] = None,
+        end_date: Optional[date] = None,
     ) -> list[StockDaily]:
         """获取股票历史数据"""
         query = select(StockDaily).where(StockDaily.code == code)
         if trade_date:
             query = query.where(StockDaily.trade_date >= trade_date)
+        if end_date:
+            query = query.where(StockDaily.trade_date <= end_date)
         return self._fetch_all(query.order_by(StockDaily.trade_date))
 
+    def get_stock_history_frame(
+        self,
+        code: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> pd.DataFrame:
+        """按列读取股票历史行情，以交易日期为索引，价格与成交量均为 float64"""
+        if _mirror_ready(self, StockDaily):
+            return self.mirror.read_frame(
+                StockDaily,
+                ["code", "trade_date", *_selected_columns(None)[0]],
+                code,
+                start_date,
+                end_date,
+                index="trade_date",
+            )
+        query = select(
+            StockDaily.code,
+            StockDaily.trade_date,
+            *self._float_columns(*STOCK_PRICE_COLUMNS),
+        ).where(StockDaily.code == code)
+        if start_date:
+            query = query.where(StockDaily.trade_date >= start_date)
+        if end_date:
+            query = query.where(StockDaily.trade_date <= end_date)
+        return self._fetch_frame(query.order_by(StockDaily.trade_date), "trade_date")
+
+    def get_market_history(
+        self, start_date: date, end_date: date, codes: Optional[list[str]] = None
+    ) -> pd.DataFrame:
+        """一次查询获取全市场(或指定股票)区间内的行情，按股票、日期排序"""
+        if _mirror_ready(self, StockDaily):
+            return self.mirror.read_frame(
+                StockDaily,
+                ["code", "trade_date", "high", "low", "close", "volume"],
+                codes,
+                start_date,
+                end_date,
+            )
+        query = select(
+            StockDaily.code,
+            StockDaily.trade_date,
+            *self._float_columns(
+                StockDaily.high, StockDaily.low, StockDaily.close, StockDaily.volume
+            ),
+        ).where(StockDaily.trade_date >= start_date, StockDaily.trade_date <= end_date)
+        if codes:
+            query = query.where(StockDaily.code.in_(codes))
+        query = query.order_by(StockDaily.code, StockDaily.trade_date)
+        return self._fetch_frame(query)
+
+    def get_daily_summary(self, codes: Optional[list[str]] = None) -> pd.DataFrame:
+        """按股票汇总日线的条数、最后交易日期和收盘价之和，用于校验日线缓存"""
+        query = select(
+            StockDaily.code,
+            func.max(StockDaily.name).label("name"),
+            func.count().label("bar_count"),
+            func.max(StockDaily.trade_date).label("last_date"),
+            func.sum(StockDaily.close).label("close_sum"),
+        ).group_by(StockDaily.code)
+        if codes:
+            query = query.where(StockDaily.code.in_(codes))
+        return self._fetch_frame(query.order_by(StockDaily.code))
+
     def get_indicator(self, code: str, trade_date: date) -> StockIndicator:
         """获取股票指标数据"""
         st = select(StockIndicator).where(
@@ -61,3 +326,146 @@ class StockDatastore(BaseDatastore[Base]):
         if trade_date:
             query = query.where(StockIndicator.trade_date >= trade_date)
         return self._fetch_all(query.order_by(StockIndicator.trade_date))
+
+    def get_indicator_history_frame(
+        self,
+        code: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> pd.DataFrame:
+        """按列读取股票指标历史数据，以交易日期为索引，指标均为 float64"""
+        if _mirror_ready(self, StockIndicator):
+            return self.mirror.read_frame(
+                StockIndicator,
+                ["code", "trade_date", *_selected_columns(None)[1]],
+                code,
+                start_date,
+                end_date,
+                index="trade_date",
+            )
+        query = select(
+            StockIndicator.code,
+            StockIndicator.trade_date,
+            *self._float_columns(*INDICATOR_VALUE_COLUMNS),
+        ).where(StockIndicator.code == code)
+        if start_date:
+            query = query.where(StockIndicator.trade_date >= start_date)
+        if end_date:
+            query = query.where(StockIndicator.trade_date <= end_date)
+        return self._fetch_frame(
+            query.order_by(StockIndicator.trade_date), "trade_date"
+        )
+
+    def get_history_with_indicators(
+        self,
+        codes: Optional[str | list[str]] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        fields: Optional[list[str]] = None,
+        memory_map: bool = False,
+    ) -> pd.DataFrame:
+        """按 (股票代码, 交易日期) 联表读取行情和指标
+
+        codes 为空时读取全部股票，fields 限定读取的行情和指标字段，
+        结果为按股票、日期排序的长表，价格和指标均为 float64。
+        memory_map 只对镜像读取有效，参见 StockParquetStore.history_with_indicators。
+        """
+        if _mirror_ready(self, StockDaily, StockIndicator):
+            return self.mirror.history_with_indicators(
+                codes, start_date, end_date, *_selected_columns(fields), memory_map
+            )
+        return self._fetch_frame(
+            _history_with_indicators_query(codes, start_date, end_date, fields)
+        )
+
+    def get_indicator_state(self, code: str) -> StockIndicatorState:
+        """获取股票指标增量计算状态"""
+        st = select(StockIndicatorState).where(StockIndicatorState.code == code)
+        return self._fetch_one(st)
+
+    def get_indicator_states(self, codes: list[str]) -> list[StockIndicatorState]:
+        """批量获取股票指标增量计算状态"""
+        st = select(StockIndicatorState).where(StockIndicatorState.code.in_(codes))
+        return self._fetch_all(st)
+
+    def get_stock_codes(self) -> list[str]:
+        """已入库日线的全部股票代码"""
+        return list(self._fetch_all(select(StockDaily.code).distinct()))
+
+    def get_trade_days(self) -> list[date]:
+        """获取交易日历快照"""
+        st = select(TradeCalendarDay.trade_date).order_by(TradeCalendarDay.trade_date)
+        return list(self._fetch_all(st))
+
+    def save_trade_days(self, trade_days: list[date]) -> int:
+        """保存交易日历快照，已存在的日期跳过"""
+        return self.bulk_upsert(
+            TradeCalendarDay,
+            [{"trade_date": trade_date} for trade_date in trade_days],
+            index_elements=["trade_date"],
+            update_columns=[],
+        )
+
+    def get_backfill_chunks(
+        self, start_date: date, end_date: date, codes: Optional[list[str]] = None
+    ) -> dict[tuple[str, date, date], str]:
+        """区间内回补检查点的状态，键为 (股票代码, 开始日期, 结束日期)"""
+        st = select(
+            StockBackfillChunk.code,
+            StockBackfillChunk.start_date,
+            StockBackfillChunk.end_date,
+            StockBackfillChunk.status,
+        ).where(
+            StockBackfillChunk.start_date >= start_date,
+            StockBackfillChunk.end_date <= end_date,
+        )
+        if codes:
+            st = st.where(StockBackfillChunk.code.in_(codes))
+        return {
+            (code, start, end): status
+            for code, start, end, status in self._fetch_all(st, True)
+        }
+
+    def save_backfill_chunks(self, records: list[dict]) -> int:
+        """保存回补检查点，已存在的区间更新状态"""
+        return self.bulk_upsert(
+            StockBackfillChunk,
+            records,
+            index_elements=["code", "start_date", "end_date"],
+        )
+
+
+class AsyncStockDatastore(AsyncBaseDatastore[Base]):
+    """股票数据的异步访问，镜像读取在线程池中执行"""
+
+    def __init__(
+        self,
+        db_session: AsyncSession,
+        mirror: Optional[StockParquetStore] = None,
+        read_mirror: Optional[bool] = None,
+    ):
+        super().__init__(db_session)
+        self.mirror = mirror if mirror is not None else get_parquet_store()
+        if read_mirror is None:
+            read_mirror = settings.parquet_read
+        self.read_mirror = self.mirror is not None and read_mirror
+
+    async def get_history_with_indicators(
+        self,
+        codes: Optional[str | list[str]] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        fields: Optional[list[str]] = None,
+    ) -> pd.DataFrame:
+        """按 (股票代码, 交易日期) 联表读取行情和指标，参见 StockDatastore"""
+        if _mirror_ready(self, StockDaily, StockIndicator):
+            return await asyncio.to_thread(
+                self.mirror.history_with_indicators,
+                codes,
+                start_date,
+                end_date,
+                *_selected_columns(fields),
+            )
+        return await self._fetch_frame(
+            _history_with_indicators_query(codes, start_date, end_date, fields)
+        )
@@ -1,8 +1,10 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.stock.datastore import StockDatastore
+from app.stock.datastore import AsyncStockDatastore, StockDatastore
 from app.stock.indicator_service import StockIndicatorService
 from app.stock.service import StockService
+from app.stock.signal_service import SignalService
 
 
 def det_stock_datastore(db_session: Session) -> StockDatastore:
@@ -15,3 +17,7 @@ def get_stock_service(db_session: Session) -> StockService:
 
 def get_stock_indicator_service(db_session: Session) -> StockIndicatorService:
     return StockIndicatorService(datastore=det_stock_datastore(db_session))
+
+
+def get_signal_service(db_session: AsyncSession) -> SignalService:
+    return SignalService(datastore=AsyncStockDatastore(db_session))
@@ -1,11 +1,12 @@
 import logging
-from datetime import date
+from datetime import date, timedelta
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 
 from app.core.service import BaseService
-from app.models.stock import StockIndicator
+from app.models.stock import StockIndicator, StockIndicatorState
 from app.stock.datastore import StockDatastore
 from app.utils.data_frame import df_process
 from app.utils.date import date_parse
@@ -19,9 +20,47 @@ from app.utils.indicator import (
     calculate_rsi,
     calculate_trix,
 )
+from app.utils.indicator_matrix import calculate_indicator_matrix
+from app.utils.indicator_stream import IndicatorState
 
 logger = logging.getLogger(__name__)
 
+# 计算指标时向前取的历史天数
+INDICATOR_HISTORY_DAYS = 120
+
+# 写入 cn_stock_indicator 的指标字段
+INDICATOR_COLUMNS = [
+    "ma5",
+    "ma10",
+    "ma20",
+    "ma30",
+    "ma60",
+    "diff",
+    "dea",
+    "macd",
+    "k",
+    "d",
+    "j",
+    "rsi6",
+    "rsi12",
+    "rsi24",
+    "boll_up",
+    "boll_mid",
+    "boll_down",
+    "vma5",
+    "vma10",
+    "vma20",
+    # "pdi",
+    # "mdi",
+    # "adx",
+    # "adxr",
+    "trix",
+    # "matrix",
+    "cci",
+    "dma",
+    "ama",
+]
+
 
 class StockIndicatorService(BaseService[StockDatastore, StockIndicator]):
     """指标计算服务"""
@@ -37,137 +76,247 @@ class StockIndicatorService(BaseService[StockDatastore, StockIndicator]):
             logger.info(f"股票{code}的技术指标已存在，跳过计算")
             return
         # 获取前120天的数据用于计算指标
-        start_date = date_parse(current_date).shift(days=-120).format("YYYY-MM-DD")
+        start_date = date_parse(current_date).shift(days=-INDICATOR_HISTORY_DAYS).date()
         try:
             # 获取历史数据
             df = self._get_history_data(code, start_date)
             if df.empty:
                 return
 
-            # 计算均线 已验证
-            ma_periods = [5, 10, 20, 30, 60]
-            new_pd = pd.DataFrame()
-
-            for period in ma_periods:
-                new_pd[f"ma{period}"] = calculate_ma(df["close"], period)
-
-            # 计算MACD 已验证
-            diff, dea, macd = calculate_macd(df["close"])
-            new_pd["diff"] = diff
-            new_pd["dea"] = dea
-            new_pd["macd"] = macd
-
-            # 计算KDJ 已验证
-            k, d, j = calculate_kdj(df["high"], df["low"], df["close"])
-            new_pd["k"] = k
-            new_pd["d"] = d
-            new_pd["j"] = j
-
-            # 计算RSI
-            new_pd["rsi6"] = calculate_rsi(df["close"], 6)  # 已验证
-            new_pd["rsi12"] = calculate_rsi(df["close"], 12)
-            new_pd["rsi24"] = calculate_rsi(df["close"], 24)
-
-            # 计算布林带 已验证
-            up, mid, down = calculate_boll(df["close"])
-            new_pd["boll_up"] = up
-            new_pd["boll_mid"] = mid
-            new_pd["boll_down"] = down
-
-            # 计算成交量均线 已验证
-            for period in [5, 10, 20]:
-                new_pd[f"vma{period}"] = calculate_ma(df["volume"], period)
-
-            # 计算DMI
-            # pdi, mdi, adx, adxr = calculate_dmi(df["high"], df["low"], df["close"])
-            # new_pd["pdi"] = pdi
-            # new_pd["mdi"] = mdi
-            # new_pd["adx"] = adx
-            # new_pd["adxr"] = adxr
-
-            # 计算TRIX
-            trix, matrix = calculate_trix(df["close"])
-            new_pd["trix"] = trix
-            new_pd["matrix"] = matrix
-
-            # 计算CCI 已验证
-            new_pd["cci"] = calculate_cci(df["high"], df["low"], df["close"])
-
-            # 计算DMA 已验证
-            dma, ama = calculate_dma(df["close"])
-            new_pd["dma"] = dma
-            new_pd["ama"] = ama
-
-            new_pd = df_process(new_pd, format_nan=True)
-
-            # 只获取指定日期的数据
-            row = new_pd.loc[pd.to_datetime(current_date)]
-
-            if pd.isna(row["ma60"]):  # 数据不足则跳过
-                return
-            # 创建单个指标记录
-            indicator = StockIndicator(
-                code=code,
-                trade_date=current_date,
-                ma5=row["ma5"],
-                ma10=row["ma10"],
-                ma20=row["ma20"],
-                ma30=row["ma30"],
-                ma60=row["ma60"],
-                diff=row["diff"],
-                dea=row["dea"],
-                macd=row["macd"],
-                k=row["k"],
-                d=row["d"],
-                j=row["j"],
-                rsi6=row["rsi6"],
-                rsi12=row["rsi12"],
-                rsi24=row["rsi24"],
-                boll_up=row["boll_up"],
-                boll_mid=row["boll_mid"],
-                boll_down=row["boll_down"],
-                vma5=row["vma5"],
-                vma10=row["vma10"],
-                vma20=row["vma20"],
-                # pdi=row["pdi"],
-                # mdi=row["mdi"],
-                # adx=row["adx"],
-                # adxr=row["adxr"],
-                trix=row["trix"],
-                # matrix=row["matrix"],
-                cci=row["cci"],
-                dma=row["dma"],
-                ama=row["ama"],
-            )
-            # 保存单个指标记录
-            self.datastore.upsert(indicator)
+            new_pd = self._compute_indicators(df)
+
+            # 只获取指定日期的数据，数据不足则跳过
+            new_pd = new_pd[new_pd.index == pd.to_datetime(current_date)]
+            self._save_indicators(code, new_pd)
 
         except Exception as e:
             logger.exception(f"计算股票{code}指标失败: {str(e)}")
 
-    def _get_history_data(
-        self, code: str, start_date: Optional[str] = None
-    ) -> pd.DataFrame:
-        """获取历史数据"""
-        stocks = self.datastore.get_stock_history(code, start_date)
-        if not stocks:
-            return pd.DataFrame()
-
-        # 转换为DataFrame
-        data = []
-        for stock in stocks:
-            data.append(
-                {
-                    "code": stock.code,
-                    "open": float(stock.open),
-                    "high": float(stock.high),
-                    "low": float(stock.low),
-                    "close": float(stock.close),
-                    "volume": stock.volume,
-                    "amount": stock.amount,
-                }
+    def update_indicators(self, code: str, current_date: date) -> None:
+        """基于持久化的递推状态增量计算当日技术指标
+
+        已有更早的状态时只读取状态之后的K线向前推进；没有状态时用前120天的数据重建。
+        """
+        logger.info(f"开始增量计算股票{code}的技术指标")
+        try:
+            self.update_indicators_batch([code], current_date)
+        except Exception as e:
+            logger.exception(f"增量计算股票{code}指标失败: {str(e)}")
+
+    def update_indicators_batch(self, codes: list[str], current_date: date) -> int:
+        """批量增量计算一组股票的当日技术指标
+
+        一次查询取出所有状态和所需K线，逐只股票推进状态后，指标和状态各一次批量写入。
+        返回写入的指标记录数。
+        """
+        states = {
+            saved.code: saved for saved in self.datastore.get_indicator_states(codes)
+        }
+        rebuild_date = (
+            date_parse(current_date).shift(days=-INDICATOR_HISTORY_DAYS).date()
+        )
+        start_dates = {}
+        for code in codes:
+            saved = states.get(code)
+            if saved and saved.trade_date < current_date:
+                start_dates[code] = saved.trade_date + timedelta(days=1)
+            else:
+                start_dates[code] = rebuild_date
+        df = self.datastore.get_market_history(
+            min(start_dates.values()), current_date, codes
+        )
+
+        rows, new_states = [], []
+        for code, bars in df.groupby("code", sort=False):
+            bars = bars[bars["trade_date"] >= pd.Timestamp(start_dates[code])]
+            if bars.empty:
+                continue
+            saved = states.get(code)
+            if saved and saved.trade_date < current_date:
+                state = IndicatorState(saved.state)
+            else:
+                state = IndicatorState()
+            for bar in bars.itertuples():
+                values = state.update(bar.high, bar.low, bar.close, bar.volume)
+            last_date = bars["trade_date"].iloc[-1].date()
+            if last_date == current_date:
+                rows.append({"code": code, **values})
+            # 只保存向前推进的状态，重算历史日期不覆盖最新状态
+            if saved is None or saved.trade_date < last_date:
+                new_states.append(
+                    {"code": code, "trade_date": last_date, "state": state.to_dict()}
+                )
+
+        count = 0
+        new_pd = pd.DataFrame(rows, columns=["code", *INDICATOR_COLUMNS])
+        new_pd = new_pd[new_pd["ma60"].notna()]
+        if not new_pd.empty:
+            new_pd = df_process(new_pd, format_nan=True).assign(trade_date=current_date)
+            count = self.datastore.bulk_insert_frame(
+                StockIndicator,
+                new_pd[["code", "trade_date", *INDICATOR_COLUMNS]],
+                index_elements=["code", "trade_date"],
+            )
+        if new_states:
+            self.datastore.bulk_upsert(
+                StockIndicatorState, new_states, index_elements=["code"]
             )
+        logger.info(f"增量计算{len(codes)}只股票{current_date}指标{count}条")
+        return count
+
+    def calculate_indicator_range(
+        self, code: str, start_date: date, end_date: date
+    ) -> int:
+        """计算区间内每个交易日的技术指标
+
+        整段历史只计算一次指标，再把区间内所有交易日的结果一次批量写入，
+        用于历史回补，避免逐日重复计算。返回写入的记录数。
+        """
+        history_start = date_parse(start_date).shift(days=-INDICATOR_HISTORY_DAYS)
+        df = self._get_history_data(code, history_start.date(), end_date)
+        if df.empty:
+            return 0
+
+        new_pd = self._compute_indicators(df)
+        new_pd = new_pd[
+            (new_pd.index >= pd.to_datetime(start_date))
+            & (new_pd.index <= pd.to_datetime(end_date))
+        ]
+        count = self._save_indicators(code, new_pd)
+        logger.info(f"股票{code}计算{start_date}至{end_date}指标{count}条")
+        return count
+
+    def calculate_market_indicators(
+        self, current_date: date, codes: Optional[list[str]] = None
+    ) -> int:
+        """截面批量计算当日全市场(或指定股票)的技术指标
 
-        df = pd.DataFrame(data)
-        df.index = pd.to_datetime([stock.trade_date for stock in stocks])
-        return df.sort_index()
+        一次查询取出所有股票的历史行情，按K线位置对齐成 (K线 × 股票) 矩阵后统一计算，
+        结果一次批量写入。返回写入的记录数。
+        """
+        start_date = date_parse(current_date).shift(days=-INDICATOR_HISTORY_DAYS)
+        df = self.datastore.get_market_history(start_date.date(), current_date, codes)
+        # 只计算当日有行情的股票
+        current = df["trade_date"] == pd.Timestamp(current_date)
+        df = df[df["code"].isin(df.loc[current, "code"])]
+        if df.empty:
+            return 0
+
+        matrix, columns = self._to_bar_matrix(df, ["high", "low", "close", "volume"])
+        result = calculate_indicator_matrix(
+            matrix["high"], matrix["low"], matrix["close"], matrix["volume"]
+        )
+        new_pd = pd.DataFrame({name: values[-1] for name, values in result.items()})
+        new_pd = new_pd.assign(code=columns)
+        new_pd = new_pd[new_pd["ma60"].notna()]
+        if new_pd.empty:
+            return 0
+        new_pd = df_process(new_pd, format_nan=True).assign(trade_date=current_date)
+        count = self.datastore.bulk_insert_frame(
+            StockIndicator,
+            new_pd[["code", "trade_date", *INDICATOR_COLUMNS]],
+            index_elements=["code", "trade_date"],
+        )
+        logger.info(f"截面计算{current_date}指标{count}条")
+        return count
+
+    @classmethod
+    def _to_bar_matrix(
+        cls, df: pd.DataFrame, fields: list[str]
+    ) -> tuple[dict[str, np.ndarray], np.ndarray]:
+        """长表转为按K线位置右对齐的 (K线 × 股票) 矩阵
+
+        每只股票的最后一根K线位于最后一行，历史较短的股票在前面补 NaN，
+        与逐只股票用自身K线序列计算的结果一致。df 需按股票、日期排序。
+        """
+        codes, column = np.unique(df["code"].to_numpy(), return_inverse=True)
+        position = df.groupby("code", sort=False).cumcount(ascending=False).to_numpy()
+        length = position.max() + 1
+        row = length - 1 - position
+        matrix = {}
+        for field in fields:
+            values = np.full((length, len(codes)), np.nan)
+            values[row, column] = df[field].to_numpy(dtype=np.float64)
+            matrix[field] = values
+        return matrix, codes
+
+    def _save_indicators(self, code: str, new_pd: pd.DataFrame) -> int:
+        """保存指标，数据不足(60日均线为空)的交易日跳过"""
+        new_pd = new_pd[new_pd["ma60"].notna()]
+        if new_pd.empty:
+            return 0
+        new_pd = df_process(new_pd[INDICATOR_COLUMNS], format_nan=True)
+        new_pd = new_pd.assign(code=code, trade_date=new_pd.index.date)
+        return self.datastore.bulk_insert_frame(
+            StockIndicator, new_pd, index_elements=["code", "trade_date"]
+        )
+
+    @classmethod
+    def _compute_indicators(cls, df: pd.DataFrame) -> pd.DataFrame:
+        """基于完整行情序列计算全部技术指标，索引与 df 一致"""
+        # 计算均线 已验证
+        ma_periods = [5, 10, 20, 30, 60]
+        new_pd = pd.DataFrame(index=df.index)
+
+        for period in ma_periods:
+            new_pd[f"ma{period}"] = calculate_ma(df["close"], period)
+
+        # 计算MACD 已验证
+        diff, dea, macd = calculate_macd(df["close"])
+        new_pd["diff"] = diff
+        new_pd["dea"] = dea
+        new_pd["macd"] = macd
+
+        # 计算KDJ 已验证
+        k, d, j = calculate_kdj(df["high"], df["low"], df["close"])
+        new_pd["k"] = k
+        new_pd["d"] = d
+        new_pd["j"] = j
+
+        # 计算RSI
+        new_pd["rsi6"] = calculate_rsi(df["close"], 6)  # 已验证
+        new_pd["rsi12"] = calculate_rsi(df["close"], 12)
+        new_pd["rsi24"] = calculate_rsi(df["close"], 24)
+
+        # 计算布林带 已验证
+        up, mid, down = calculate_boll(df["close"])
+        new_pd["boll_up"] = up
+        new_pd["boll_mid"] = mid
+        new_pd["boll_down"] = down
+
+        # 计算成交量均线 已验证
+        for period in [5, 10, 20]:
+            new_pd[f"vma{period}"] = calculate_ma(df["volume"], period)
+
+        # 计算DMI
+        # pdi, mdi, adx, adxr = calculate_dmi(df["high"], df["low"], df["close"])
+        # new_pd["pdi"] = pdi
+        # new_pd["mdi"] = mdi
+        # new_pd["adx"] = adx
+        # new_pd["adxr"] = adxr
+
+        # 计算TRIX
+        trix, matrix = calculate_trix(df["close"])
+        new_pd["trix"] = trix
+        new_pd["matrix"] = matrix
+
+        # 计算CCI 已验证
+        new_pd["cci"] = calculate_cci(df["high"], df["low"], df["close"])
+
+        # 计算DMA 已验证
+        dma, ama = calculate_dma(df["close"])
+        new_pd["dma"] = dma
+        new_pd["ama"] = ama
+        return new_pd
+
+    def _get_history_data(
+        self,
+        code: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> pd.DataFrame:
+        """获取历史数据，以交易日期为索引，优先读取本地日线缓存"""
+        bar_cache = self.datastore.bar_cache
+        if bar_cache is not None and bar_cache.has(code):
+            return bar_cache.frame(code, start_date, end_date)
+        return self.datastore.get_stock_history_frame(code, start_date, end_date)
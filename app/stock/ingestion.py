@@ -0,0 +1,219 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import date
+from types import ModuleType
+from typing import Any, Callable, Optional
+
+import akshare as ak
+import pandas as pd
+
+from app.config.stock import settings
+from app.utils.date import SHORT_DATE_FORMAT, date_format
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """令牌桶限流器，线程安全"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """获取一个令牌，令牌不足时阻塞等待"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated_at) * self.rate
+                )
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_rate_limiters: dict[str, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(source_name: str, rate: float) -> RateLimiter:
+    """按数据源获取共享的限流器，同一进程内访问同一数据源的任务共用一个令牌桶"""
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(source_name)
+        if limiter is None or limiter.rate != rate:
+            limiter = RateLimiter(rate)
+            _rate_limiters[source_name] = limiter
+        return limiter
+
+
+@dataclass
+class StockBars:
+    """单只股票抓取到的行情数据"""
+
+    code: str
+    name: str
+    data: pd.DataFrame
+
+
+@dataclass
+class IngestionReport:
+    """一次抓取的运行报告"""
+
+    start_date: date
+    end_date: Optional[date]
+    succeeded: list[str] = field(default_factory=list)
+    empty: list[str] = field(default_factory=list)
+    failed: dict[str, str] = field(default_factory=dict)
+    rows: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def total(self) -> int:
+        return len(self.succeeded) + len(self.empty) + len(self.failed)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "start_date": date_format(self.start_date, SHORT_DATE_FORMAT),
+            "end_date": (
+                date_format(self.end_date, SHORT_DATE_FORMAT) if self.end_date else None
+            ),
+            "total": self.total,
+            "succeeded": len(self.succeeded),
+            "empty": len(self.empty),
+            "failed": self.failed,
+            "rows": self.rows,
+            "elapsed": round(self.elapsed, 3),
+        }
+
+
+class DailyIngestionEngine:
+    """全市场日线并发抓取引擎
+
+    数据下载在有界线程池中并发执行，并按数据源限流、失败按指数退避重试；
+    写库回调在调用线程中串行执行，数据库会话不会跨线程使用；
+    回调每次收到 batch_size 只股票的数据，便于批量写库。
+    单只股票失败只记录到运行报告中，不会中断整个抓取。
+    """
+
+    def __init__(
+        self,
+        source: ModuleType | Any = ak,
+        source_name: str = "akshare",
+        max_workers: Optional[int] = None,
+        rate_limit: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        retry_backoff: Optional[float] = None,
+    ):
+        self.source = source
+        self.max_workers = max_workers or settings.ingestion_max_workers
+        self.max_retries = (
+            settings.ingestion_max_retries if max_retries is None else max_retries
+        )
+        self.retry_backoff = (
+            settings.ingestion_retry_backoff if retry_backoff is None else retry_backoff
+        )
+        self.rate_limiter = get_rate_limiter(
+            source_name,
+            settings.ingestion_rate_limit if rate_limit is None else rate_limit,
+        )
+
+    def list_stocks(self) -> pd.DataFrame:
+        """获取A股股票列表，包含 code、name 两列"""
+        self.rate_limiter.acquire()
+        return self.source.stock_info_a_code_name()
+
+    def fetch(
+        self, code: str, start_date: date, end_date: Optional[date]
+    ) -> pd.DataFrame:
+        """获取单只股票日线数据，失败按指数退避重试"""
+        start_date_str = date_format(start_date, SHORT_DATE_FORMAT)
+        end_date_str = (
+            date_format(end_date, SHORT_DATE_FORMAT) if end_date else start_date_str
+        )
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            try:
+                return self.source.stock_zh_a_hist(
+                    symbol=code,
+                    period="daily",
+                    start_date=start_date_str,
+                    end_date=end_date_str,
+                )
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                delay = self.retry_backoff * 2 ** (attempt - 1)
+                logger.warning(
+                    f"获取股票{code}数据失败，{delay:.2f}秒后第{attempt}次重试: {str(e)}"
+                )
+                time.sleep(delay)
+
+    def run(
+        self,
+        stocks: pd.DataFrame,
+        start_date: date,
+        end_date: Optional[date],
+        handler: Callable[[list[StockBars]], dict[str, int]],
+        batch_size: int = 1,
+    ) -> IngestionReport:
+        """并发抓取 stocks 中的所有股票，数据按 batch_size 只一批交给 handler 处理
+
+        handler 返回每只股票实际写入的行数，计入报告的 rows；
+        handler 抛出异常时，该批次内的股票全部记为失败。
+        """
+        report = IngestionReport(start_date=start_date, end_date=end_date)
+        started = time.perf_counter()
+        batch: list[StockBars] = []
+
+        def flush():
+            if not batch:
+                return
+            try:
+                written = handler(list(batch))
+                report.succeeded.extend(bars.code for bars in batch)
+                report.rows += sum(written.values())
+            except Exception as e:
+                logger.exception(f"保存股票数据失败:{str(e)}")
+                for bars in batch:
+                    report.failed[bars.code] = str(e)
+            batch.clear()
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="ingestion"
+        ) as executor:
+            futures = {
+                executor.submit(self.fetch, code, start_date, end_date): (code, name)
+                for code, name in zip(stocks["code"], stocks["name"])
+            }
+            for future in as_completed(futures):
+                code, name = futures[future]
+                try:
+                    df = future.result()
+                except Exception as e:
+                    logger.exception(f"获取股票{code}数据失败:{str(e)}")
+                    report.failed[code] = str(e)
+                    continue
+                if df is None or df.empty:
+                    report.empty.append(code)
+                    continue
+                batch.append(StockBars(code=code, name=name, data=df))
+                if len(batch) >= batch_size:
+                    flush()
+            flush()
+        report.elapsed = time.perf_counter() - started
+        logger.info(f"日线抓取完成: {report.to_dict()}")
+        return report
@@ -3,6 +3,8 @@ from typing import Literal
 import akshare as ak
 from langchain_core.tools import tool
 
+from app.tools.akshare_cache import akshare_call
+
 
 @tool
 def stock_lhb_hyyyb_em(start_date: str = "20220324", end_date: str = "20220324"):
@@ -12,7 +14,9 @@ def stock_lhb_hyyyb_em(start_date: str = "20220324", end_date: str = "20220324")
     :param end_date:
     :return:
     """
-    return ak.stock_lhb_hyyyb_em(start_date, end_date).to_markdown(floatfmt=".2f")
+    return akshare_call(ak.stock_lhb_hyyyb_em, start_date, end_date).to_markdown(
+        floatfmt=".2f"
+    )
 
 
 @tool
@@ -22,7 +26,7 @@ def stock_lhb_jgstatistic_em(period: Literal["近一月", "近三月", "近六
     :param period:
     :return:
     """
-    return ak.stock_lhb_jgstatistic_em(period).to_markdown(floatfmt=".2f")
+    return akshare_call(ak.stock_lhb_jgstatistic_em, period).to_markdown(floatfmt=".2f")
 
 
 @tool
@@ -34,7 +38,9 @@ def stock_lhb_stock_statistic_em(
     :param period:
     :return:
     """
-    return ak.stock_lhb_stock_statistic_em(period).to_markdown(floatfmt=".2f")
+    return akshare_call(ak.stock_lhb_stock_statistic_em, period).to_markdown(
+        floatfmt=".2f"
+    )
 
 
 @tool
@@ -45,7 +51,7 @@ def stock_lhb_detail_em(start_date: str = "20230403", end_date: str = "20230417"
     :param end_date:
     :return:
     """
-    df = ak.stock_lhb_detail_em(start_date, end_date)
+    df = akshare_call(ak.stock_lhb_detail_em, start_date, end_date)
     return df.drop(["序号"], axis=1).to_markdown(floatfmt=".2f")
 
 
@@ -57,4 +63,6 @@ def stock_lhb_jgmmtj_em(start_date: str = "20240417", end_date: str = "20240430"
     :param end_date:
     :return:
     """
-    return ak.stock_lhb_jgmmtj_em(start_date, end_date).to_markdown(floatfmt=".2f")
+    return akshare_call(ak.stock_lhb_jgmmtj_em, start_date, end_date).to_markdown(
+        floatfmt=".2f"
+    )
@@ -0,0 +1,329 @@
+import fcntl
+import hashlib
+import logging
+import os
+from contextlib import contextmanager
+from datetime import date
+from functools import cache
+from typing import Iterator, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from sqlalchemy import Date, Integer, Numeric
+
+from app.config.stock import settings
+from app.core.database import Base
+from app.models.stock import StockBlockTrade, StockDaily, StockIndicator, StockLhb
+
+logger = logging.getLogger(__name__)
+
+# 镜像的表及去重键：行情和指标按 (股票代码, 交易日期) 覆盖，
+# 龙虎榜和大宗交易每次抓取整日数据，按交易日期整日覆盖
+MIRRORED_TABLES: dict[type[Base], list[str]] = {
+    StockDaily: ["code", "trade_date"],
+    StockIndicator: ["code", "trade_date"],
+    StockLhb: ["trade_date"],
+    StockBlockTrade: ["trade_date"],
+}
+
+# 不写入镜像的字段
+_SKIP_COLUMNS = ("id", "created_at")
+_PARTITIONING = ds.partitioning(pa.schema([("month", pa.string())]), flavor="hive")
+_DATA_FILE = "data.parquet"
+_ROW_GROUP_SIZE = 64 * 1024
+# 内存映射缓存保留的文件数
+_CACHE_SIZE = 8
+
+
+def _arrow_type(column) -> pa.DataType:
+    if isinstance(column.type, Date):
+        return pa.date32()
+    if isinstance(column.type, (Numeric, Integer)):
+        return pa.float64()
+    return pa.string()
+
+
+@cache
+def table_schema(model: type[Base]) -> pa.Schema:
+    """镜像文件的 schema，数值字段统一为 float64，与按列读取数据库的结果一致"""
+    return pa.schema(
+        [
+            pa.field(column.key, _arrow_type(column))
+            for column in model.__table__.columns
+            if column.key not in _SKIP_COLUMNS
+        ]
+    )
+
+
+class StockParquetStore:
+    """行情、指标、龙虎榜和大宗交易的 Parquet 列式镜像
+
+    每张表一个目录，按交易月份以 hive 方式分区(month=YYYY-MM)，每个分区一个文件，
+    文件内按股票代码、交易日期排序，读取时按列投影，交易日期和股票代码的条件下推到分区和行组。
+    写入按分区合并后原子替换，分区文件锁保证多个进程(抓取、指标任务)同时写入时不丢数据。
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _table_dir(self, model: type[Base]) -> str:
+        return os.path.join(self.root, model.__tablename__)
+
+    def has_table(self, model: type[Base]) -> bool:
+        """镜像中是否已有该表，未写入或未导出过的表没有目录"""
+        return os.path.isdir(self._table_dir(model))
+
+    def _to_table(self, model: type[Base], df: pd.DataFrame) -> pa.Table:
+        schema = table_schema(model)
+        columns = model.__table__.columns
+        arrays = []
+        for field in schema:
+            if field.name not in df:
+                arrays.append(pa.nulls(len(df), field.type))
+                continue
+            values = df[field.name]
+            if field.type == pa.date32():
+                values = pd.to_datetime(values).dt.date
+            elif field.type == pa.float64():
+                values = pd.to_numeric(values, errors="coerce").astype("float64")
+                scale = getattr(columns[field.name].type, "scale", None)
+                if scale is not None:
+                    # 与数据库 Numeric 字段的精度保持一致
+                    values = values.round(scale)
+            else:
+                values = values.astype(object).where(values.notna(), None)
+            arrays.append(pa.array(values, field.type, from_pandas=True))
+        return pa.Table.from_arrays(arrays, schema=schema)
+
+    @contextmanager
+    def _locked(self, directory: str) -> Iterator[None]:
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def write(
+        self,
+        model: type[Base],
+        df: pd.DataFrame,
+        column_map: Optional[dict[str, str]] = None,
+    ) -> int:
+        """增量写入，按去重键覆盖已有数据，返回写入的行数"""
+        if df.empty:
+            return 0
+        if column_map:
+            df = df.rename(columns=column_map)
+        table = self._to_table(model, df)
+        keys = MIRRORED_TABLES[model]
+        months = pc.strftime(
+            table["trade_date"].cast(pa.timestamp("s")), format="%Y-%m"
+        )
+        for month in pc.unique(months).to_pylist():
+            part = table.filter(pc.equal(months, month))
+            directory = os.path.join(self._table_dir(model), f"month={month}")
+            with self._locked(directory):
+                self._merge_partition(directory, part, keys)
+        return table.num_rows
+
+    @staticmethod
+    def _merge_partition(directory: str, part: pa.Table, keys: list[str]):
+        path = os.path.join(directory, _DATA_FILE)
+        if os.path.exists(path):
+            existing = pq.read_table(path, schema=part.schema)
+            # 去掉与新数据去重键相同的旧行
+            existing = existing.join(
+                part.select(keys).group_by(keys).aggregate([]),
+                keys=keys,
+                join_type="left anti",
+            )
+            part = pa.concat_tables([existing.select(part.schema.names), part])
+        part = part.sort_by([("code", "ascending"), ("trade_date", "ascending")])
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        pq.write_table(
+            part, temp_path, row_group_size=_ROW_GROUP_SIZE, compression="zstd"
+        )
+        os.replace(temp_path, path)
+
+    def read(
+        self,
+        model: type[Base],
+        columns: Optional[list[str]] = None,
+        codes: Optional[str | list[str]] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> pa.Table:
+        """按列、股票和日期区间读取，结果按股票代码、交易日期排序"""
+        schema = table_schema(model)
+        directory = self._table_dir(model)
+        if not os.path.isdir(directory):
+            return schema.empty_table().select(columns or schema.names)
+        dataset = ds.dataset(
+            directory,
+            schema=schema.append(pa.field("month", pa.string())),
+            format="parquet",
+            partitioning=_PARTITIONING,
+            exclude_invalid_files=True,
+        )
+        table = dataset.to_table(
+            columns=columns or schema.names,
+            filter=self._filter(codes, start_date, end_date),
+        )
+        if {"code", "trade_date"} <= set(table.column_names):
+            table = table.sort_by([("code", "ascending"), ("trade_date", "ascending")])
+        return table
+
+    @staticmethod
+    def _filter(
+        codes: Optional[str | list[str]],
+        start_date: Optional[date],
+        end_date: Optional[date],
+    ) -> Optional[ds.Expression]:
+        conditions = []
+        if isinstance(codes, str):
+            conditions.append(ds.field("code") == codes)
+        elif codes:
+            conditions.append(ds.field("code").isin(codes))
+        # 月份条件用于裁剪分区，日期条件再按行组统计过滤
+        if start_date:
+            conditions.append(ds.field("month") >= start_date.strftime("%Y-%m"))
+            conditions.append(ds.field("trade_date") >= start_date)
+        if end_date:
+            conditions.append(ds.field("month") <= end_date.strftime("%Y-%m"))
+            conditions.append(ds.field("trade_date") <= end_date)
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def read_frame(
+        self,
+        model: type[Base],
+        columns: Optional[list[str]] = None,
+        codes: Optional[str | list[str]] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        index: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """读取为 DataFrame，类型与数据库按列读取的结果一致"""
+        table = self.read(model, columns, codes, start_date, end_date)
+        return _to_frame(table, index)
+
+    def history_with_indicators(
+        self,
+        codes: Optional[str | list[str]] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        price_fields: Optional[list[str]] = None,
+        indicator_fields: Optional[list[str]] = None,
+        memory_map: bool = False,
+    ) -> pd.DataFrame:
+        """行情与指标按 (股票代码, 交易日期) 联表读取，参见 StockDatastore
+
+        memory_map 为 True 时把联表结果缓存为 Arrow IPC 文件，
+        镜像未变化时再次读取直接内存映射，跳过 Parquet 解码和联表(用于反复回测)。
+        """
+        key_columns = ["code", "trade_date"]
+        daily_columns = ["code", "name", "trade_date", *(price_fields or [])]
+        indicator_columns = [*key_columns, *(indicator_fields or [])]
+
+        def load() -> pa.Table:
+            daily = self.read(StockDaily, daily_columns, codes, start_date, end_date)
+            indicators = self.read(
+                StockIndicator, indicator_columns, codes, start_date, end_date
+            )
+            joined = daily.join(indicators, keys=key_columns, join_type="inner")
+            return joined.select(
+                daily_columns + indicator_columns[len(key_columns) :]
+            ).sort_by([("code", "ascending"), ("trade_date", "ascending")])
+
+        if memory_map:
+            table = self._cached(
+                [codes, start_date, end_date, daily_columns, indicator_columns],
+                [StockDaily, StockIndicator],
+                start_date,
+                end_date,
+                load,
+            )
+        else:
+            table = load()
+        return _to_frame(table)
+
+    def _cached(
+        self,
+        arguments: list,
+        models: list[type[Base]],
+        start_date: Optional[date],
+        end_date: Optional[date],
+        load,
+    ) -> pa.Table:
+        # 缓存键包含参数和区间内分区文件的修改时间，镜像写入后自动失效
+        digest = hashlib.sha1(repr(arguments).encode())
+        for model in models:
+            for path in sorted(self._partition_files(model, start_date, end_date)):
+                digest.update(f"{path}:{os.stat(path).st_mtime_ns}".encode())
+        directory = os.path.join(self.root, "_cache")
+        path = os.path.join(directory, f"{digest.hexdigest()}.arrow")
+        if not os.path.exists(path):
+            table = load()
+            os.makedirs(directory, exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with pa.OSFile(temp_path, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(temp_path, path)
+            self._prune_cache(directory)
+        else:
+            os.utime(path)
+        # 表的缓冲区直接引用映射的内存，不复制文件内容
+        return pa.ipc.open_file(pa.memory_map(path)).read_all()
+
+    @staticmethod
+    def _prune_cache(directory: str):
+        files = [
+            os.path.join(directory, name)
+            for name in os.listdir(directory)
+            if name.endswith(".arrow")
+        ]
+        files.sort(key=os.path.getmtime, reverse=True)
+        for path in files[_CACHE_SIZE:]:
+            os.remove(path)
+
+    def _partition_files(
+        self,
+        model: type[Base],
+        start_date: Optional[date],
+        end_date: Optional[date],
+    ) -> list[str]:
+        directory = self._table_dir(model)
+        if not os.path.isdir(directory):
+            return []
+        first = start_date.strftime("%Y-%m") if start_date else ""
+        last = end_date.strftime("%Y-%m") if end_date else "9999-12"
+        files = []
+        for name in os.listdir(directory):
+            month = name.removeprefix("month=")
+            path = os.path.join(directory, name, _DATA_FILE)
+            if first <= month <= last and os.path.exists(path):
+                files.append(path)
+        return files
+
+
+def _to_frame(table: pa.Table, index: Optional[str] = None) -> pd.DataFrame:
+    df = table.to_pandas(date_as_object=False, coerce_temporal_nanoseconds=True)
+    if index:
+        df = df.set_index(index)
+    return df
+
+
+@cache
+def get_parquet_store() -> Optional[StockParquetStore]:
+    """配置了镜像目录时返回 Parquet 镜像"""
+    if not settings.parquet_dir:
+        return None
+    return StockParquetStore(settings.parquet_dir)
@@ -5,78 +5,113 @@ from typing import Optional
 import akshare as ak
 import pandas as pd
 
+from app.config.stock import settings
 from app.core.database import Base
 from app.core.service import BaseService
 from app.models.stock import StockBlockTrade, StockDaily, StockLhb
 from app.stock.datastore import StockDatastore
+from app.stock.ingestion import DailyIngestionEngine, IngestionReport, StockBars
 from app.utils.data_frame import df_process
-from app.utils.date import SHORT_DATE_FORMAT, date_format, date_parse
+from app.utils.date import SHORT_DATE_FORMAT, date_format
 
 logger = logging.getLogger(__name__)
 
+# akshare 日线字段与 cn_stock_daily 字段的映射
+DAILY_COLUMNS = {
+    "日期": "trade_date",
+    "开盘": "open",
+    "最高": "high",
+    "最低": "low",
+    "收盘": "close",
+    "成交量": "volume",
+    "成交额": "amount",
+    "换手率": "turnover",
+}
+
+# akshare 龙虎榜字段与 cn_stock_lhb 字段的映射
+LHB_COLUMNS = {
+    "代码": "code",
+    "名称": "name",
+    "上榜日": "trade_date",
+    "上榜原因": "reason",
+    "龙虎榜净买额": "net_buy",
+    "龙虎榜买入额": "buy_amount",
+    "龙虎榜卖出额": "sell_amount",
+    "龙虎榜成交额": "total_amount",
+}
+
+# akshare 大宗交易字段与 cn_stock_block_trade 字段的映射
+BLOCK_TRADE_COLUMNS = {
+    "证券代码": "code",
+    "证券简称": "name",
+    "交易日期": "trade_date",
+    "成交价": "price",
+    "成交量": "volume",
+    "成交额": "amount",
+    "买方营业部": "buyer",
+    "卖方营业部": "seller",
+    "折溢率": "premium",
+}
+
 
 class StockService(BaseService[StockDatastore, Base]):
     def __init__(self, datastore: StockDatastore):
         super().__init__(datastore)
 
-    def fetch_daily_data(self, start_date: date, end_date: Optional[date]) -> None:
+    def fetch_daily_data(
+        self,
+        start_date: date,
+        end_date: Optional[date],
+        engine: Optional[DailyIngestionEngine] = None,
+    ) -> IngestionReport:
         """抓取每日股票数据"""
+        engine = engine or DailyIngestionEngine()
         # 获取股票列表
-        stock_info = ak.stock_info_a_code_name()
-
-        # 遍历获取每只股票数据
-        for _, row in stock_info.iterrows():
-            code = row["code"]
-            try:
-                # 获取日线数据
-                start_date_str = date_format(start_date, SHORT_DATE_FORMAT)
-                df = ak.stock_zh_a_hist(
-                    symbol=code,
-                    period="daily",
-                    start_date=start_date_str,
-                    end_date=(
-                        date_format(end_date, SHORT_DATE_FORMAT)
-                        if end_date
-                        else start_date_str
-                    ),
-                )
-                if df.empty:
-                    continue
-                logger.info(f"获取股票{code}数据成功")
-                # 转换数据
-                stocks = []
-                for _, data in df.iterrows():
-                    trade_date = date_parse(data["日期"]).date()
-                    stock = self.datastore.get_stock_by_code_and_date(code, trade_date)
-                    if stock:
-                        continue
-                    stocks.append(
-                        StockDaily(
-                            code=code,
-                            name=row["name"],
-                            trade_date=trade_date,
-                            open=data["开盘"],
-                            high=data["最高"],
-                            low=data["最低"],
-                            close=data["收盘"],
-                            volume=data["成交量"],
-                            amount=data["成交额"],
-                            turnover=data["换手率"],
-                        )
-                    )
-                self.datastore.bulk_save(stocks)
-                if end_date is None or start_date == end_date:
-                    from app.tasks.stock_tasks import stock_indicator_task
-
-                    stock_indicator_task.apply_async(
-                        kwargs={
-                            "code": code,
-                            "current_date": start_date_str,
-                        }
-                    )
-            except Exception as e:
-                logger.exception(f"获取股票{code}数据失败:{str(e)}")
-                raise e
+        stock_info = engine.list_stocks()
+        start_date_str = date_format(start_date, SHORT_DATE_FORMAT)
+        is_single_day = end_date is None or start_date == end_date
+
+        report = engine.run(
+            stock_info,
+            start_date,
+            end_date,
+            self.save_daily_bars,
+            batch_size=settings.ingestion_batch_size,
+        )
+        if is_single_day:
+            from app.tasks.stock_tasks import schedule_indicator_tasks
+
+            # 按股票分组发布指标计算任务，避免每只股票一个任务
+            schedule_indicator_tasks(report.succeeded, start_date_str)
+        return report
+
+    def save_daily_bars(self, batch: list[StockBars]) -> dict[str, int]:
+        """批量保存抓取到的日线，已入库的 (股票代码, 交易日期) 跳过，返回每只股票写入的行数"""
+        df = pd.concat(
+            [bars.data.assign(code=bars.code, name=bars.name) for bars in batch],
+            ignore_index=True,
+        )
+        df = df.rename(columns=DAILY_COLUMNS)[["code", "name", *DAILY_COLUMNS.values()]]
+        df["trade_date"] = pd.to_datetime(df["trade_date"]).dt.date
+        # 一次查询取出本批次已入库的日期，过滤后批量写入
+        existing = self.datastore.get_existing_trade_dates(
+            [bars.code for bars in batch],
+            df["trade_date"].min(),
+            df["trade_date"].max(),
+        )
+        if existing:
+            df = df[[key not in existing for key in zip(df["code"], df["trade_date"])]]
+        try:
+            self.datastore.bulk_insert_frame(
+                StockDaily, df, index_elements=["code", "trade_date"]
+            )
+        except Exception:
+            # 已执行的分块仍在事务中，回滚后再抛出，由调用方把整批记为失败
+            self.datastore.rollback()
+            raise
+        logger.info(f"保存{len(batch)}只股票{len(df)}条日线数据")
+        written = df["code"].value_counts()
+        return {bars.code: int(written.get(bars.code, 0)) for bars in batch}
 
     def fetch_lhb_data(self, start_date: date, end_date: Optional[date]) -> None:
         """抓取龙虎榜数据"""
@@ -92,22 +127,13 @@ class StockService(BaseService[StockDatastore, Base]):
             if df.empty:
                 return
             df = df_process(df, sort_column="上榜日", format_nan=True)
-            # 转换数据
-            stocks = []
-            for _, data in df.iterrows():
-                stocks.append(
-                    StockLhb(
-                        code=data["代码"],
-                        name=data["名称"],
-                        trade_date=date_parse(data["上榜日"]).date(),
-                        reason=data["上榜原因"],
-                        net_buy=data["龙虎榜净买额"],
-                        buy_amount=data["龙虎榜买入额"],
-                        sell_amount=data["龙虎榜卖出额"],
-                        total_amount=data["龙虎榜成交额"],
-                    )
-                )
-            self.datastore.bulk_save(stocks)
+            # 重复抓取同一天时按自然键覆盖，与 Parquet 镜像按天覆盖保持一致
+            self.datastore.bulk_insert_frame(
+                StockLhb,
+                df,
+                LHB_COLUMNS,
+                index_elements=["code", "trade_date", "reason"],
+            )
         except Exception as e:
             logger.exception(f"获取龙虎榜数据失败:{str(e)}")
             raise e
@@ -131,97 +157,63 @@ class StockService(BaseService[StockDatastore, Base]):
             if df.empty:
                 return
             df = df_process(df, sort_column="交易日期", format_nan=True)
-
-            # 转换数据
-            stocks = []
-            for _, data in df.iterrows():
-                stocks.append(
-                    StockBlockTrade(
-                        code=data["证券代码"],
-                        name=data["证券简称"],
-                        trade_date=data["交易日期"],
-                        price=data["成交价"],
-                        volume=data["成交量"],
-                        amount=data["成交额"],
-                        buyer=data["买方营业部"],
-                        seller=data["卖方营业部"],
-                        premium=data["折溢率"],
-                    )
-                )
-            self.datastore.bulk_save(stocks)
+            self.datastore.bulk_insert_frame(
+                StockBlockTrade,
+                df,
+                BLOCK_TRADE_COLUMNS,
+                index_elements=[
+                    "code",
+                    "trade_date",
+                    "price",
+                    "volume",
+                    "buyer",
+                    "seller",
+                ],
+            )
         except Exception as e:
             logger.exception(f"获取大宗交易数据失败:{str(e)}")
             raise e
 
     def get_history_with_indicators(
-        self, code: str, start_date: Optional[str] = None
+        self, code: str, start_date: Optional[date] = None
     ) -> pd.DataFrame:
-        """获取带指标的历史数据"""
+        """获取带指标的历史数据，有日线缓存时只从数据库读取指标"""
         try:
-            # 获取基础数据和指标数据
-            stocks = self.datastore.get_stock_history(code, start_date)
-            indicators = self.datastore.get_indicator_history(code, start_date)
-
-            if not stocks or not indicators:
-                return pd.DataFrame()
-
-            # 转换为DataFrame
-            stock_data = []
-            for stock in stocks:
-                stock_data.append(
-                    {
-                        "code": stock.code,
-                        "trade_date": stock.trade_date,
-                        "open": float(stock.open),
-                        "high": float(stock.high),
-                        "low": float(stock.low),
-                        "close": float(stock.close),
-                        "volume": stock.volume,
-                        "amount": stock.amount,
-                    }
-                )
-
-            indicator_data = []
-            for indicator in indicators:
-                indicator_data.append(
-                    {
-                        "trade_date": indicator.trade_date,
-                        "ma5": float(indicator.ma5),
-                        "ma10": float(indicator.ma10),
-                        "ma20": float(indicator.ma20),
-                        "ma30": float(indicator.ma30),
-                        "ma60": float(indicator.ma60),
-                        "diff": float(indicator.diff),
-                        "dea": float(indicator.dea),
-                        "macd": float(indicator.macd),
-                        "k": float(indicator.k),
-                        "d": float(indicator.d),
-                        "j": float(indicator.j),
-                        "rsi6": float(indicator.rsi6),
-                        "rsi12": float(indicator.rsi12),
-                        "rsi24": float(indicator.rsi24),
-                        "boll_up": float(indicator.boll_up),
-                        "boll_mid": float(indicator.boll_mid),
-                        "boll_down": float(indicator.boll_down),
-                        "vma5": float(indicator.vma5),
-                        "vma10": float(indicator.vma10),
-                        "vma20": float(indicator.vma20),
-                        "pdi": float(indicator.pdi),
-                        "mdi": float(indicator.mdi),
-                        "adx": float(indicator.adx),
-                        "adxr": float(indicator.adxr),
-                        "cci": float(indicator.cci),
-                        # ... 其他指标
-                    }
-                )
-
-            # 合并数据
-            df_stock = pd.DataFrame(stock_data)
-            df_indicator = pd.DataFrame(indicator_data)
-
-            df = pd.merge(df_stock, df_indicator, on="trade_date")
-            return df.sort_values("trade_date")
-
+            bar_cache = self.datastore.bar_cache
+            if bar_cache is None or not bar_cache.has(code):
+                return self.datastore.get_history_with_indicators(code, start_date)
+            bars = bar_cache.frame(code, start_date)
+            indicators = self.datastore.get_indicator_history_frame(code, start_date)
+            df = bars.join(indicators.drop(columns="code"), how="inner")
+            df.insert(1, "name", bar_cache.name(code))
+            return df.reset_index()[["code", "name", "trade_date", *df.columns[2:]]]
         except Exception as e:
-            print(f"获取股票{code}历史数据失败: {str(e)}")
+            logger.exception(f"获取股票{code}历史数据失败: {str(e)}")
             return pd.DataFrame()
+
+    def sync_bar_cache(self, codes: Optional[list[str]] = None) -> dict[str, str]:
+        """校验日线缓存与 cn_stock_daily 是否一致，缺失或不一致的股票从数据库重建
+
+        返回重建的股票代码及原因。
+        """
+        bar_cache = self.datastore.bar_cache
+        if bar_cache is None:
+            return {}
+        rebuilt = {}
+        summary = self.datastore.get_daily_summary(codes)
+        for row in summary.itertuples(index=False):
+            count, last_date, close_sum = bar_cache.summary(row.code)
+            expected = (int(row.bar_count), row.last_date.date(), row.close_sum)
+            if count == 0 and not bar_cache.has(row.code):
+                reason = "missing"
+            elif (count, last_date) != expected[:2] or abs(
+                close_sum - expected[2]
+            ) > 0.01:
+                reason = f"cache {count}/{last_date}/{close_sum}, db {expected}"
+            else:
+                continue
+            history = self.datastore.get_stock_history_frame(row.code)
+            bar_cache.rebuild(row.code, history.reset_index(), row.name)
+            rebuilt[row.code] = reason
+        logger.info(f"日线缓存校验{len(summary)}只股票，重建{len(rebuilt)}只")
+        return rebuilt
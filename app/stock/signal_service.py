@@ -1,105 +1,143 @@
-from datetime import datetime
+import asyncio
+import logging
+import time
+from typing import Optional
 
+import numpy as np
 import pandas as pd
 
+from app.config.stock import settings
 from app.core.service import BaseService
 from app.models.stock import StockSignal
-from app.stock.datastore import StockDatastore
+from app.stock.datastore import AsyncStockDatastore
+from app.stock.trade_calendar import TradeCalendar
+from app.strategy._strategy import BaseStrategy, StrategyMetrics, prepare_frame
 from app.strategy.factory import StrategyFactory
+from app.utils.date import date_parse_to_date
 from app.utils.telegram import TelegramBot
 
+logger = logging.getLogger(__name__)
 
-class SignalService(BaseService[StockDatastore, StockSignal]):
-    """交易信号服务"""
+SIGNAL_DESC = {"buy": "买入信号", "sell": "卖出信号"}
 
-    def __init__(self, datastore: StockDatastore):
+
+class SignalService(BaseService[AsyncStockDatastore, StockSignal]):
+    """交易信号服务
+
+    当日截面只读取一次，所有策略在有界并发下并行计算整个截面的买卖信号掩码，
+    并记录每个策略的耗时。
+    """
+
+    def __init__(
+        self,
+        datastore: AsyncStockDatastore,
+        strategies: Optional[list[BaseStrategy]] = None,
+        max_concurrency: Optional[int] = None,
+        telegram: Optional[TelegramBot] = None,
+    ):
         super().__init__(datastore)
         self.factory = StrategyFactory()
-        self.telegram = TelegramBot()
-
-    async def generate_signals(self, date: str) -> None:
+        if strategies is None:
+            strategies = [
+                self.factory.get_strategy(name)
+                for name in self.factory.list_strategies()
+            ]
+        self.strategies = strategies
+        self.max_concurrency = max_concurrency or settings.signal_max_concurrency
+        self.telegram = telegram or TelegramBot()
+        # 最近一次生成信号时各策略的耗时和信号数
+        self.metrics: list[StrategyMetrics] = []
+
+    async def generate_signals(self, date: str) -> list[StockSignal]:
         """生成交易信号"""
         try:
-            # 获取所有策略
-            strategies = self.factory.list_strategies()
-
-            # 获取当日数据
-            stocks = await self.datastore.get_stocks_by_date(date)
-            if not stocks:
-                return
-
-            # 转换为DataFrame
-            stock_data = []
-            for stock in stocks:
-                stock_data.append(
-                    {
-                        "code": stock.code,
-                        "name": stock.name,
-                        "trade_date": stock.trade_date,
-                        "open": float(stock.open),
-                        "high": float(stock.high),
-                        "low": float(stock.low),
-                        "close": float(stock.close),
-                        "volume": stock.volume,
-                        "amount": stock.amount,
-                    }
+            # 联表获取前一交易日和当日的行情和指标，生成所有策略共用的截面
+            trade_date = date_parse_to_date(date)
+            # 首次使用时日历会同步加载快照，放到线程中避免阻塞事件循环
+            previous_date = await asyncio.to_thread(
+                lambda: TradeCalendar().get_previous_trade_day(trade_date)
+            )
+            history = await self.datastore.get_history_with_indicators(
+                start_date=previous_date or trade_date, end_date=trade_date
+            )
+            df = prepare_frame(history, trade_date)
+            if df.empty:
+                return []
+
+            # 所有策略并行计算买卖信号
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            results = await asyncio.gather(
+                *(
+                    self._evaluate(strategy, df, semaphore)
+                    for strategy in self.strategies
                 )
-
-            # 获取指标数据
-            indicators = await self.datastore.get_indicators_by_date(date)
-            indicator_data = []
-            for indicator in indicators:
-                indicator_data.append(
-                    {
-                        "trade_date": indicator.trade_date,
-                        "ma5": float(indicator.ma5),
-                        # ... 其他指标
-                    }
-                )
-
-            # 合并数据
-            df_stock = pd.DataFrame(stock_data)
-            df_indicator = pd.DataFrame(indicator_data)
-            df = pd.merge(df_stock, df_indicator, on="trade_date")
-
-            # 遍历策略生成信号
-            signals = []
-            for strategy_info in strategies:
-                strategy = self.factory.get_strategy(strategy_info["name"])
-
-                # 获取买入信号
-                buy_list = await strategy.analyze(df)
-                for code in buy_list:
-                    stock = next(s for s in stocks if s.code == code)
-                    signal = StockSignal(
-                        code=code,
-                        name=stock.name,
-                        trade_date=datetime.strptime(date, "%Y%m%d").date(),
-                        strategy=strategy.name,
-                        signal_type="buy",
-                        signal_desc=f"{strategy.name}买入信号",
+            )
+
+            # 掩码直接选出股票代码和名称
+            codes = df["code"].to_numpy()
+            names = df["name"].to_numpy()
+            records = []
+            self.metrics = []
+            for strategy, (masks, elapsed) in zip(self.strategies, results):
+                name = strategy.name or type(strategy).__name__
+                self.metrics.append(
+                    StrategyMetrics(
+                        name=name,
+                        elapsed=elapsed,
+                        buy=int(masks["buy"].sum()),
+                        sell=int(masks["sell"].sum()),
                     )
-                    signals.append(signal)
-
-                # 获取卖出信号
-                for stock in stocks:
-                    if await strategy.get_sell_signal(stock.code, date):
-                        signal = StockSignal(
-                            code=stock.code,
-                            name=stock.name,
-                            trade_date=datetime.strptime(date, "%Y%m%d").date(),
-                            strategy=strategy.name,
-                            signal_type="sell",
-                            signal_desc=f"{strategy.name}卖出信号",
+                )
+                for signal_type, mask in masks.items():
+                    for code, stock_name in zip(codes[mask], names[mask]):
+                        records.append(
+                            {
+                                "code": code,
+                                "name": stock_name,
+                                "trade_date": trade_date,
+                                "strategy": name,
+                                "signal_type": signal_type,
+                                "signal_desc": f"{name}{SIGNAL_DESC[signal_type]}",
+                            }
                         )
-                        signals.append(signal)
 
             # 批量保存信号
-            if signals:
-                await self.datastore.bulk_save(signals)
+            signals = [StockSignal(**record) for record in records]
+            if records:
+                await self.datastore.bulk_insert(StockSignal, records)
 
                 # 推送到Telegram
                 await self.telegram.send_signals(signals, date)
+            logger.info(
+                f"{date}共{len(df)}只股票、{len(self.strategies)}个策略，"
+                f"生成{len(signals)}个信号"
+            )
+            for metrics in self.metrics:
+                logger.info(
+                    f"策略{metrics.name}: {metrics.elapsed * 1000:.2f}ms, "
+                    f"买入{metrics.buy}个, 卖出{metrics.sell}个"
+                )
+            return signals
 
         except Exception as e:
-            print(f"生成{date}交易信号失败: {str(e)}")
+            logger.exception(f"生成{date}交易信号失败: {str(e)}")
+            return []
+
+    @classmethod
+    async def _evaluate(
+        cls, strategy: BaseStrategy, df: pd.DataFrame, semaphore: asyncio.Semaphore
+    ) -> tuple[dict[str, np.ndarray], float]:
+        async with semaphore:
+            return await asyncio.to_thread(cls._masks, strategy, df)
+
+    @staticmethod
+    def _masks(
+        strategy: BaseStrategy, df: pd.DataFrame
+    ) -> tuple[dict[str, np.ndarray], float]:
+        """计算买卖信号掩码，同时返回耗时"""
+        started = time.perf_counter()
+        masks = {
+            "buy": np.asarray(strategy.buy_signals(df), dtype=bool),
+            "sell": np.asarray(strategy.sell_signals(df), dtype=bool),
+        }
+        return masks, time.perf_counter() - started
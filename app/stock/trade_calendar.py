@@ -1,91 +1,184 @@
-from datetime import datetime
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from typing import Iterable, Optional, Union
 
 import akshare as ak
 import arrow
+import chinese_calendar
+from chinese_calendar.constants import holidays
 
+from app.config.stock import settings
+from app.core.database import get_db
 from app.core.singleton import Singleton
+from app.stock.datastore import StockDatastore
+
+logger = logging.getLogger(__name__)
+
+DateLike = Union[arrow.Arrow, datetime, date, str, None]
+
+
+def _to_date(value: DateLike) -> date:
+    """统一转换为 date，None 表示今天"""
+    if value is None:
+        return arrow.now().date()
+    if isinstance(value, arrow.Arrow):
+        return value.date()
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return arrow.get(value).date()
+
+
+def _fallback_trade_days() -> list[date]:
+    """chinese_calendar 覆盖年份内的工作日(不含调休的周末)"""
+    end_date = date(max(holidays).year, 12, 31)
+    return chinese_calendar.get_workdays(
+        date(2004, 1, 1), end_date, include_weekends=False
+    )
 
 
 class TradeCalendar(metaclass=Singleton):
-    """交易日历类，用于处理交易时间相关的判断"""
+    """交易日历类，用于处理交易时间相关的判断
+
+    交易日以升序的序数(date.toordinal)保存，所有查询都是二分查找，返回值均为 date。
+    日历从数据库中的快照加载，快照由定时任务 refresh 从新浪接口更新，查询过程中不会访问网络；
+    数据库没有快照或不可用时，退回到 chinese_calendar 的工作日。
+    """
 
     def __init__(self):
+        self._auto_update = True
+        self._reload_lock = threading.Lock()
         self._init_trade_calendar()
 
+    @classmethod
+    def from_days(cls, days: Iterable[DateLike]) -> "TradeCalendar":
+        """用给定的交易日构建日历，不访问数据源，也不注册为单例"""
+        calendar = cls.__new__(cls)
+        calendar._auto_update = False
+        calendar._set_trade_days(days)
+        return calendar
+
     def _init_trade_calendar(self):
-        """初始化交易日历数据，从新浪接口获取实际的交易日历"""
+        """初始化交易日历数据，从数据库快照加载"""
+        days = self._load_snapshot()
+        if not days:
+            logger.warning("交易日历快照为空，使用 chinese_calendar 工作日")
+            days = _fallback_trade_days()
+        self._set_trade_days(days)
+
+    def _load_snapshot(self) -> list[date]:
         try:
-            self._update_trade_calendar()
+            with get_db() as session:
+                return StockDatastore(session).get_trade_days()
         except Exception as e:
-            raise e
+            logger.warning(f"加载交易日历快照失败: {str(e)}")
+            return []
 
-    def _update_trade_calendar(self):
-        """更新交易日历数据"""
+    def _reload_snapshot(self):
+        try:
+            days = self._load_snapshot()
+            if days:
+                self._set_trade_days(days)
+            else:
+                self.last_update_time = arrow.now()
+        finally:
+            self._reload_lock.release()
+
+    def refresh(self) -> int:
+        """从新浪接口下载交易日历并保存快照，返回交易日数量"""
         trade_date_df = ak.tool_trade_date_hist_sina()
-        # 将日期转换为Arrow对象
-        self.trade_days = [arrow.get(str(date)) for date in trade_date_df["trade_date"]]
+        days = [_to_date(day) for day in trade_date_df["trade_date"]]
+        with get_db() as session:
+            StockDatastore(session).save_trade_days(days)
+        self._set_trade_days(days)
+        logger.info(f"交易日历已更新，共{len(days)}个交易日")
+        return len(days)
+
+    def _set_trade_days(self, days: Iterable[DateLike]):
+        # 整体替换列表，并发读取时不会看到更新到一半的数据
+        self._ordinals = sorted({_to_date(day).toordinal() for day in days})
         self.last_update_time = arrow.now()
 
     def _check_and_update_calendar(self):
-        """检查是否需要更新交易日历"""
-        if not hasattr(self, "trade_days") or not self.trade_days:
-            self._update_trade_calendar()
+        """快照过期时在后台线程重新加载，当前调用继续使用已加载的日历"""
+        if not self._auto_update:
             return
+        expired_at = self.last_update_time.shift(seconds=settings.calendar_ttl)
+        if arrow.now() < expired_at or not self._reload_lock.acquire(blocking=False):
+            return
+        threading.Thread(
+            target=self._reload_snapshot, name="trade-calendar", daemon=True
+        ).start()
+
+    def _date_at(self, index: int) -> Optional[date]:
+        if 0 <= index < len(self._ordinals):
+            return date.fromordinal(self._ordinals[index])
+        return None
+
+    @property
+    def trade_days(self) -> list[date]:
+        """全部交易日"""
+        self._check_and_update_calendar()
+        return [date.fromordinal(ordinal) for ordinal in self._ordinals]
 
-        today = arrow.now()
-        if self.trade_days[-1] <= today.shift(days=5):
-            self._update_trade_calendar()
-
-    def is_trade_day(self, date=None):
+    def is_trade_day(self, date: DateLike = None) -> bool:
         """判断是否为交易日"""
         self._check_and_update_calendar()
-        if date is None:
-            date = arrow.now()
-        elif isinstance(date, datetime):
-            date = arrow.get(date)
-        return date.date() in [d.date() for d in self.trade_days]
-
-    def get_next_trade_day(self, date=None):
-        """获取下一个交易日
-
-        Args:
-            date: datetime 或 arrow 对象，默认为当前时间
-        Returns:
-            arrow: 下一个交易日，如果没有则返回 None
-        """
+        ordinal = _to_date(date).toordinal()
+        index = bisect_left(self._ordinals, ordinal)
+        return index < len(self._ordinals) and self._ordinals[index] == ordinal
+
+    def get_next_trade_day(self, date: DateLike = None) -> Optional[date]:
+        """获取 date 之后(不含当天)的下一个交易日，默认为今天，没有则返回 None"""
         self._check_and_update_calendar()
-        if date is None:
-            date = arrow.now()
-        elif isinstance(date, datetime):
-            date = arrow.get(date)
+        ordinal = _to_date(date).toordinal()
+        return self._date_at(bisect_right(self._ordinals, ordinal))
 
-        next_days = [d for d in self.trade_days if d > date]
-        return next_days[0] if next_days else None
+    def get_previous_trade_day(self, date: DateLike = None) -> Optional[date]:
+        """获取 date 之前(不含当天)的上一个交易日，默认为今天，没有则返回 None"""
+        self._check_and_update_calendar()
+        ordinal = _to_date(date).toordinal()
+        return self._date_at(bisect_left(self._ordinals, ordinal) - 1)
 
-    def get_previous_trade_day(self, date=None):
-        """获取上一个交易日
+    def get_last_trade_day(self) -> Optional[date]:
+        """获取最后一个交易日（不超过今天），没有则返回 None"""
+        self._check_and_update_calendar()
+        ordinal = arrow.now().date().toordinal()
+        return self._date_at(bisect_right(self._ordinals, ordinal) - 1)
 
-        Args:
-            date: datetime 或 arrow 对象，默认为当前时间
-        Returns:
-            arrow: 上一个交易日，如果没有则返回 None
-        """
+    def trade_days_between(
+        self, start_date: DateLike, end_date: DateLike
+    ) -> list[date]:
+        """获取区间内(含首尾)的所有交易日"""
         self._check_and_update_calendar()
-        if date is None:
-            date = arrow.now()
-        elif isinstance(date, datetime):
-            date = arrow.get(date)
+        left = bisect_left(self._ordinals, _to_date(start_date).toordinal())
+        right = bisect_right(self._ordinals, _to_date(end_date).toordinal())
+        return [date.fromordinal(ordinal) for ordinal in self._ordinals[left:right]]
 
-        prev_days = [d for d in self.trade_days if d < date]
-        return prev_days[-1] if prev_days else None
+    def count_trade_days(self, start_date: DateLike, end_date: DateLike) -> int:
+        """统计区间内(含首尾)的交易日数量"""
+        self._check_and_update_calendar()
+        left = bisect_left(self._ordinals, _to_date(start_date).toordinal())
+        right = bisect_right(self._ordinals, _to_date(end_date).toordinal())
+        return max(right - left, 0)
 
-    def get_last_trade_day(self) -> arrow.Arrow:
-        """获取最后一个交易日（不超过今天）
+    def offset(self, date: DateLike, n: int) -> Optional[date]:
+        """获取距 date 第 n 个交易日，n 为负数时向前
 
-        Returns:
-            arrow: 最后一个交易日，如果没有则返回 None
+        date 为交易日时 offset(date, 0) 返回其本身；date 不是交易日时，
+        offset(date, 1) 为下一个交易日，offset(date, -1) 为上一个交易日，
+        offset(date, 0) 返回 None。超出日历范围返回 None。
         """
         self._check_and_update_calendar()
-        today = arrow.now()
-        valid_days = [day for day in self.trade_days if day <= today]
-        return valid_days[-1] if valid_days else None
+        ordinal = _to_date(date).toordinal()
+        index = bisect_left(self._ordinals, ordinal)
+        if index < len(self._ordinals) and self._ordinals[index] == ordinal:
+            return self._date_at(index + n)
+        if n > 0:
+            return self._date_at(index + n - 1)
+        if n < 0:
+            return self._date_at(index + n)
+        return None
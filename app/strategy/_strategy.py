@@ -0,0 +1,83 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import date
+from typing import Mapping, Union
+
+import numpy as np
+import pandas as pd
+
+# 不需要生成前一日值的字段
+_KEY_COLUMNS = ["code", "name", "trade_date"]
+
+Operand = Union[str, float]
+# 当日截面 DataFrame，或字段名到 (交易日 × 股票) 矩阵的映射(回测)
+Frame = Union[pd.DataFrame, Mapping[str, np.ndarray]]
+
+
+class BaseStrategy(ABC):
+    """交易策略基类
+
+    买卖信号在当日全市场截面(每行一只股票，包含行情和指标列)上向量化计算，
+    返回与截面各行对齐的布尔掩码。截面由 prepare_frame 生成，
+    前一交易日的值以 prev_ 前缀的列提供。策略只按列做逐元素运算，
+    因此同样适用于回测中的 (交易日 × 股票) 矩阵。
+    """
+
+    name: str = ""
+
+    @abstractmethod
+    def buy_signals(self, df: Frame) -> np.ndarray:
+        """买入信号掩码"""
+
+    def sell_signals(self, df: Frame) -> np.ndarray:
+        """卖出信号掩码，默认不产生卖出信号"""
+        return np.zeros(np.shape(df["close"]), dtype=bool)
+
+    def indicators(self, prices: Mapping[str, np.ndarray]) -> dict[str, np.ndarray]:
+        """回测时由 (交易日 × 股票) 矩阵计算策略需要的指标字段
+
+        用于调整指标周期的参数扫描，默认直接使用已加载的指标。
+        """
+        return {}
+
+
+@dataclass
+class StrategyMetrics:
+    """单个策略一次计算的耗时和信号数"""
+
+    name: str
+    elapsed: float
+    buy: int
+    sell: int
+
+
+def prepare_frame(history: pd.DataFrame, trade_date: date) -> pd.DataFrame:
+    """由按股票、日期排序的长表生成 trade_date 当日的截面
+
+    每个数值字段增加 prev_ 前缀的前一交易日取值，所有策略共用这一个截面。
+    """
+    columns = [c for c in history.columns if c not in _KEY_COLUMNS]
+    previous = history.groupby("code", sort=False)[columns].shift(1)
+    frame = pd.concat([history, previous.add_prefix("prev_")], axis=1)
+    frame = frame[frame["trade_date"] == pd.Timestamp(trade_date)]
+    return frame.reset_index(drop=True)
+
+
+def _values(df: Frame, operand: Operand, prefix: str = "") -> np.ndarray | float:
+    if isinstance(operand, str):
+        return np.asarray(df[f"{prefix}{operand}"])
+    return operand
+
+
+def cross_up(df: Frame, fast: Operand, slow: Operand) -> np.ndarray:
+    """fast 由下向上穿过 slow"""
+    return (_values(df, fast) > _values(df, slow)) & (
+        _values(df, fast, "prev_") <= _values(df, slow, "prev_")
+    )
+
+
+def cross_down(df: Frame, fast: Operand, slow: Operand) -> np.ndarray:
+    """fast 由上向下穿过 slow"""
+    return (_values(df, fast) < _values(df, slow)) & (
+        _values(df, fast, "prev_") >= _values(df, slow, "prev_")
+    )
@@ -0,0 +1,16 @@
+from app.core.factory import Factory
+from app.core.singleton import Singleton
+from app.strategy._strategy import BaseStrategy
+
+
+class StrategyFactory(Factory[BaseStrategy], metaclass=Singleton):
+
+    def __init__(self):
+        super().__init__(r"class\s+(\w+)\s*\(\s*BaseStrategy\s*\):")
+
+    def list_strategies(self) -> list[str]:
+        """所有策略的类名"""
+        return sorted(self.classes)
+
+    def get_strategy(self, name: str) -> BaseStrategy:
+        return self.get_instance(name)
@@ -0,0 +1,44 @@
+from typing import Mapping
+
+import numpy as np
+
+from app.strategy._strategy import BaseStrategy, Frame, cross_down, cross_up
+from app.utils.indicator_matrix import calculate_ma, on_trading_bars
+
+
+class MaCrossStrategy(BaseStrategy):
+    """均线金叉死叉：快线(默认5日线)上穿慢线(默认20日线)买入，下穿卖出"""
+
+    name = "均线金叉"
+
+    def __init__(self, fast: int = 5, slow: int = 20):
+        self.fast = f"ma{fast}"
+        self.slow = f"ma{slow}"
+        self.periods = {self.fast: fast, self.slow: slow}
+
+    def indicators(self, prices: Mapping[str, np.ndarray]) -> dict[str, np.ndarray]:
+        # 与数据库中逐只股票计算的均线一致，停牌日不计入窗口
+        return {
+            name: on_trading_bars(lambda close: calculate_ma(close, n), prices["close"])
+            for name, n in self.periods.items()
+            if name not in prices
+        }
+
+    def buy_signals(self, df: Frame) -> np.ndarray:
+        return cross_up(df, self.fast, self.slow)
+
+    def sell_signals(self, df: Frame) -> np.ndarray:
+        return cross_down(df, self.fast, self.slow)
+
+
+class MaBreakoutStrategy(BaseStrategy):
+    """放量突破：收盘价上穿60日线且成交量大于5日均量的两倍，跌破20日线卖出"""
+
+    name = "放量突破"
+
+    def buy_signals(self, df: Frame) -> np.ndarray:
+        volume = np.asarray(df["volume"])
+        return cross_up(df, "close", "ma60") & (volume > np.asarray(df["vma5"]) * 2)
+
+    def sell_signals(self, df: Frame) -> np.ndarray:
+        return cross_down(df, "close", "ma20")
@@ -0,0 +1,36 @@
+from typing import Mapping
+
+import numpy as np
+
+from app.strategy._strategy import BaseStrategy, Frame, cross_down, cross_up
+from app.utils.indicator_matrix import calculate_macd
+
+# 数据库中保存的 MACD 指标使用的周期
+DEFAULT_MACD_PERIODS = (12, 26, 9)
+
+
+class MacdCrossStrategy(BaseStrategy):
+    """MACD金叉：DIFF在零轴下方上穿DEA买入，DIFF下穿DEA卖出"""
+
+    name = "MACD金叉"
+
+    def __init__(
+        self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9
+    ):
+        self.periods = (fast_period, slow_period, signal_period)
+
+    def indicators(self, prices: Mapping[str, np.ndarray]) -> dict[str, np.ndarray]:
+        if (
+            self.periods == DEFAULT_MACD_PERIODS
+            and "diff" in prices
+            and "dea" in prices
+        ):
+            return {}
+        diff, dea, _ = calculate_macd(prices["close"], *self.periods)
+        return {"diff": diff, "dea": dea}
+
+    def buy_signals(self, df: Frame) -> np.ndarray:
+        return cross_up(df, "diff", "dea") & (np.asarray(df["diff"]) < 0)
+
+    def sell_signals(self, df: Frame) -> np.ndarray:
+        return cross_down(df, "diff", "dea")
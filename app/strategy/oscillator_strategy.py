@@ -0,0 +1,60 @@
+from typing import Mapping
+
+import numpy as np
+
+from app.strategy._strategy import BaseStrategy, Frame, cross_down, cross_up
+from app.utils.indicator_matrix import calculate_kdj, on_trading_bars
+
+# 数据库中保存的 KDJ 指标使用的周期
+DEFAULT_KDJ_PERIODS = (9, 5, 5)
+
+
+class KdjCrossStrategy(BaseStrategy):
+    """KDJ超卖金叉：K在20以下上穿D买入，K在80以上下穿D卖出"""
+
+    name = "KDJ金叉"
+
+    def __init__(self, n: int = 9, m1: int = 5, m2: int = 5):
+        self.periods = (n, m1, m2)
+
+    def indicators(self, prices: Mapping[str, np.ndarray]) -> dict[str, np.ndarray]:
+        if self.periods == DEFAULT_KDJ_PERIODS and "k" in prices and "d" in prices:
+            return {}
+        # 与数据库中逐只股票计算的 KDJ 一致，停牌日不计入窗口
+        k, d, _ = on_trading_bars(
+            lambda high, low, close: calculate_kdj(high, low, close, *self.periods),
+            prices["high"],
+            prices["low"],
+            prices["close"],
+        )
+        return {"k": k, "d": d}
+
+    def buy_signals(self, df: Frame) -> np.ndarray:
+        return cross_up(df, "k", "d") & (np.asarray(df["k"]) < 20)
+
+    def sell_signals(self, df: Frame) -> np.ndarray:
+        return cross_down(df, "k", "d") & (np.asarray(df["k"]) > 80)
+
+
+class RsiReversalStrategy(BaseStrategy):
+    """RSI超卖反转：6日RSI上穿20买入，下穿80卖出"""
+
+    name = "RSI反转"
+
+    def buy_signals(self, df: Frame) -> np.ndarray:
+        return cross_up(df, "rsi6", 20)
+
+    def sell_signals(self, df: Frame) -> np.ndarray:
+        return cross_down(df, "rsi6", 80)
+
+
+class BollReboundStrategy(BaseStrategy):
+    """布林带反弹：收盘价上穿下轨买入，下穿上轨卖出"""
+
+    name = "布林反弹"
+
+    def buy_signals(self, df: Frame) -> np.ndarray:
+        return cross_up(df, "close", "boll_down")
+
+    def sell_signals(self, df: Frame) -> np.ndarray:
+        return cross_down(df, "close", "boll_up")
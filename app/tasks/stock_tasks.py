@@ -2,7 +2,9 @@ import logging
 
 from celery import group, shared_task
 
+from app.config.stock import settings
 from app.core.database import get_celery_db
+from app.stock.backfill import DailyBackfillJob
 from app.stock.depends import get_stock_indicator_service, get_stock_service
 from app.stock.trade_calendar import TradeCalendar
 from app.utils.date import (
@@ -22,11 +24,12 @@ def fetch_daily_data_task(self, start_date: str, end_date: str = None):
     with get_celery_db() as session:
         try:
             stock_service = get_stock_service(session)
-            stock_service.fetch_daily_data(
+            report = stock_service.fetch_daily_data(
                 date_parse(start_date).date(),
                 date_parse(end_date).date() if end_date else None,
             )
             logger.info(f"完成抓取{start_date}日线数据")
+            return report.to_dict()
         except Exception as ex:
             logger.exception(f"抓取日线数据失败: {str(ex)}")
             raise ex
@@ -83,9 +86,86 @@ def fetch_daily_stock_data(self, start_date: str = None, end_date: str = None):
         logger.info(f"非交易日，不抓取数据, date: {date_str}")
 
 
+@shared_task(bind=True, max_retries=3)
+def backfill_daily_data_task(
+    self, start_date: str, end_date: str = None, codes: list[str] = None
+):
+    """按股票和月份断点续跑的历史日线回补，重新执行时跳过已完成的区间"""
+    with get_celery_db() as session:
+        job = DailyBackfillJob(get_stock_service(session))
+        report = job.run(
+            date_parse_to_date(start_date),
+            date_parse_to_date(end_date) if end_date else get_now().date(),
+            codes,
+        )
+        return report.to_dict()
+
+
+@shared_task(bind=True, max_retries=3)
+def refresh_trade_calendar_task(self):
+    """从新浪接口更新交易日历快照"""
+    return TradeCalendar().refresh()
+
+
+@shared_task(bind=True, max_retries=3)
+def sync_bar_cache_task(self):
+    """校验本地日线缓存，缺失或与数据库不一致的股票重建"""
+    with get_celery_db() as session:
+        return len(get_stock_service(session).sync_bar_cache())
+
+
 @shared_task(bind=True, max_retries=3)
 def stock_indicator_task(self, code: str, current_date: str):
     logger.exception("start stock indicator task")
     with get_celery_db() as session:
         service = get_stock_indicator_service(session)
-        service.calculate_indicators(code, date_parse_to_date(current_date))
+        service.update_indicators(code, date_parse_to_date(current_date))
+
+
+@shared_task(bind=True, max_retries=3)
+def stock_indicator_batch_task(self, codes: list[str], current_date: str):
+    """增量计算一组股票的当日技术指标，整组共用一个会话批量读写"""
+    with get_celery_db() as session:
+        service = get_stock_indicator_service(session)
+        return service.update_indicators_batch(codes, date_parse_to_date(current_date))
+
+
+@shared_task(bind=True, max_retries=3)
+def market_indicator_task(self, current_date: str):
+    """截面计算全市场当日技术指标"""
+    with get_celery_db() as session:
+        service = get_stock_indicator_service(session)
+        return service.calculate_market_indicators(date_parse_to_date(current_date))
+
+
+def schedule_indicator_tasks(
+    codes: list[str], current_date: str, chunk_size: int = None
+) -> int:
+    """按股票分组发布指标计算任务，返回发布的任务数
+
+    每 chunk_size 只股票发布一个批量任务；chunk_size 为 0 时只发布一个全市场任务。
+    """
+    if not codes:
+        return 0
+    if chunk_size is None:
+        chunk_size = settings.indicator_chunk_size
+    if chunk_size <= 0:
+        market_indicator_task.apply_async(kwargs={"current_date": current_date})
+        return 1
+    chunks = [codes[i : i + chunk_size] for i in range(0, len(codes), chunk_size)]
+    group(
+        stock_indicator_batch_task.s(codes=chunk, current_date=current_date)
+        for chunk in chunks
+    ).apply_async()
+    logger.info(f"发布{len(chunks)}个指标计算任务，共{len(codes)}只股票")
+    return len(chunks)
+
+
+@shared_task(bind=True, max_retries=3)
+def stock_indicator_range_task(self, code: str, start_date: str, end_date: str):
+    """回补区间内每个交易日的技术指标"""
+    with get_celery_db() as session:
+        service = get_stock_indicator_service(session)
+        return service.calculate_indicator_range(
+            code, date_parse_to_date(start_date), date_parse_to_date(end_date)
+        )
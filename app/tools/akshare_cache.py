@@ -0,0 +1,357 @@
+import asyncio
+import hashlib
+import inspect
+import logging
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import cache, partial
+from typing import Any, Callable, Optional
+
+import arrow
+import redis
+
+from app.config.akshare import settings
+from app.tools.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# 实时行情、分时和分钟线类接口，数据在盘中持续变化
+_REALTIME_PATTERN = re.compile(
+    r"(spot|realtime|intraday|tick|bid_ask|minute|_min(_|$)|_rt(_|$))"
+)
+# 表示数据截止日期的参数名
+_END_DATE_PARAMS = ("end_date", "date", "trade_date")
+_DATE_PATTERN = re.compile(r"^(\d{4})-?(\d{2})-?(\d{2})$")
+_MISSING = object()
+
+
+def function_path(func: Callable) -> str:
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+def _normalize(value: Any) -> str:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return repr([_normalize(item) for item in value])
+    if isinstance(value, dict):
+        return repr(sorted((str(k), _normalize(v)) for k, v in value.items()))
+    return repr(value)
+
+
+def call_arguments(func: Callable, args: tuple, kwargs: dict) -> dict[str, Any]:
+    """按函数签名把位置参数和默认值统一为关键字参数，签名不可用时原样返回"""
+    try:
+        bound = inspect.signature(func).bind(*args, **kwargs)
+    except (TypeError, ValueError):
+        return {**{f"_{i}": arg for i, arg in enumerate(args)}, **kwargs}
+    bound.apply_defaults()
+    return dict(bound.arguments)
+
+
+def cache_key(func: Callable, arguments: dict[str, Any]) -> str:
+    """缓存键：函数路径 + 规范化参数的摘要，位置参数和关键字参数写法不同也得到同一个键"""
+    normalized = repr(sorted((k, _normalize(v)) for k, v in arguments.items()))
+    digest = hashlib.sha1(normalized.encode()).hexdigest()
+    return f"akshare:{function_path(func)}:{digest}"
+
+
+def _parse_date(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    match = _DATE_PATTERN.match(str(value))
+    if not match:
+        return None
+    try:
+        return date(*map(int, match.groups()))
+    except ValueError:
+        return None
+
+
+def ttl_for(name: str, arguments: dict[str, Any]) -> int:
+    """函数的缓存时间(秒)
+
+    依次按配置的函数名、实时类接口、结束日期早于今天的历史数据判断，其余使用默认值。
+    """
+    if name in settings.cache_ttls:
+        return settings.cache_ttls[name]
+    if _REALTIME_PATTERN.search(name):
+        return settings.cache_realtime_ttl
+    today = arrow.now().date()
+    for param in _END_DATE_PARAMS:
+        end_date = _parse_date(arguments.get(param))
+        if end_date is not None:
+            return (
+                settings.cache_history_ttl if end_date < today else settings.cache_ttl
+            )
+    return settings.cache_ttl
+
+
+class MemoryTier:
+    """进程内 LRU 缓存，保存结果对象本身，命中时不反序列化"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return _MISSING
+            if item[0] <= time.time():
+                del self._items[key]
+                return _MISSING
+            self._items.move_to_end(key)
+            return item[1]
+
+    def set(self, key: str, value: Any, expires_at: float):
+        with self._lock:
+            self._items[key] = (expires_at, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class RedisTier:
+    """Redis 共享缓存，多个进程(API、Celery worker)共用，由 Redis 按过期时间淘汰"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key: str) -> Optional[tuple[float, Any]]:
+        payload = self.client.get(key)
+        return pickle.loads(payload) if payload is not None else None
+
+    def set(self, key: str, value: Any, expires_at: float):
+        ttl = max(int(expires_at - time.time()), 1)
+        self.client.setex(key, ttl, pickle.dumps((expires_at, value)))
+
+
+class DiskTier:
+    """本地磁盘共享缓存，每个键一个文件，读取时删除过期文件"""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, hashlib.sha1(key.encode()).hexdigest() + ".pkl")
+
+    def get(self, key: str) -> Optional[tuple[float, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as file:
+                expires_at, value = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        if expires_at <= time.time():
+            os.remove(path)
+            return None
+        return expires_at, value
+
+    def set(self, key: str, value: Any, expires_at: float):
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as file:
+            pickle.dump((expires_at, value), file)
+        os.replace(temp_path, path)
+
+
+@dataclass
+class CacheStats:
+    """缓存命中统计"""
+
+    memory_hits: int = 0
+    shared_hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    errors: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.memory_hits + self.shared_hits + self.misses
+        return (self.memory_hits + self.shared_hits) / total if total else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "memory_hits": self.memory_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "hit_rate": round(self.hit_rate, 4),
+        }
+
+
+class AkshareCache:
+    """akshare 接口调用的结果缓存
+
+    以函数路径和规范化参数为键，先查进程内 LRU，再查共享层(Redis 或本地磁盘)，
+    都未命中时调用接口并写入两层；缓存时间按函数区分，参见 ttl_for。
+    未命中时并发的相同调用合并为一次请求(计入 coalesced)，对外请求数受 limiter 限制。
+    调用抛出的异常不缓存；共享层读写失败只记录日志并计入 errors，不影响调用。
+    进程内命中返回的是同一个对象，调用方不能原地修改返回的 DataFrame。
+    """
+
+    def __init__(
+        self,
+        memory: MemoryTier,
+        shared: Optional[RedisTier | DiskTier],
+        flight: Optional[SingleFlight] = None,
+        limiter: Optional[threading.Semaphore] = None,
+    ):
+        self.memory = memory
+        self.shared = shared
+        self.flight = flight or SingleFlight()
+        self.limiter = limiter if limiter is not None else get_outbound_limiter()
+        self.stats = CacheStats()
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            setattr(self.stats, name, getattr(self.stats, name) + 1)
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """调用 func，缓存时间内相同参数的调用直接返回缓存结果"""
+        arguments = call_arguments(func, args, kwargs)
+        ttl = ttl_for(func.__name__, arguments)
+        key = cache_key(func, arguments)
+        if ttl <= 0:
+            return self._coalesced(
+                key, lambda: _limited(self.limiter, func, args, kwargs)
+            )
+        value = self.memory.get(key)
+        if value is not _MISSING:
+            self._count("memory_hits")
+            return value
+        item = self._shared_get(key)
+        if item is not None:
+            self._count("shared_hits")
+            self.memory.set(key, item[1], item[0])
+            return item[1]
+        return self._coalesced(key, lambda: self._load(key, ttl, func, args, kwargs))
+
+    def _coalesced(self, key: str, fn: Callable[[], Any]) -> Any:
+        value, shared = self.flight.do(key, fn)
+        if shared:
+            self._count("coalesced")
+        return value
+
+    def _load(
+        self, key: str, ttl: int, func: Callable, args: tuple, kwargs: dict
+    ) -> Any:
+        # 上一次合并的请求可能在本次查询缓存之后才写入
+        value = self.memory.get(key)
+        if value is not _MISSING:
+            self._count("memory_hits")
+            return value
+        self._count("misses")
+        started = time.perf_counter()
+        value = _limited(self.limiter, func, args, kwargs)
+        logger.debug(
+            f"akshare 缓存未命中: {function_path(func)}, "
+            f"耗时{time.perf_counter() - started:.3f}s, 缓存{ttl}s"
+        )
+        expires_at = time.time() + ttl
+        self.memory.set(key, value, expires_at)
+        self._shared_set(key, value, expires_at)
+        return value
+
+    def _shared_get(self, key: str) -> Optional[tuple[float, Any]]:
+        if self.shared is None:
+            return None
+        try:
+            return self.shared.get(key)
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"读取 akshare 共享缓存失败: {str(e)}")
+            return None
+
+    def _shared_set(self, key: str, value: Any, expires_at: float):
+        if self.shared is None:
+            return
+        try:
+            self.shared.set(key, value, expires_at)
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"写入 akshare 共享缓存失败: {str(e)}")
+
+
+@cache
+def get_outbound_limiter() -> Optional[threading.BoundedSemaphore]:
+    """进程内对 akshare 的并发请求上限，未配置上限时返回 None"""
+    if settings.max_concurrency <= 0:
+        return None
+    return threading.BoundedSemaphore(settings.max_concurrency)
+
+
+def _limited(
+    limiter: Optional[threading.Semaphore], func: Callable, args: tuple, kwargs: dict
+) -> Any:
+    if limiter is None:
+        return func(*args, **kwargs)
+    with limiter:
+        return func(*args, **kwargs)
+
+
+def _shared_tier() -> Optional[RedisTier | DiskTier]:
+    if settings.cache_backend == "redis":
+        return RedisTier(redis.Redis.from_url(settings.cache_redis_url))
+    if settings.cache_backend == "disk":
+        return DiskTier(settings.cache_dir)
+    return None
+
+
+@cache
+def get_akshare_cache() -> Optional[AkshareCache]:
+    """启用缓存时返回进程内共用的 akshare 缓存"""
+    if not settings.cache_enabled:
+        return None
+    return AkshareCache(MemoryTier(settings.cache_size), _shared_tier())
+
+
+# 未启用缓存时合并并发的相同调用
+_flight = SingleFlight()
+
+
+def akshare_call(func: Callable, *args, **kwargs) -> Any:
+    """经过缓存调用 akshare 接口，未启用缓存时只合并并发的相同调用"""
+    akshare_cache = get_akshare_cache()
+    if akshare_cache is None:
+        key = cache_key(func, call_arguments(func, args, kwargs))
+        value, _ = _flight.do(
+            key, lambda: _limited(get_outbound_limiter(), func, args, kwargs)
+        )
+        return value
+    return akshare_cache.call(func, *args, **kwargs)
+
+
+@cache
+def get_tool_executor() -> ThreadPoolExecutor:
+    """执行阻塞工具调用(akshare 下载、结果格式化)的有界线程池"""
+    return ThreadPoolExecutor(
+        max_workers=settings.tool_max_workers, thread_name_prefix="akshare"
+    )
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """在有界线程池中执行阻塞调用，不阻塞事件循环"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_tool_executor(), partial(func, *args, **kwargs)
+    )
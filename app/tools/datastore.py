@@ -9,6 +9,12 @@ class ToolDatastore(BaseDatastore[Tool], metaclass=Singleton):
     def get_tool(self, primary_id: int) -> Tool:
         return self.db_session.query(Tool).filter(Tool.id == primary_id).first()
 
+    def get_tools(self, primary_ids: list[int]) -> list[Tool]:
+        """按主键批量查询，一次 IN 查询，结果顺序不保证与 primary_ids 一致"""
+        if not primary_ids:
+            return []
+        return self._fetch_all(select(Tool).where(Tool.id.in_(primary_ids)))
+
     def get_tool_by_type_and_name(self, task_type: str, name: str):
         return (
             self.db_session.query(Tool)
@@ -0,0 +1,50 @@
+import threading
+from typing import Any, Callable, Hashable
+
+
+class _Call:
+    """一次执行中的调用，等待者通过 done 获取结果"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """合并并发的相同调用
+
+    同一个键同时只有一个线程执行 fn，执行期间到达的相同调用阻塞等待并共享其结果或异常；
+    执行结束后不保留结果，之后的调用会重新执行(结果缓存由调用方负责)。
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        """执行或等待 key 对应的调用，返回结果和是否共享了其他线程的执行结果"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
@@ -1,6 +1,8 @@
+import asyncio
 import importlib
 import inspect
 import logging
+import threading
 from functools import wraps
 from typing import Callable, List, Union
 
@@ -11,6 +13,7 @@ from langchain_core.tools import StructuredTool
 from app.core.service import BaseService
 from app.core.singleton import Singleton
 from app.models.tool import Tool as ToolModel
+from app.tools.akshare_cache import akshare_call, run_blocking
 from app.tools.datastore import ToolDatastore
 from app.utils.func import format_doc
 from app.vectorstore.vectorstore_factory import VectorStoreFactory
@@ -23,6 +26,8 @@ VECTOR_DB_PATH = "tools.db"
 class ToolManager(BaseService[ToolDatastore, ToolModel], metaclass=Singleton):
     def __init__(self, datastore: ToolDatastore):
         super().__init__(datastore)
+        # 数据库会话不是线程安全的，异步接口在线程中查询时逐个访问
+        self._session_lock = threading.Lock()
         self._vector_store = VectorStoreFactory().get_instance(
             "QdrantVectorStore", collection_name="tools"
         )
@@ -82,12 +87,16 @@ class ToolManager(BaseService[ToolDatastore, ToolModel], metaclass=Singleton):
     def _create_tool_function(self, tool_config: ToolModel) -> Callable:
         """为工具创建包装函数"""
         func = self._get_tool_func(tool_config)
+        cached = tool_config.tool_type == "akshare"
 
         @wraps(func)
         def wrapper(*args, **kwargs):
             try:
                 logger.info(f"调用工具: {tool_config.name}, 参数: {kwargs}")
-                result = func(*args, **kwargs)
+                if cached:
+                    result = akshare_call(func, *args, **kwargs)
+                else:
+                    result = func(*args, **kwargs)
                 if hasattr(result, "to_markdown"):
                     if len(result) > 100:
                         result = result.head(100)
@@ -100,61 +109,87 @@ class ToolManager(BaseService[ToolDatastore, ToolModel], metaclass=Singleton):
 
         return wrapper
 
+    def _create_tool(self, tool_config: ToolModel) -> StructuredTool:
+        """创建工具实例，异步调用时在有界线程池中执行，不阻塞事件循环"""
+        func = self._create_tool_function(tool_config)
+
+        @wraps(func)
+        async def coroutine(*args, **kwargs):
+            return await run_blocking(func, *args, **kwargs)
+
+        return StructuredTool.from_function(
+            name=tool_config.name,
+            description=tool_config.description,
+            func=func,
+            coroutine=coroutine,
+        )
+
+    def search_tool_ids(
+        self, query: Union[str, list[str]], top_k: int = 5
+    ) -> list[int]:
+        """向量检索相关工具的 id，多个查询一次计算向量、一次批量检索，按查询顺序去重"""
+        queries = [query] if isinstance(query, str) else list(query)
+        try:
+            results = self._vector_store.search_batch(queries, top_k)
+        except Exception as e:
+            logger.error(f"检索工具失败: {str(e)}")
+            return []
+        ids = (doc.metadata["_id"] for docs in results for doc in docs)
+        return list(dict.fromkeys(ids))
+
+    def create_tools(self, ids: list[int]) -> List[Tool]:
+        """按 id 一次查询工具配置并创建工具实例，顺序与 ids 一致"""
+        try:
+            with self._session_lock:
+                tool_configs = self.datastore.get_tools(ids)
+            configs = {tool_config.id: tool_config for tool_config in tool_configs}
+            return [self._create_tool(configs[i]) for i in ids if i in configs]
+        except Exception as e:
+            logger.error(f"创建工具失败: {str(e)}")
+            return []
+
     def search_and_create_tools(
         self, query: Union[str, list[str]], top_k: int = 5
     ) -> List[Tool]:
         """根据用户问题搜索并创建相关工具
 
         Args:
-            query: 用户问题
-            top_k: 返回的最相关工具数量
+            query: 用户问题或关键词列表
+            top_k: 每个查询返回的最相关工具数量
 
         Returns:
             List[Tool]: 相关工具列表
         """
-        try:
-            # 使用向量数据库搜索相关工具
-            if isinstance(query, str):
-                results = self._vector_store.search(query, top_k)
-            else:
-                results = []
-                ids = []
-                for q in query:
-                    for result in self._vector_store.search(q, top_k):
-                        if result.metadata.get("_id") not in ids:
-                            results.append(result)
-                            ids.append(result.metadata.get("_id"))
-            tools = []
-            for doc in results:
-                # 获取工具配置
-                tool_config = self.datastore.get_tool(doc.metadata["_id"])
-                if not tool_config:
-                    continue
-                # 创建工具实例
-                tool = StructuredTool.from_function(
-                    name=tool_config.name,
-                    description=tool_config.description,
-                    func=self._create_tool_function(tool_config),
-                )
-                tools.append(tool)
-
-            return tools
-
-        except Exception as e:
-            logger.error(f"搜索创建工具失败: {str(e)}")
-            return []
+        return self.create_tools(self.search_tool_ids(query, top_k))
 
     def get_tool(self, tool_type: str, name: str) -> Tool | None:
         """根据工具类型和名称获取工具实例"""
-        tool_config = self.datastore.get_tool_by_type_and_name(tool_type, name)
+        with self._session_lock:
+            tool_config = self.datastore.get_tool_by_type_and_name(tool_type, name)
         if tool_config:
-            return StructuredTool.from_function(
-                name=tool_config.name,
-                description=tool_config.description,
-                func=self._create_tool_function(tool_config),
-            )
+            return self._create_tool(tool_config)
         return None
 
+    async def asearch_and_create_tools(
+        self, query: Union[str, list[str]], top_k: int = 5
+    ) -> List[Tool]:
+        """search_and_create_tools 的异步版本，向量检索和查库在线程中执行"""
+        return await asyncio.to_thread(self.search_and_create_tools, query, top_k)
+
+    async def asearch_tool_ids(
+        self, query: Union[str, list[str]], top_k: int = 5
+    ) -> list[int]:
+        """search_tool_ids 的异步版本"""
+        return await asyncio.to_thread(self.search_tool_ids, query, top_k)
+
+    async def acreate_tools(self, ids: list[int]) -> List[Tool]:
+        """create_tools 的异步版本"""
+        return await asyncio.to_thread(self.create_tools, ids)
+
+    async def aget_tool(self, tool_type: str, name: str) -> Tool | None:
+        """get_tool 的异步版本"""
+        return await asyncio.to_thread(self.get_tool, tool_type, name)
+
     @classmethod
     def _get_tool_func(cls, tool_config: ToolModel) -> Callable:
         module_path, func_name = tool_config.function_path.rsplit(".", 1)
@@ -17,3 +17,8 @@ def df_process(
     if sort_column:
         df = df.sort_values(by=sort_column, ascending=ascending)
     return df
+
+
+def df_to_records(df: pd.DataFrame) -> list[dict]:
+    """DataFrame 转为可直接写库的记录列表，NaN 转为 None"""
+    return df.astype(object).where(df.notna(), None).to_dict("records")
@@ -0,0 +1,235 @@
+"""截面批量技术指标计算
+
+输入为 (K线 × 股票) 的二维矩阵，沿时间轴(axis=0)对所有股票同时计算指标。
+每列允许以 NaN 开头(上市时间较短的股票)，各列的初始值与 talib 对单只股票的计算方式一致。
+"""
+
+from typing import Any, Callable
+
+import numpy as np
+
+# 与 talib 的 TA_IS_ZERO 保持一致
+_EPSILON = 0.00000001
+
+
+def _shift(x: np.ndarray, n: int = 1) -> np.ndarray:
+    result = np.full_like(x, np.nan)
+    result[n:] = x[:-n]
+    return result
+
+
+def rolling_mean(x: np.ndarray, n: int) -> np.ndarray:
+    """滚动平均，窗口内存在 NaN 时结果为 NaN"""
+    valid = ~np.isnan(x)
+    total = np.cumsum(np.where(valid, x, 0.0), axis=0)
+    count = np.cumsum(valid, axis=0)
+    total[n:] = total[n:] - total[:-n]
+    count[n:] = count[n:] - count[:-n]
+    result = total / n
+    result[count < n] = np.nan
+    return result
+
+
+def rolling_max(x: np.ndarray, n: int) -> np.ndarray:
+    result = np.full_like(x, np.nan)
+    if len(x) >= n:
+        windows = np.lib.stride_tricks.sliding_window_view(x, n, axis=0)
+        result[n - 1 :] = windows.max(axis=-1)
+    return result
+
+
+def rolling_min(x: np.ndarray, n: int) -> np.ndarray:
+    result = np.full_like(x, np.nan)
+    if len(x) >= n:
+        windows = np.lib.stride_tricks.sliding_window_view(x, n, axis=0)
+        result[n - 1 :] = windows.min(axis=-1)
+    return result
+
+
+def ema(x: np.ndarray, n: int, skip: int = 0) -> np.ndarray:
+    """指数移动平均，以每列前 n 个有效值的简单平均作为初始值
+
+    skip 为每列开始计算前忽略的有效值个数，用于对齐 talib MACD 中快线的起始位置。
+    """
+    k = 2.0 / (n + 1)
+    result = np.full_like(x, np.nan)
+    seen = np.zeros(x.shape[1], dtype=np.int64)
+    seed = np.zeros(x.shape[1])
+    value = np.full(x.shape[1], np.nan)
+    for t in range(len(x)):
+        row = x[t]
+        valid = ~np.isnan(row)
+        seen += valid
+        warming = valid & (seen > skip) & (seen <= skip + n)
+        seed = np.where(warming, seed + np.where(valid, row, 0.0), seed)
+        value = np.where(valid & (seen == skip + n), seed / n, value)
+        value = np.where(valid & (seen > skip + n), (row - value) * k + value, value)
+        result[t] = np.where(valid & (seen >= skip + n), value, np.nan)
+    return result
+
+
+def on_trading_bars(func: Callable[..., Any], *matrices: np.ndarray) -> Any:
+    """只在每只股票有数据的K线上计算指标，停牌日(NaN)的结果为 NaN
+
+    每列的有效K线按原顺序移到末尾、前面补 NaN 后调用 func，再把结果放回原来的位置，
+    与逐只股票只对交易日计算的结果一致；func 返回单个矩阵或矩阵元组。
+    """
+    valid = np.logical_and.reduce([~np.isnan(x) for x in matrices])
+    # 稳定排序：无效行在前，有效行保持时间顺序在后
+    order = np.argsort(valid, axis=0, kind="stable")
+    packed_valid = np.take_along_axis(valid, order, axis=0)
+    packed = [
+        np.where(packed_valid, np.take_along_axis(x, order, axis=0), np.nan)
+        for x in matrices
+    ]
+
+    def unpack(result: np.ndarray) -> np.ndarray:
+        restored = np.full_like(result, np.nan)
+        np.put_along_axis(restored, order, result, axis=0)
+        restored[~valid] = np.nan
+        return restored
+
+    result = func(*packed)
+    if isinstance(result, tuple):
+        return tuple(unpack(x) for x in result)
+    return unpack(result)
+
+
+def calculate_ma(x: np.ndarray, n: int) -> np.ndarray:
+    """计算移动平均线"""
+    return rolling_mean(x, n)
+
+
+def calculate_macd(
+    close: np.ndarray,
+    fast_period: int = 12,
+    slow_period: int = 26,
+    signal_period: int = 9,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """计算MACD指标，柱状值放大两倍"""
+    fast = ema(close, fast_period, skip=slow_period - fast_period)
+    slow = ema(close, slow_period)
+    diff = fast - slow
+    dea = ema(diff, signal_period)
+    diff = np.where(np.isnan(dea), np.nan, diff)
+    return diff, dea, (diff - dea) * 2
+
+
+def calculate_kdj(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    n: int = 9,
+    m1: int = 5,
+    m2: int = 5,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """计算KDJ指标，对应 talib STOCH 的 EMA 平滑"""
+    highest = rolling_max(high, n)
+    lowest = rolling_min(low, n)
+    diff = (highest - lowest) / 100.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fast_k = np.where(diff != 0, (close - lowest) / diff, 0.0)
+    fast_k[np.isnan(highest) | np.isnan(lowest)] = np.nan
+    k = ema(fast_k, m1)
+    d = ema(k, m2)
+    k = np.where(np.isnan(d), np.nan, k)
+    return k, d, 3 * k - 2 * d
+
+
+def calculate_rsi(close: np.ndarray, n: int = 14) -> np.ndarray:
+    """计算RSI指标，Wilder 平滑"""
+    change = close - _shift(close)
+    result = np.full_like(close, np.nan)
+    seen = np.zeros(close.shape[1], dtype=np.int64)
+    gain = np.zeros(close.shape[1])
+    loss = np.zeros(close.shape[1])
+    for t in range(1, len(close)):
+        row = change[t]
+        valid = ~np.isnan(row)
+        seen += valid
+        up = np.where(valid & (row > 0), row, 0.0)
+        down = np.where(valid & (row < 0), -row, 0.0)
+        warming = valid & (seen <= n)
+        gain = np.where(warming, gain + up, gain)
+        loss = np.where(warming, loss + down, loss)
+        seeded = valid & (seen == n)
+        gain = np.where(seeded, gain / n, gain)
+        loss = np.where(seeded, loss / n, loss)
+        running = valid & (seen > n)
+        gain = np.where(running, (gain * (n - 1) + up) / n, gain)
+        loss = np.where(running, (loss * (n - 1) + down) / n, loss)
+        total = gain + loss
+        with np.errstate(divide="ignore", invalid="ignore"):
+            value = np.where(np.abs(total) < _EPSILON, 0.0, 100.0 * gain / total)
+        result[t] = np.where(valid & (seen >= n), value, np.nan)
+    return result
+
+
+def calculate_boll(
+    close: np.ndarray, n: int = 20, k: float = 2
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """计算布林带，标准差为总体标准差"""
+    middle = rolling_mean(close, n)
+    variance = rolling_mean(close * close, n) - middle * middle
+    std = np.sqrt(np.where(variance < _EPSILON, 0.0, variance))
+    return middle + k * std, middle, middle - k * std
+
+
+def calculate_cci(
+    high: np.ndarray, low: np.ndarray, close: np.ndarray, n: int = 14
+) -> np.ndarray:
+    """计算CCI指标"""
+    typical = (high + low + close) / 3
+    # 与 talib 一致逐窗口求和，横盘时偏离值严格为 0
+    windows = [typical[n - 1 - offset : len(typical) - offset] for offset in range(n)]
+    average = np.full_like(typical, np.nan)
+    average[n - 1 :] = sum(windows) / n
+    deviation = np.zeros_like(typical)
+    for window in windows:
+        deviation[n - 1 :] += np.abs(window - average[n - 1 :])
+    deviation /= n
+    current = typical - average
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = np.where(
+            (current != 0) & (deviation != 0), current / (0.015 * deviation), 0.0
+        )
+    result[np.isnan(average)] = np.nan
+    return result
+
+
+def calculate_trix(
+    close: np.ndarray, n: int = 12, m: int = 9
+) -> tuple[np.ndarray, np.ndarray]:
+    """计算TRIX指标"""
+    triple = ema(ema(ema(close, n), n), n)
+    previous = _shift(triple)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        trix = np.where(previous != 0, (triple - previous) / previous * 100, 0.0)
+    trix[np.isnan(triple) | np.isnan(previous)] = np.nan
+    return trix, rolling_mean(trix, m)
+
+
+def calculate_dma(
+    close: np.ndarray, short: int = 10, long: int = 50, m: int = 10
+) -> tuple[np.ndarray, np.ndarray]:
+    """计算DMA指标"""
+    dma = rolling_mean(close, short) - rolling_mean(close, long)
+    return dma, rolling_mean(dma, m)
+
+
+def calculate_indicator_matrix(
+    high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray
+) -> dict[str, np.ndarray]:
+    """批量计算全部技术指标，返回指标名到 (K线 × 股票) 矩阵的映射"""
+    result = {f"ma{n}": calculate_ma(close, n) for n in (5, 10, 20, 30, 60)}
+    result["diff"], result["dea"], result["macd"] = calculate_macd(close)
+    result["k"], result["d"], result["j"] = calculate_kdj(high, low, close)
+    for n in (6, 12, 24):
+        result[f"rsi{n}"] = calculate_rsi(close, n)
+    result["boll_up"], result["boll_mid"], result["boll_down"] = calculate_boll(close)
+    for n in (5, 10, 20):
+        result[f"vma{n}"] = calculate_ma(volume, n)
+    result["trix"], result["matrix"] = calculate_trix(close)
+    result["cci"] = calculate_cci(high, low, close)
+    result["dma"], result["ama"] = calculate_dma(close)
+    return result
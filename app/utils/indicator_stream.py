@@ -0,0 +1,445 @@
+"""增量(流式)技术指标计算
+
+每个指标只保存递推所需的最小状态(EMA 累加值、滚动窗口的环形缓冲、RSI 平均涨跌幅)，
+逐根K线推进即可得到与 talib 批量计算一致的结果。状态可序列化为 JSON 持久化。
+"""
+
+import math
+from collections import deque
+from typing import Any, Optional
+
+NAN = math.nan
+
+
+def _is_zero(value: float) -> bool:
+    # 与 talib 的 TA_IS_ZERO 保持一致
+    return -0.00000001 < value < 0.00000001
+
+
+class StreamSMA:
+    """简单移动平均"""
+
+    def __init__(self, n: int, values: Optional[list[float]] = None):
+        self.n = n
+        self.values = deque(values or [], maxlen=n)
+
+    def update(self, value: float) -> float:
+        self.values.append(value)
+        if len(self.values) < self.n:
+            return NAN
+        return sum(self.values) / self.n
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"n": self.n, "values": list(self.values)}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "StreamSMA":
+        return cls(data["n"], data["values"])
+
+
+class StreamEMA:
+    """指数移动平均，与 talib 一致以前 n 个值的简单平均作为初始值
+
+    skip 为开始计算前忽略的数据个数，用于对齐 talib MACD 中快线的起始位置。
+    """
+
+    def __init__(
+        self,
+        n: int,
+        skip: int = 0,
+        seed_sum: float = 0.0,
+        seed_count: int = 0,
+        value: Optional[float] = None,
+    ):
+        self.n = n
+        self.skip = skip
+        self.seed_sum = seed_sum
+        self.seed_count = seed_count
+        self.value = value
+
+    def update(self, value: float) -> float:
+        if self.skip > 0:
+            self.skip -= 1
+            return NAN
+        if self.value is None:
+            self.seed_sum += value
+            self.seed_count += 1
+            if self.seed_count < self.n:
+                return NAN
+            self.value = self.seed_sum / self.n
+            return self.value
+        self.value = (value - self.value) * (2.0 / (self.n + 1)) + self.value
+        return self.value
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "n": self.n,
+            "skip": self.skip,
+            "seed_sum": self.seed_sum,
+            "seed_count": self.seed_count,
+            "value": self.value,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "StreamEMA":
+        return cls(**data)
+
+
+class StreamMACD:
+    """MACD，柱状值与 calculate_macd 一致放大两倍"""
+
+    def __init__(
+        self,
+        fast_period: int = 12,
+        slow_period: int = 26,
+        signal_period: int = 9,
+        fast: Optional[StreamEMA] = None,
+        slow: Optional[StreamEMA] = None,
+        signal: Optional[StreamEMA] = None,
+    ):
+        self.fast = fast or StreamEMA(fast_period, skip=slow_period - fast_period)
+        self.slow = slow or StreamEMA(slow_period)
+        self.signal = signal or StreamEMA(signal_period)
+
+    def update(self, close: float) -> tuple[float, float, float]:
+        fast = self.fast.update(close)
+        slow = self.slow.update(close)
+        if math.isnan(slow):
+            return NAN, NAN, NAN
+        diff = fast - slow
+        dea = self.signal.update(diff)
+        if math.isnan(dea):
+            return NAN, NAN, NAN
+        return diff, dea, (diff - dea) * 2
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "fast": self.fast.to_dict(),
+            "slow": self.slow.to_dict(),
+            "signal": self.signal.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "StreamMACD":
+        return cls(
+            fast=StreamEMA.from_dict(data["fast"]),
+            slow=StreamEMA.from_dict(data["slow"]),
+            signal=StreamEMA.from_dict(data["signal"]),
+        )
+
+
+class StreamKDJ:
+    """KDJ，对应 talib STOCH(fastk=n, slowk=m1, slowd=m2, EMA 平滑)"""
+
+    def __init__(
+        self,
+        n: int = 9,
+        m1: int = 5,
+        m2: int = 5,
+        highs: Optional[list[float]] = None,
+        lows: Optional[list[float]] = None,
+        k: Optional[StreamEMA] = None,
+        d: Optional[StreamEMA] = None,
+    ):
+        self.n = n
+        self.highs = deque(highs or [], maxlen=n)
+        self.lows = deque(lows or [], maxlen=n)
+        self.k = k or StreamEMA(m1)
+        self.d = d or StreamEMA(m2)
+
+    def update(
+        self, high: float, low: float, close: float
+    ) -> tuple[float, float, float]:
+        self.highs.append(high)
+        self.lows.append(low)
+        if len(self.highs) < self.n:
+            return NAN, NAN, NAN
+        highest = max(self.highs)
+        lowest = min(self.lows)
+        diff = (highest - lowest) / 100.0
+        fast_k = (close - lowest) / diff if diff != 0 else 0.0
+        k = self.k.update(fast_k)
+        if math.isnan(k):
+            return NAN, NAN, NAN
+        d = self.d.update(k)
+        if math.isnan(d):
+            return NAN, NAN, NAN
+        return k, d, 3 * k - 2 * d
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "n": self.n,
+            "highs": list(self.highs),
+            "lows": list(self.lows),
+            "k": self.k.to_dict(),
+            "d": self.d.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "StreamKDJ":
+        return cls(
+            n=data["n"],
+            highs=data["highs"],
+            lows=data["lows"],
+            k=StreamEMA.from_dict(data["k"]),
+            d=StreamEMA.from_dict(data["d"]),
+        )
+
+
+class StreamRSI:
+    """RSI，Wilder 平滑"""
+
+    def __init__(
+        self,
+        n: int,
+        prev: Optional[float] = None,
+        count: int = 0,
+        gain: float = 0.0,
+        loss: float = 0.0,
+    ):
+        self.n = n
+        self.prev = prev
+        self.count = count
+        self.gain = gain
+        self.loss = loss
+
+    def update(self, close: float) -> float:
+        if self.prev is None:
+            self.prev = close
+            return NAN
+        change = close - self.prev
+        self.prev = close
+        if self.count < self.n:
+            self.count += 1
+            if change < 0:
+                self.loss -= change
+            else:
+                self.gain += change
+            if self.count < self.n:
+                return NAN
+            self.gain /= self.n
+            self.loss /= self.n
+        else:
+            self.gain *= self.n - 1
+            self.loss *= self.n - 1
+            if change < 0:
+                self.loss -= change
+            else:
+                self.gain += change
+            self.gain /= self.n
+            self.loss /= self.n
+        total = self.gain + self.loss
+        return 0.0 if _is_zero(total) else 100.0 * (self.gain / total)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "n": self.n,
+            "prev": self.prev,
+            "count": self.count,
+            "gain": self.gain,
+            "loss": self.loss,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "StreamRSI":
+        return cls(**data)
+
+
+class StreamBOLL:
+    """布林带，标准差为总体标准差"""
+
+    def __init__(self, n: int = 20, k: float = 2, values: Optional[list[float]] = None):
+        self.n = n
+        self.k = k
+        self.values = deque(values or [], maxlen=n)
+
+    def update(self, close: float) -> tuple[float, float, float]:
+        self.values.append(close)
+        if len(self.values) < self.n:
+            return NAN, NAN, NAN
+        mean = sum(self.values) / self.n
+        variance = sum(v * v for v in self.values) / self.n - mean * mean
+        std = math.sqrt(variance) if variance > 0 and not _is_zero(variance) else 0.0
+        return mean + self.k * std, mean, mean - self.k * std
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"n": self.n, "k": self.k, "values": list(self.values)}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "StreamBOLL":
+        return cls(**data)
+
+
+class StreamCCI:
+    """CCI"""
+
+    def __init__(self, n: int = 14, values: Optional[list[float]] = None):
+        self.n = n
+        self.values = deque(values or [], maxlen=n)
+
+    def update(self, high: float, low: float, close: float) -> float:
+        self.values.append((high + low + close) / 3)
+        if len(self.values) < self.n:
+            return NAN
+        mean = sum(self.values) / self.n
+        deviation = sum(abs(v - mean) for v in self.values) / self.n
+        current = self.values[-1] - mean
+        if current == 0 or deviation == 0:
+            return 0.0
+        return current / (0.015 * deviation)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"n": self.n, "values": list(self.values)}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "StreamCCI":
+        return cls(**data)
+
+
+class StreamTRIX:
+    """TRIX 及其均线 MATRIX"""
+
+    def __init__(
+        self,
+        n: int = 12,
+        m: int = 9,
+        emas: Optional[list[StreamEMA]] = None,
+        prev: Optional[float] = None,
+        ma: Optional[StreamSMA] = None,
+    ):
+        self.emas = emas or [StreamEMA(n) for _ in range(3)]
+        self.prev = prev
+        self.ma = ma or StreamSMA(m)
+
+    def update(self, close: float) -> tuple[float, float]:
+        value = close
+        for ema in self.emas:
+            value = ema.update(value)
+            if math.isnan(value):
+                return NAN, NAN
+        prev, self.prev = self.prev, value
+        if prev is None:
+            return NAN, NAN
+        trix = (value - prev) / prev * 100 if prev != 0 else 0.0
+        return trix, self.ma.update(trix)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "emas": [ema.to_dict() for ema in self.emas],
+            "prev": self.prev,
+            "ma": self.ma.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "StreamTRIX":
+        return cls(
+            emas=[StreamEMA.from_dict(ema) for ema in data["emas"]],
+            prev=data["prev"],
+            ma=StreamSMA.from_dict(data["ma"]),
+        )
+
+
+class StreamDMA:
+    """DMA 及其均线 AMA"""
+
+    def __init__(
+        self,
+        short: int = 10,
+        long: int = 50,
+        m: int = 10,
+        short_ma: Optional[StreamSMA] = None,
+        long_ma: Optional[StreamSMA] = None,
+        ama: Optional[StreamSMA] = None,
+    ):
+        self.short_ma = short_ma or StreamSMA(short)
+        self.long_ma = long_ma or StreamSMA(long)
+        self.ama = ama or StreamSMA(m)
+
+    def update(self, close: float) -> tuple[float, float]:
+        short_value = self.short_ma.update(close)
+        long_value = self.long_ma.update(close)
+        if math.isnan(long_value):
+            return NAN, NAN
+        dma = short_value - long_value
+        return dma, self.ama.update(dma)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "short_ma": self.short_ma.to_dict(),
+            "long_ma": self.long_ma.to_dict(),
+            "ama": self.ama.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "StreamDMA":
+        return cls(
+            short_ma=StreamSMA.from_dict(data["short_ma"]),
+            long_ma=StreamSMA.from_dict(data["long_ma"]),
+            ama=StreamSMA.from_dict(data["ama"]),
+        )
+
+
+class IndicatorState:
+    """单只股票全部指标的递推状态，字段与 StockIndicator 对应"""
+
+    MA_PERIODS = (5, 10, 20, 30, 60)
+    VMA_PERIODS = (5, 10, 20)
+    RSI_PERIODS = (6, 12, 24)
+
+    def __init__(self, data: Optional[dict[str, Any]] = None):
+        data = data or {}
+        self.bars: int = data.get("bars", 0)
+        self.ma = {
+            n: StreamSMA.from_dict(data["ma"][str(n)]) if data else StreamSMA(n)
+            for n in self.MA_PERIODS
+        }
+        self.vma = {
+            n: StreamSMA.from_dict(data["vma"][str(n)]) if data else StreamSMA(n)
+            for n in self.VMA_PERIODS
+        }
+        self.rsi = {
+            n: StreamRSI.from_dict(data["rsi"][str(n)]) if data else StreamRSI(n)
+            for n in self.RSI_PERIODS
+        }
+        self.macd = StreamMACD.from_dict(data["macd"]) if data else StreamMACD()
+        self.kdj = StreamKDJ.from_dict(data["kdj"]) if data else StreamKDJ()
+        self.boll = StreamBOLL.from_dict(data["boll"]) if data else StreamBOLL()
+        self.cci = StreamCCI.from_dict(data["cci"]) if data else StreamCCI()
+        self.trix = StreamTRIX.from_dict(data["trix"]) if data else StreamTRIX()
+        self.dma = StreamDMA.from_dict(data["dma"]) if data else StreamDMA()
+
+    def update(
+        self, high: float, low: float, close: float, volume: float
+    ) -> dict[str, float]:
+        """推进一根K线，返回当日全部指标，数据不足的指标为 NaN"""
+        self.bars += 1
+        values = {f"ma{n}": ma.update(close) for n, ma in self.ma.items()}
+        values["diff"], values["dea"], values["macd"] = self.macd.update(close)
+        values["k"], values["d"], values["j"] = self.kdj.update(high, low, close)
+        for n, rsi in self.rsi.items():
+            values[f"rsi{n}"] = rsi.update(close)
+        (
+            values["boll_up"],
+            values["boll_mid"],
+            values["boll_down"],
+        ) = self.boll.update(close)
+        for n, vma in self.vma.items():
+            values[f"vma{n}"] = vma.update(volume)
+        values["trix"], values["matrix"] = self.trix.update(close)
+        values["cci"] = self.cci.update(high, low, close)
+        values["dma"], values["ama"] = self.dma.update(close)
+        return values
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "bars": self.bars,
+            "ma": {str(n): ma.to_dict() for n, ma in self.ma.items()},
+            "vma": {str(n): vma.to_dict() for n, vma in self.vma.items()},
+            "rsi": {str(n): rsi.to_dict() for n, rsi in self.rsi.items()},
+            "macd": self.macd.to_dict(),
+            "kdj": self.kdj.to_dict(),
+            "boll": self.boll.to_dict(),
+            "cci": self.cci.to_dict(),
+            "trix": self.trix.to_dict(),
+            "dma": self.dma.to_dict(),
+        }
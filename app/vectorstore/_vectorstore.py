@@ -17,3 +17,7 @@ class VectorStore(ABC):
 
     def search(self, text: str, k: int = 4) -> List[Document]:
         pass
+
+    def search_batch(self, texts: Sequence[str], k: int = 4) -> List[List[Document]]:
+        """多个查询的检索结果，与 texts 一一对应"""
+        return [self.search(text, k) for text in texts]
@@ -2,9 +2,11 @@ import logging
 from typing import Iterable, List, Optional, Sequence
 
 from langchain_community import embeddings
+from langchain_community.embeddings.dashscope import embed_with_retry
+from langchain_core.documents import Document
 from langchain_qdrant import QdrantVectorStore as Lc_QdrantVectorStore
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams
+from qdrant_client.http.models import Distance, QueryRequest, ScoredPoint, VectorParams
 
 from app.config.setting import settings
 from app.vectorstore._vectorstore import VectorStore
@@ -49,3 +51,44 @@ class QdrantVectorStore(VectorStore):
 
     def search(self, text: str, k: int = 4) -> List[dict]:
         return self._store.similarity_search(text, k=k)
+
+    def search_batch(self, texts: Sequence[str], k: int = 4) -> List[List[Document]]:
+        """一次计算全部查询的向量，一次批量检索"""
+        if not texts:
+            return []
+        store = self._store
+        responses = store.client.query_batch_points(
+            collection_name=self._collection_name,
+            requests=[
+                QueryRequest(
+                    query=vector, using=store.vector_name, limit=k, with_payload=True
+                )
+                for vector in self._embed_queries(list(texts))
+            ],
+        )
+        return [
+            [self._to_document(point) for point in response.points]
+            for response in responses
+        ]
+
+    def _to_document(self, point: ScoredPoint) -> Document:
+        """按 langchain_qdrant 的 payload 结构构造文档，元数据与 similarity_search 一致"""
+        payload = point.payload or {}
+        metadata = dict(payload.get(self._store.metadata_payload_key) or {})
+        metadata["_id"] = point.id
+        metadata["_collection_name"] = self._collection_name
+        return Document(
+            page_content=payload.get(self._store.content_payload_key, ""),
+            metadata=metadata,
+        )
+
+    def _embed_queries(self, texts: list[str]) -> List[List[float]]:
+        embedding = self._store.embeddings
+        if isinstance(embedding, embeddings.DashScopeEmbeddings):
+            # 按查询文本计算向量，与 similarity_search 的 embed_query 一致
+            response = embed_with_retry(
+                embedding, input=texts, text_type="query", model=embedding.model
+            )
+            return [item["embedding"] for item in response]
+        # 其他向量模型没有批量计算查询向量的接口，逐个计算
+        return [embedding.embed_query(text) for text in texts]
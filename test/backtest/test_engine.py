@@ -0,0 +1,199 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy.orm import Session
+
+from app.backtest.engine import BacktestConfig, BacktestEngine, price_limits
+from app.backtest.panel import MarketPanel
+from app.models.stock import StockDaily, StockIndicator
+from app.stock.datastore import StockDatastore
+from app.strategy._strategy import BaseStrategy
+from app.strategy.ma_strategy import MaCrossStrategy
+
+NAN = np.nan
+
+
+class MaskStrategy(BaseStrategy):
+    """直接给定买卖信号掩码"""
+
+    name = "掩码"
+
+    def __init__(self, buy: np.ndarray, sell: np.ndarray = None):
+        self.buy = np.asarray(buy, dtype=bool)
+        self.sell = None if sell is None else np.asarray(sell, dtype=bool)
+
+    def buy_signals(self, df) -> np.ndarray:
+        return self.buy
+
+    def sell_signals(self, df) -> np.ndarray:
+        return super().sell_signals(df) if self.sell is None else self.sell
+
+
+def _panel(open_, close, codes=("000001",)) -> MarketPanel:
+    open_ = np.asarray(open_, dtype=float).reshape(len(open_), -1)
+    close = np.asarray(close, dtype=float).reshape(len(close), -1)
+    dates = pd.bdate_range("2024-12-02", periods=len(open_)).to_numpy()
+    return MarketPanel(dates, np.array(codes), {"open": open_, "close": close})
+
+
+def test_market_panel_from_frame():
+    history = pd.DataFrame(
+        {
+            "code": ["000001", "000001", "000001", "000002", "000002"],
+            "name": "测试",
+            "trade_date": pd.to_datetime(
+                ["2024-12-02", "2024-12-03", "2024-12-04", "2024-12-02", "2024-12-04"]
+            ),
+            "close": [10.0, 11.0, 12.0, 20.0, 22.0],
+        }
+    )
+
+    panel = MarketPanel.from_frame(history)
+
+    assert panel.shape == (3, 2)
+    assert list(panel) == ["close"]
+    assert list(panel.codes) == ["000001", "000002"]
+    np.testing.assert_array_equal(
+        panel["close"], [[10.0, 20.0], [11.0, NAN], [12.0, 22.0]]
+    )
+    # 停牌日之后的前一日取值为最近一个有数据的交易日
+    np.testing.assert_array_equal(
+        panel["prev_close"], [[NAN, NAN], [10.0, 20.0], [11.0, 20.0]]
+    )
+    with pytest.raises(KeyError):
+        panel["prev_ma5"]
+
+
+def test_price_limits():
+    codes = np.array(["600000", "000001", "300750", "688981", "830799", "600001"])
+    names = np.array(
+        ["浦发银行", "平安银行", "宁德时代", "中芯国际", "艾融软件", "*ST测试"]
+    )
+
+    np.testing.assert_allclose(
+        price_limits(codes, names), [0.1, 0.1, 0.2, 0.2, 0.3, 0.05]
+    )
+
+
+def test_t_plus_one_fills_and_costs():
+    config = BacktestConfig(commission=0.001, stamp_tax=0.001)
+    engine = BacktestEngine(
+        _panel(
+            open_=[10.0, 10.2, 10.5, 11.0, 10.8],
+            close=[10.0, 10.4, 10.8, 10.9, 10.7],
+        ),
+        config,
+    )
+    buy = np.array([True, False, False, False, False])[:, None]
+    sell = np.array([False, False, True, False, False])[:, None]
+
+    result = engine.run(MaskStrategy(buy, sell))
+
+    # 第0天信号，第1天开盘买入，第2天收盘卖出信号，第3天开盘卖出
+    expected = [
+        0.0,
+        10.4 / 10.2 * (1 - 0.001) - 1,
+        10.8 / 10.4 - 1,
+        11.0 / 10.8 * (1 - 0.001 - 0.001) - 1,
+        0.0,
+    ]
+    np.testing.assert_allclose(result.returns, expected)
+    np.testing.assert_allclose(result.equity, np.cumprod(1 + np.array(expected)))
+    assert result.trades == 2
+    assert result.blocked == 0
+    assert result.total_return == pytest.approx(result.equity[-1] - 1)
+    assert result.max_drawdown == 0
+
+
+def test_limit_up_and_suspension_block_buys():
+    # 第二只股票次日开盘涨停，第三只停牌，买入委托作废
+    engine = BacktestEngine(
+        _panel(
+            open_=[[10.0, 10.0, 10.0], [10.1, 11.0, NAN], [10.2, 11.5, 10.0]],
+            close=[[10.0, 10.0, 10.0], [10.2, 11.0, NAN], [10.3, 12.1, 10.0]],
+            codes=("000001", "000002", "000003"),
+        )
+    )
+    buy = np.zeros((3, 3), dtype=bool)
+    buy[0] = True
+
+    result = engine.run(MaskStrategy(buy))
+
+    assert result.trades == 1
+    assert result.blocked == 2
+    np.testing.assert_allclose(
+        result.returns[1:],
+        [10.2 / 10.1 * (1 - 0.00025) - 1, 10.3 / 10.2 - 1],
+    )
+
+
+def test_limit_down_delays_sells():
+    engine = BacktestEngine(
+        _panel(
+            open_=[10.0, 10.0, 9.0, 8.5],
+            close=[10.0, 10.0, 9.0, 8.6],
+            codes=("600000",),
+        )
+    )
+    buy = np.array([True, False, False, False])[:, None]
+    sell = np.array([False, True, False, False])[:, None]
+
+    result = engine.run(MaskStrategy(buy, sell))
+
+    # 第2天开盘跌停无法卖出，顺延到第3天开盘
+    assert result.blocked == 1
+    assert result.trades == 2
+    assert result.returns[2] == pytest.approx(9.0 / 10.0 - 1)
+    assert result.returns[3] == pytest.approx(8.5 / 9.0 * (1 - 0.00075) - 1)
+
+
+def test_run_grid_matches_serial(make_bars):
+    frames = [
+        make_bars(200, seed=seed, code=f"{seed:06d}").rename_axis("trade_date")
+        for seed in range(20)
+    ]
+    history = pd.concat(frames).reset_index()
+    engine = BacktestEngine(MarketPanel.from_frame(history))
+    grid = [MaCrossStrategy(5, 10), MaCrossStrategy(5, 20)]
+
+    serial = engine.run_grid(grid, max_workers=1)
+    parallel = engine.run_grid(grid, max_workers=2)
+
+    assert [r.trades for r in serial] == [r.trades for r in parallel]
+    assert serial[0].trades > 0
+    for left, right in zip(serial, parallel):
+        np.testing.assert_allclose(left.equity, right.equity)
+
+
+def test_engine_from_datastore(memory_session: Session, make_bars):
+    datastore = StockDatastore(memory_session)
+    for seed, code in enumerate(["000001", "000002"]):
+        bars = make_bars(30, seed=seed, code=code)
+        datastore.bulk_insert_frame(
+            StockDaily, bars.assign(name=code, trade_date=bars.index.date)
+        )
+        datastore.bulk_insert_frame(
+            StockIndicator,
+            pd.DataFrame(
+                {
+                    "code": code,
+                    "trade_date": bars.index.date,
+                    "ma5": bars["close"].rolling(5).mean().to_numpy(),
+                    "ma20": bars["close"].rolling(20).mean().to_numpy(),
+                }
+            ),
+        )
+
+    engine = BacktestEngine.from_datastore(
+        datastore,
+        date(2024, 12, 1),
+        date(2024, 12, 31),
+        fields=["ma5", "ma20"],
+    )
+
+    assert set(engine.panel) == {"open", "close", "ma5", "ma20"}
+    assert engine.panel.shape == (22, 2)
+    result = engine.run(MaCrossStrategy())
+    assert len(result.equity) == 22
@@ -0,0 +1,95 @@
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from app.backtest.engine import BacktestEngine
+from app.backtest.panel import MarketPanel
+from app.backtest.sweep import ParameterSweep, SharedPanel
+from app.stock.indicator_service import StockIndicatorService
+from app.strategy.ma_strategy import MaCrossStrategy
+from app.strategy.macd_strategy import MacdCrossStrategy
+from app.strategy.oscillator_strategy import KdjCrossStrategy
+
+
+def _panel(make_bars, codes: int = 20, days: int = 200) -> MarketPanel:
+    frames = [
+        make_bars(days, seed=seed, code=f"{seed:06d}").rename_axis("trade_date")
+        for seed in range(codes)
+    ]
+    return MarketPanel.from_frame(pd.concat(frames).reset_index())
+
+
+def test_shared_panel(make_bars):
+    panel = _panel(make_bars)
+
+    with SharedPanel(panel) as shared:
+        opened = shared.handle.open()
+        assert isinstance(opened["close"], np.memmap)
+        np.testing.assert_array_equal(opened["close"], panel["close"])
+        np.testing.assert_array_equal(opened["prev_close"], panel["prev_close"])
+        # 句柄不包含字段矩阵
+        assert len(pickle.dumps(shared.handle)) < panel["close"].nbytes
+    assert not os.path.exists(shared.directory)
+
+
+def test_parameter_sweep(make_bars):
+    panel = _panel(make_bars)
+    grid = {"fast": [3, 5], "slow": [10, 20, 30]}
+
+    serial = ParameterSweep(panel, MaCrossStrategy, grid, max_workers=1)
+    streamed = list(serial.stream())
+    parallel = ParameterSweep(panel, MaCrossStrategy, grid, max_workers=2).run()
+
+    assert len(streamed) == len(parallel) == 6
+    table = serial.table()
+    assert table["sharpe"].is_monotonic_decreasing
+    assert list(table.columns[:2]) == ["fast", "slow"]
+    pd.testing.assert_frame_equal(
+        table.drop(columns="elapsed").sort_values(["fast", "slow"], ignore_index=True),
+        parallel.drop(columns="elapsed").sort_values(
+            ["fast", "slow"], ignore_index=True
+        ),
+    )
+
+
+def test_sweep_indicator_periods(make_bars):
+    panel = _panel(make_bars, codes=5)
+
+    table = ParameterSweep(
+        panel,
+        MacdCrossStrategy,
+        {"fast_period": [6, 12], "slow_period": [26]},
+        max_workers=1,
+        rank_by="total_return",
+    ).run()
+
+    assert table["total_return"].is_monotonic_decreasing
+    # 不同周期的 MACD 产生不同的交易
+    assert table["trades"].nunique() == 2
+
+
+def test_computed_indicators_match_stored_with_suspensions(make_bars):
+    frames = []
+    for seed in range(4):
+        bars = make_bars(200, seed=seed, code=f"{seed:06d}")
+        if seed == 0:
+            # 停牌 10 个交易日
+            bars = bars.drop(bars.index[80:90])
+        indicators = StockIndicatorService._compute_indicators(bars)
+        frames.append(bars.join(indicators[["ma5", "ma20", "k", "d"]]))
+    history = pd.concat(frames).rename_axis("trade_date").reset_index()
+    stored = MarketPanel.from_frame(history)
+    computed = MarketPanel.from_frame(history.drop(columns=["ma5", "ma20", "k", "d"]))
+
+    for strategy in (MaCrossStrategy(5, 20), KdjCrossStrategy()):
+        fields = strategy.indicators(computed)
+        for name, values in fields.items():
+            np.testing.assert_allclose(
+                values, stored[name], rtol=1e-7, atol=1e-6, err_msg=name
+            )
+        expected = BacktestEngine(stored).run(strategy)
+        actual = BacktestEngine(computed).run(strategy)
+        assert actual.trades == expected.trades
+        np.testing.assert_allclose(actual.equity, expected.equity)
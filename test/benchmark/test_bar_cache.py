@@ -0,0 +1,50 @@
+import logging
+import time
+from datetime import date
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.stock import StockDaily
+from app.stock.bar_cache import BarCache
+from app.stock.datastore import StockDatastore
+
+logger = logging.getLogger(__name__)
+
+# 5 年日线
+PERIODS = 5 * 250
+ROUNDS = 50
+
+
+def _measure(load) -> float:
+    load()
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        load()
+    return (time.perf_counter() - started) / ROUNDS
+
+
+def test_bar_cache_benchmark(memory_session: Session, make_bars, tmp_path):
+    bar_cache = BarCache(str(tmp_path / "bars"))
+    datastore = StockDatastore(memory_session, bar_cache=bar_cache)
+    bars = make_bars(PERIODS)
+    datastore.bulk_insert_frame(
+        StockDaily, bars.assign(name="平安银行", trade_date=bars.index.date)
+    )
+    bar_cache.rebuild(
+        "000001", datastore.get_stock_history_frame("000001").reset_index()
+    )
+    start = date(2024, 1, 1)
+
+    database = _measure(lambda: datastore.get_stock_history_frame("000001", start))
+    cached = _measure(lambda: bar_cache.frame("000001", start))
+    window = _measure(lambda: bar_cache.window("000001", start))
+    logger.info(
+        f"{PERIODS}根K线取近一年: 数据库 {database * 1000:.2f}ms, "
+        f"缓存 DataFrame {cached * 1000:.2f}ms, 映射切片 {window * 1e6:.1f}us"
+    )
+
+    expected = datastore.get_stock_history_frame("000001", start)
+    actual = bar_cache.frame("000001", start)
+    np.testing.assert_array_equal(actual["close"], expected["close"])
+    assert (actual.index == expected.index).all()
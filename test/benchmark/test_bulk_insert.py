@@ -0,0 +1,75 @@
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app.models.stock import StockLhb
+from app.stock.datastore import StockDatastore
+from app.stock.service import LHB_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+ROWS = 50_000
+
+
+def _lhb_frame(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "代码": [f"{i % 5000:06d}" for i in range(rows)],
+            "名称": "测试股票",
+            "上榜日": pd.date_range("2020-01-01", periods=rows, freq="h").strftime(
+                "%Y-%m-%d"
+            ),
+            "上榜原因": "日涨幅偏离值达到7%的前5只证券",
+            "龙虎榜净买额": rng.normal(0, 1e7, rows),
+            "龙虎榜买入额": rng.uniform(0, 1e8, rows),
+            "龙虎榜卖出额": rng.uniform(0, 1e8, rows),
+            "龙虎榜成交额": rng.uniform(0, 2e8, rows),
+        }
+    )
+
+
+def _orm_bulk_save(datastore: StockDatastore, df: pd.DataFrame):
+    """原有写库方式：逐行构造 ORM 对象后 bulk_save"""
+    stocks = []
+    for _, data in df.iterrows():
+        stocks.append(
+            StockLhb(
+                code=data["代码"],
+                name=data["名称"],
+                trade_date=pd.Timestamp(data["上榜日"]).date(),
+                reason=data["上榜原因"],
+                net_buy=data["龙虎榜净买额"],
+                buy_amount=data["龙虎榜买入额"],
+                sell_amount=data["龙虎榜卖出额"],
+                total_amount=data["龙虎榜成交额"],
+            )
+        )
+    datastore.bulk_save(stocks)
+
+
+def test_bulk_insert_frame_benchmark(memory_session: Session):
+    datastore = StockDatastore(memory_session)
+    df = _lhb_frame(ROWS)
+
+    started = time.perf_counter()
+    _orm_bulk_save(datastore, df)
+    orm_elapsed = time.perf_counter() - started
+    memory_session.execute(delete(StockLhb))
+    memory_session.commit()
+
+    started = time.perf_counter()
+    datastore.bulk_insert_frame(StockLhb, df, LHB_COLUMNS, batch_size=5000)
+    frame_elapsed = time.perf_counter() - started
+
+    count = memory_session.scalar(select(func.count()).select_from(StockLhb))
+    assert count == ROWS
+    logger.info(
+        f"bulk_save: {ROWS / orm_elapsed:,.0f} rows/s, "
+        f"bulk_insert_frame: {ROWS / frame_elapsed:,.0f} rows/s, "
+        f"speedup: {orm_elapsed / frame_elapsed:.1f}x"
+    )
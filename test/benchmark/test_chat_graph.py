@@ -0,0 +1,51 @@
+import asyncio
+import logging
+import time
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from app.chat.schemas import ChatCompletionRequest, Message
+from app.config.chat import settings
+
+logger = logging.getLogger(__name__)
+
+REQUESTS = 50
+
+
+async def _per_request(manager, rebuild: bool) -> float:
+    request = ChatCompletionRequest(
+        model="qwen", messages=[Message(role="user", content="你好")]
+    )
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        if rebuild:
+            # 原有实现：每个请求重新构建并编译两层工作流
+            manager.graphs.clear()
+            manager.stock_workflow.graphs.clear()
+        await manager.handle_completion(request)
+    return (time.perf_counter() - started) / REQUESTS
+
+
+def test_chat_graph_overhead_benchmark(make_chat_manager, monkeypatch, capsys):
+    manager = make_chat_manager(FakeListChatModel(responses=["General", "你好"]))
+
+    monkeypatch.setattr(settings, "graph_debug", True)
+    before = asyncio.run(_per_request(manager, rebuild=True))
+    monkeypatch.setattr(settings, "graph_debug", False)
+    manager.graphs.clear()
+    manager.stock_workflow.graphs.clear()
+    rebuilt = asyncio.run(_per_request(manager, rebuild=True))
+    workflow = manager.get_work_flow()
+    builds = []
+    build = manager._build_work_flow
+    manager._build_work_flow = lambda: builds.append(1) or build()
+    after = asyncio.run(_per_request(manager, rebuild=False))
+    capsys.readouterr()
+
+    logger.info(
+        f"每个请求: 重新编译且 debug {before * 1e3:.2f}ms, "
+        f"重新编译 {rebuilt * 1e3:.2f}ms, 复用编译结果 {after * 1e3:.2f}ms"
+    )
+    # 复用时所有请求共用同一个编译结果，不再编译
+    assert not builds
+    assert manager.get_work_flow() is workflow
@@ -0,0 +1,46 @@
+import asyncio
+import logging
+import time
+
+from app.chat.schemas import ChatCompletionRequest, Message
+from app.llm.model_pool import ChatModelPool, Provider
+
+logger = logging.getLogger(__name__)
+
+REQUESTS = 16
+# 模型服务每次响应的延迟(秒)
+LATENCY = 0.1
+
+
+async def _throughput(manager, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def chat(i: int):
+        async with semaphore:
+            await manager.handle_completion(
+                ChatCompletionRequest(
+                    model="qwen", messages=[Message(role="user", content=f"问题{i}")]
+                )
+            )
+
+    started = time.perf_counter()
+    await asyncio.gather(*(chat(i) for i in range(REQUESTS)))
+    return REQUESTS / (time.perf_counter() - started)
+
+
+def test_chat_throughput_scales_with_concurrency(make_chat_manager, mock_openai_server):
+    mock_openai_server.latency = LATENCY
+    pool = ChatModelPool({"mock": Provider(mock_openai_server.base_url, "sk-test")})
+    manager = make_chat_manager(pool.get("mock", "qwen", temperature=0))
+
+    async def run() -> dict[int, float]:
+        return {c: await _throughput(manager, c) for c in (1, 4, 16)}
+
+    results = asyncio.run(run())
+    pool.close()
+
+    logger.info(
+        f"{REQUESTS}个对话(每个2次模型调用, 延迟{LATENCY}s): "
+        + ", ".join(f"并发{c} {rate:.1f}次/s" for c, rate in results.items())
+    )
+    assert mock_openai_server.requests == REQUESTS * 2 * 3
@@ -0,0 +1,144 @@
+import logging
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.models.stock import StockDaily, StockIndicator
+from app.stock.datastore import StockDatastore
+
+logger = logging.getLogger(__name__)
+
+# 5 年日线
+PERIODS = 5 * 250
+ROUNDS = 20
+INDICATORS = ["ma5", "ma10", "ma20", "ma30", "ma60", "diff", "dea", "macd", "k", "d"]
+
+
+def _orm_history(datastore: StockDatastore, code: str) -> pd.DataFrame:
+    """原有读取方式：ORM 对象逐行转成 dict 后构造 DataFrame"""
+    stocks = datastore.get_stock_history(code)
+    data = []
+    for stock in stocks:
+        data.append(
+            {
+                "code": stock.code,
+                "open": float(stock.open),
+                "high": float(stock.high),
+                "low": float(stock.low),
+                "close": float(stock.close),
+                "volume": stock.volume,
+                "amount": stock.amount,
+            }
+        )
+    df = pd.DataFrame(data)
+    df.index = pd.to_datetime([stock.trade_date for stock in stocks])
+    return df.sort_index()
+
+
+def _orm_history_with_indicators(datastore: StockDatastore, code: str) -> pd.DataFrame:
+    """原有读取方式：分别查询行情和指标，逐行转成 dict 后按日期合并"""
+    stocks = datastore.get_stock_history(code)
+    indicators = datastore.get_indicator_history(code)
+    stock_data = [
+        {
+            "code": stock.code,
+            "trade_date": stock.trade_date,
+            "open": float(stock.open),
+            "high": float(stock.high),
+            "low": float(stock.low),
+            "close": float(stock.close),
+            "volume": stock.volume,
+            "amount": stock.amount,
+        }
+        for stock in stocks
+    ]
+    indicator_data = [
+        {
+            "trade_date": indicator.trade_date,
+            **{name: float(getattr(indicator, name)) for name in INDICATORS},
+        }
+        for indicator in indicators
+    ]
+    df = pd.merge(
+        pd.DataFrame(stock_data), pd.DataFrame(indicator_data), on="trade_date"
+    )
+    return df.sort_values("trade_date")
+
+
+def _measure(load) -> tuple[float, int]:
+    load()
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        load()
+    elapsed = (time.perf_counter() - started) / ROUNDS
+    tracemalloc.start()
+    load()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def test_history_loader_benchmark(memory_session: Session, make_bars):
+    datastore = StockDatastore(memory_session)
+    bars = make_bars(PERIODS)
+    datastore.bulk_insert_frame(
+        StockDaily, bars.assign(name="平安银行", trade_date=bars.index.date)
+    )
+
+    def orm_load():
+        # 每轮清空会话，避免复用 identity map 中的对象
+        memory_session.expunge_all()
+        return _orm_history(datastore, "000001")
+
+    orm_elapsed, orm_peak = _measure(orm_load)
+    frame_elapsed, frame_peak = _measure(
+        lambda: datastore.get_stock_history_frame("000001")
+    )
+    logger.info(
+        f"{PERIODS}根K线: ORM {orm_elapsed * 1000:.1f}ms / {orm_peak / 1024:.0f}KiB, "
+        f"按列读取 {frame_elapsed * 1000:.1f}ms / {frame_peak / 1024:.0f}KiB, "
+        f"加速 {orm_elapsed / frame_elapsed:.1f}x"
+    )
+
+    expected = orm_load()
+    actual = datastore.get_stock_history_frame("000001")
+    np.testing.assert_allclose(actual["close"], expected["close"])
+    assert frame_peak < orm_peak
+
+
+def test_history_with_indicators_benchmark(memory_session: Session, make_bars):
+    datastore = StockDatastore(memory_session)
+    for seed, code in enumerate(["000001", "000002"]):
+        bars = make_bars(PERIODS, seed=seed, code=code)
+        datastore.bulk_insert_frame(
+            StockDaily, bars.assign(name=code, trade_date=bars.index.date)
+        )
+        indicators = pd.DataFrame(
+            {name: bars["close"].rolling(5).mean().fillna(0) for name in INDICATORS}
+        )
+        datastore.bulk_insert_frame(
+            StockIndicator, indicators.assign(code=code, trade_date=bars.index.date)
+        )
+
+    def orm_load():
+        memory_session.expunge_all()
+        return _orm_history_with_indicators(datastore, "000001")
+
+    orm_elapsed, orm_peak = _measure(orm_load)
+    joined_elapsed, joined_peak = _measure(
+        lambda: datastore.get_history_with_indicators("000001")
+    )
+    logger.info(
+        f"{PERIODS}根K线+指标: 两次查询合并 {orm_elapsed * 1000:.1f}ms / "
+        f"{orm_peak / 1024:.0f}KiB, 联表读取 {joined_elapsed * 1000:.1f}ms / "
+        f"{joined_peak / 1024:.0f}KiB, 加速 {orm_elapsed / joined_elapsed:.1f}x"
+    )
+
+    expected = orm_load()
+    actual = datastore.get_history_with_indicators("000001")
+    assert len(actual) == len(expected) == PERIODS
+    # SQLite 不按 Numeric 精度存储，ORM 读取时才按两位小数取整
+    np.testing.assert_allclose(actual["ma5"], expected["ma5"], atol=0.005)
@@ -0,0 +1,39 @@
+import logging
+import time
+
+import pandas as pd
+
+from app.stock.indicator_service import StockIndicatorService
+from app.utils.indicator_matrix import calculate_indicator_matrix
+
+logger = logging.getLogger(__name__)
+
+CODES = 5000
+# 120 个自然日约 80 根K线
+BARS = 80
+
+
+def test_indicator_matrix_benchmark(make_bars):
+    universe = [make_bars(BARS, seed=i, code=f"{i:06d}") for i in range(CODES)]
+    df = pd.concat(universe).rename_axis("trade_date").reset_index()
+
+    started = time.perf_counter()
+    for bars in universe:
+        StockIndicatorService._compute_indicators(bars).iloc[-1]
+    per_code = time.perf_counter() - started
+
+    started = time.perf_counter()
+    matrix, codes = StockIndicatorService._to_bar_matrix(
+        df, ["high", "low", "close", "volume"]
+    )
+    result = calculate_indicator_matrix(
+        matrix["high"], matrix["low"], matrix["close"], matrix["volume"]
+    )
+    last = pd.DataFrame({name: values[-1] for name, values in result.items()})
+    kernel = time.perf_counter() - started
+
+    assert len(last) == len(codes) == CODES
+    logger.info(
+        f"{CODES} codes x {BARS} bars: per-code {per_code:.2f}s, "
+        f"matrix {kernel:.2f}s, speedup {per_code / kernel:.1f}x"
+    )
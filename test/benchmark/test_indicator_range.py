@@ -0,0 +1,40 @@
+import logging
+import time
+
+import pandas as pd
+
+from app.stock.indicator_service import INDICATOR_HISTORY_DAYS, StockIndicatorService
+
+logger = logging.getLogger(__name__)
+
+CODES = 5000
+TRADE_DAYS = 250
+# 逐日计算太慢，抽样后按股票数线性外推
+PER_DAY_SAMPLE_CODES = 10
+
+
+def test_indicator_range_benchmark(make_bars):
+    # 一年交易日 + 指标预热所需的历史
+    periods = TRADE_DAYS + INDICATOR_HISTORY_DAYS
+    universe = [make_bars(periods, seed=i) for i in range(CODES)]
+    start = universe[0].index[-TRADE_DAYS]
+
+    started = time.perf_counter()
+    for bars in universe[:PER_DAY_SAMPLE_CODES]:
+        for current in bars.index[-TRADE_DAYS:]:
+            window_start = current - pd.Timedelta(days=INDICATOR_HISTORY_DAYS)
+            window = bars.loc[window_start:current]
+            StockIndicatorService._compute_indicators(window).loc[current]
+    per_day = (time.perf_counter() - started) / PER_DAY_SAMPLE_CODES * CODES
+
+    started = time.perf_counter()
+    rows = 0
+    for bars in universe:
+        rows += len(StockIndicatorService._compute_indicators(bars).loc[start:])
+    ranged = time.perf_counter() - started
+
+    assert rows == CODES * TRADE_DAYS
+    logger.info(
+        f"{CODES} codes x {TRADE_DAYS} days: per-day {per_day:.1f}s (extrapolated), "
+        f"range {ranged:.1f}s, speedup {per_day / ranged:.0f}x"
+    )
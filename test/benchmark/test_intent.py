@@ -0,0 +1,136 @@
+import logging
+import os
+import time
+from test.conftest import NgramEmbeddings
+
+import numpy as np
+import pytest
+
+from app.chat.intent import GENERAL, STOCK, IntentClassifier, match_rule
+from app.config.setting import settings
+
+logger = logging.getLogger(__name__)
+
+# 测试用的已知股票代码，线上从 akshare 股票列表加载
+KNOWN_CODES = {"600519", "300750", "000858", "601318", "002594"}
+# 标注的路由测试集，与分类器的示例问题不重复
+LABELED_QUESTIONS = [
+    ("600519 今天涨了多少", STOCK),
+    ("帮我查一下sz000858的行情", STOCK),
+    ("300750 最近的成交量", STOCK),
+    ("今天A股大盘表现如何", STOCK),
+    ("创业板今天涨停的有哪些", STOCK),
+    ("半导体板块这周的涨幅", STOCK),
+    ("最近主力资金流入最多的股票", STOCK),
+    ("中国平安的市盈率现在多少", STOCK),
+    ("今天的龙虎榜", STOCK),
+    ("有哪些大宗交易折价很多", STOCK),
+    ("贵州茅台最近走势怎么样", STOCK),
+    ("宁德时代今天收盘价多少", STOCK),
+    ("比亚迪去年的业绩怎么样", STOCK),
+    ("招商银行的估值高吗", STOCK),
+    ("最近哪些公司发布了业绩预告", STOCK),
+    ("光伏行业的龙头公司有哪些", STOCK),
+    ("最近有哪些新股上市", STOCK),
+    ("帮我看看中芯国际的资金流向", STOCK),
+    ("茅台和五粮液哪个估值更低", STOCK),
+    ("你好，请介绍一下你自己", GENERAL),
+    ("帮我写一首关于秋天的诗", GENERAL),
+    ("上海明天会下雨吗", GENERAL),
+    ("把这句话翻译成日语", GENERAL),
+    ("用 Java 写一个冒泡排序", GENERAL),
+    ("推荐几部好看的电影", GENERAL),
+    ("番茄炒蛋怎么做", GENERAL),
+    ("解释一下什么是机器学习", GENERAL),
+    ("帮我写一封感谢信", GENERAL),
+    ("国庆去哪里旅游比较好", GENERAL),
+    ("今天星期几", GENERAL),
+    ("你是谁开发的", GENERAL),
+    ("怎么提高睡眠质量", GENERAL),
+    ("帮我总结一下这篇文章", GENERAL),
+    ("如何学习英语口语", GENERAL),
+    ("给我讲个笑话", GENERAL),
+    ("我的验证码是 600321", GENERAL),
+    ("帮我转账300000元给他", GENERAL),
+    ("邮编 310000 是哪里", GENERAL),
+    ("把这份持仓清单翻译成英文", GENERAL),
+    ("北京房价行情怎么样", GENERAL),
+]
+# 原有路由每轮对话一次 Qwen2.5-32B 调用的典型耗时
+LLM_ROUTER_LATENCY = 0.8
+
+
+def _evaluate(classifier: IntentClassifier) -> tuple[float, float, float, float]:
+    correct = local = 0
+    latencies = []
+    for question, label in LABELED_QUESTIONS:
+        started = time.perf_counter()
+        intent = classifier.classify(question)
+        latencies.append(time.perf_counter() - started)
+        if intent is not None:
+            local += 1
+            correct += intent.category == label
+    total = len(LABELED_QUESTIONS)
+    # 低置信度的问题交给大模型，准确率只统计本地判定的问题
+    expected = (total - local) / total * LLM_ROUTER_LATENCY
+    return correct / local, local / total, float(np.median(latencies)), expected
+
+
+def _calibrate(classifier: IntentClassifier) -> float:
+    """规则未命中的问题中向量分类错误的最大置信度，min_margin 应高于该值"""
+    classifier.min_margin = 0
+    wrong = [
+        intent.confidence
+        for question, label in LABELED_QUESTIONS
+        if match_rule(question, KNOWN_CODES) is None
+        and (intent := classifier.classify(question)) is not None
+        and intent.category != label
+    ]
+    return max(wrong, default=0.0)
+
+
+def test_intent_routing_benchmark():
+    rules = IntentClassifier(known_codes=KNOWN_CODES)
+    # NgramEmbeddings 是本地计算的替身，置信度刻度与耗时都不代表线上的 DashScope
+    embedding = IntentClassifier(NgramEmbeddings(), KNOWN_CODES)
+    embedding.classify("预热示例向量")
+
+    for name, classifier in [
+        ("规则", rules),
+        ("规则+n-gram 向量(未缓存)", embedding),
+        ("规则+n-gram 向量(已缓存)", embedding),
+    ]:
+        accuracy, coverage, median, expected = _evaluate(classifier)
+        logger.info(
+            f"{name}: 本地判定 {coverage:.1%}, 其中准确率 {accuracy:.1%}, "
+            f"本地分类中位耗时 {median * 1e6:.1f}us, "
+            f"平均路由耗时 {expected * 1e3:.0f}ms(原有 {LLM_ROUTER_LATENCY * 1e3:.0f}ms)"
+        )
+        assert accuracy >= 0.95
+    # 规则阶段只判定明确的股票问题
+    assert rules.classify("北京房价行情怎么样") is None
+
+
+@pytest.mark.skipif(
+    not os.getenv("INTENT_CALIBRATION"), reason="设置 INTENT_CALIBRATION=1 时运行"
+)
+def test_intent_margin_calibration():
+    """按线上向量模型校准 chat_intent_min_margin，需要 dashscope 和有效的 API Key"""
+    pytest.importorskip("dashscope")
+    from langchain_community.embeddings import DashScopeEmbeddings
+
+    embeddings = DashScopeEmbeddings(
+        model=settings.embeddings_model_name,
+        dashscope_api_key=settings.dash_scope_api_key,
+    )
+    classifier = IntentClassifier(embeddings, KNOWN_CODES)
+    started = time.perf_counter()
+    margin = _calibrate(classifier)
+    logger.info(
+        f"{settings.embeddings_model_name}: 错误分类的最大置信度 {margin:.4f}, "
+        f"未缓存问题平均耗时 {(time.perf_counter() - started) / len(LABELED_QUESTIONS) * 1e3:.0f}ms"
+    )
+    classifier.min_margin = margin + 1e-6
+    accuracy, coverage, _, _ = _evaluate(classifier)
+    logger.info(f"min_margin={classifier.min_margin:.4f}: 本地判定 {coverage:.1%}")
+    assert accuracy == 1.0
@@ -0,0 +1,62 @@
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.models.stock import StockDaily, StockIndicator
+from app.stock.datastore import StockDatastore
+from app.stock.parquet_store import StockParquetStore
+
+logger = logging.getLogger(__name__)
+
+CODES = 1000
+# 1 年日线
+PERIODS = 250
+ROUNDS = 5
+FIELDS = ["open", "close", "volume", "ma5", "ma20", "diff", "dea"]
+
+
+def _measure(load) -> float:
+    load()
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        load()
+    return (time.perf_counter() - started) / ROUNDS
+
+
+def test_parquet_mirror_benchmark(memory_session: Session, make_bars, tmp_path):
+    mirror = StockParquetStore(str(tmp_path / "parquet"))
+    datastore = StockDatastore(memory_session, mirror=mirror)
+    frames = [make_bars(PERIODS, seed=i, code=f"{i:06d}") for i in range(CODES)]
+    daily = pd.concat(frames).rename_axis("trade_date").reset_index()
+    daily["name"] = daily["code"]
+    datastore.bulk_insert_frame(StockDaily, daily, batch_size=10000)
+    indicators = daily[["code", "trade_date"]].assign(
+        **{name: daily["close"].round(2) for name in FIELDS[3:]}
+    )
+    datastore.bulk_insert_frame(StockIndicator, indicators, batch_size=10000)
+    mirrored = StockDatastore(memory_session, mirror=mirror, read_mirror=True)
+
+    start, end = daily["trade_date"].iloc[[-60, -1]].dt.date
+    database = _measure(
+        lambda: datastore.get_history_with_indicators(None, start, end, FIELDS)
+    )
+    parquet = _measure(
+        lambda: mirrored.get_history_with_indicators(None, start, end, FIELDS)
+    )
+    mapped = _measure(
+        lambda: mirrored.get_history_with_indicators(
+            None, start, end, FIELDS, memory_map=True
+        )
+    )
+    logger.info(
+        f"{CODES}只股票近60个交易日联表读取: 数据库 {database * 1000:.0f}ms, "
+        f"Parquet {parquet * 1000:.0f}ms, 内存映射 {mapped * 1000:.0f}ms"
+    )
+
+    expected = datastore.get_history_with_indicators(None, start, end, FIELDS)
+    actual = mirrored.get_history_with_indicators(None, start, end, FIELDS)
+    assert len(actual) == CODES * 60
+    np.testing.assert_allclose(actual["ma5"], expected["ma5"], atol=0.005)
@@ -0,0 +1,70 @@
+import logging
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.stock import StockDaily, StockIndicator
+from app.stock.datastore import AsyncStockDatastore
+from app.stock.signal_service import SignalService
+from app.strategy._strategy import BaseStrategy
+
+logger = logging.getLogger(__name__)
+
+CODES = 5000
+STRATEGIES = 10
+
+
+class ThresholdStrategy(BaseStrategy):
+    """按收盘价与均线的偏离阈值产生信号"""
+
+    def __init__(self, threshold: float):
+        self.name = f"偏离{threshold:.2f}"
+        self.threshold = threshold
+
+    def buy_signals(self, df: pd.DataFrame) -> np.ndarray:
+        return (df["close"] > df["ma5"] * (1 + self.threshold)).to_numpy()
+
+    def sell_signals(self, df: pd.DataFrame) -> np.ndarray:
+        return (df["close"] < df["ma5"] * (1 - self.threshold)).to_numpy()
+
+
+class FakeTelegram:
+    async def send_signals(self, signals: list, date: str) -> bool:
+        return True
+
+
+async def test_generate_signals_benchmark(async_memory_session: AsyncSession):
+    datastore = AsyncStockDatastore(async_memory_session)
+    rng = np.random.default_rng(0)
+    trade_date = date(2024, 12, 31)
+    codes = [f"{i:06d}" for i in range(CODES)]
+    close = rng.uniform(5, 50, CODES).round(2)
+    ma5 = (close * rng.normal(1, 0.05, CODES)).round(2)
+    await datastore.bulk_insert(
+        StockDaily,
+        [
+            {"code": c, "name": c, "trade_date": trade_date, "close": v}
+            for c, v in zip(codes, close.tolist())
+        ],
+    )
+    await datastore.bulk_insert(
+        StockIndicator,
+        [
+            {"code": c, "trade_date": trade_date, "ma5": v}
+            for c, v in zip(codes, ma5.tolist())
+        ],
+    )
+    strategies = [ThresholdStrategy(0.01 * (i + 1)) for i in range(STRATEGIES)]
+    service = SignalService(datastore, strategies=strategies, telegram=FakeTelegram())
+
+    started = time.perf_counter()
+    signals = await service.generate_signals("20241231")
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"{CODES}只股票 x {STRATEGIES}个策略: 生成{len(signals)}个信号 {elapsed:.2f}s"
+    )
+
+    assert signals
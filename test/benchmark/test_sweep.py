@@ -0,0 +1,56 @@
+import logging
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.backtest.panel import MarketPanel
+from app.backtest.sweep import ParameterSweep, SharedPanel
+from app.strategy.ma_strategy import MaCrossStrategy
+
+logger = logging.getLogger(__name__)
+
+CODES = 5000
+# 5 年约 1250 个交易日
+DAYS = 1250
+GRID = {"fast": [5, 10], "slow": [20, 30, 60]}
+
+
+def _market_panel() -> MarketPanel:
+    rng = np.random.default_rng(0)
+    change = np.clip(rng.normal(0, 0.02, (DAYS, CODES)), -0.1, 0.1)
+    close = np.round(10 * np.exp(np.cumsum(change, axis=0)), 2)
+    open_ = np.round(close * (1 + rng.normal(0, 0.005, (DAYS, CODES))), 2)
+    dates = pd.bdate_range(end="2024-12-31", periods=DAYS).to_numpy()
+    codes = np.array([f"{i:06d}" for i in range(CODES)])
+    return MarketPanel(dates, codes, {"open": open_, "close": close})
+
+
+def test_parameter_sweep_scaling():
+    panel = _market_panel()
+    with SharedPanel(panel) as shared:
+        handle_size = len(pickle.dumps(shared.handle))
+    panel_size = len(pickle.dumps(panel))
+
+    cores = os.cpu_count()
+    elapsed = {}
+    tables = {}
+    for workers in (1, 2, 4):
+        started = time.perf_counter()
+        sweep = ParameterSweep(panel, MaCrossStrategy, GRID, max_workers=workers)
+        tables[workers] = sweep.run()
+        elapsed[workers] = time.perf_counter() - started
+
+    scaling = ", ".join(
+        f"{workers}个进程 {seconds:.2f}s" for workers, seconds in elapsed.items()
+    )
+    logger.info(
+        f"{CODES} codes x {DAYS} days, {len(tables[1])}组参数, {cores}核: {scaling}; "
+        f"传给工作进程 {handle_size / 1024:.0f}KiB, 序列化面板 {panel_size >> 20}MiB"
+    )
+    assert len(tables[1]) == 6
+    assert handle_size * 100 < panel_size
+    for table in tables.values():
+        assert list(table["trades"]) == list(tables[1]["trades"])
@@ -0,0 +1,75 @@
+import logging
+import time
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+KEYWORDS = ["zh hist", "zh spot", "lhb", "dzjy", "board"]
+# 模拟 Qdrant 和数据库每次请求的网络往返(秒)
+QDRANT_LATENCY = 0.005
+DB_LATENCY = 0.002
+ROUNDS = 10
+
+
+def _search_one_by_one(tool_manager) -> list[str]:
+    """原有实现：逐个关键词检索，逐个命中查询工具配置"""
+    results, ids = [], []
+    for keyword in KEYWORDS:
+        for doc in tool_manager._vector_store.search(keyword, 5):
+            if doc.metadata["_id"] not in ids:
+                results.append(doc)
+                ids.append(doc.metadata["_id"])
+    tools = []
+    for doc in results:
+        tool_config = tool_manager.datastore.get_tool(doc.metadata["_id"])
+        tools.append(tool_manager._create_tool(tool_config))
+    return [tool.name for tool in tools]
+
+
+def _with_latency(func, latency: float, calls: list):
+    def wrapper(*args, **kwargs):
+        calls.append(func.__name__)
+        time.sleep(latency)
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def test_tool_retrieval_benchmark(tool_manager, memory_session, monkeypatch):
+    client = tool_manager._vector_store._store.client
+    calls = []
+    for name in ("query_points", "query_batch_points"):
+        monkeypatch.setattr(
+            client, name, _with_latency(getattr(client, name), QDRANT_LATENCY, calls)
+        )
+    event.listen(
+        memory_session.get_bind(),
+        "before_cursor_execute",
+        lambda *args: calls.append("sql") or time.sleep(DB_LATENCY),
+    )
+
+    timings, results = {}, {}
+    for name, search in [
+        ("逐个检索", _search_one_by_one),
+        (
+            "批量检索",
+            lambda manager: [
+                tool.name for tool in manager.search_and_create_tools(KEYWORDS)
+            ],
+        ),
+    ]:
+        calls.clear()
+        started = time.perf_counter()
+        for _ in range(ROUNDS):
+            results[name] = search(tool_manager)
+        timings[name] = (time.perf_counter() - started) / ROUNDS
+        logger.info(
+            f"{name}: {len(results[name])}个工具, 每轮 Qdrant 请求"
+            f"{(len(calls) - calls.count('sql')) // ROUNDS}次, "
+            f"SQL {calls.count('sql') // ROUNDS}次, 耗时{timings[name] * 1e3:.1f}ms"
+        )
+
+    assert results["批量检索"] == results["逐个检索"]
+    # 批量检索每轮一次 Qdrant 请求、一次 SQL
+    assert calls.count("sql") == len(calls) - calls.count("sql") == ROUNDS
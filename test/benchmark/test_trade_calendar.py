@@ -0,0 +1,43 @@
+import logging
+import timeit
+from datetime import date
+
+import arrow
+import pandas as pd
+
+from app.stock.trade_calendar import TradeCalendar
+
+logger = logging.getLogger(__name__)
+
+
+def test_trade_calendar_lookup_benchmark():
+    days = pd.bdate_range("1990-12-19", "2025-12-31").date
+    calendar = TradeCalendar.from_days(days)
+    # 原有实现：Arrow 列表，每次调用重新构造 date 列表并线性查找
+    arrow_days = [arrow.get(str(day)) for day in days]
+    target = date(2024, 6, 14)
+
+    def linear_is_trade_day():
+        return target in [d.date() for d in arrow_days]
+
+    def linear_next_trade_day():
+        value = arrow.get(target)
+        return [d for d in arrow_days if d > value][0]
+
+    number = 200
+    linear = timeit.timeit(linear_is_trade_day, number=number) / number
+    linear_next = timeit.timeit(linear_next_trade_day, number=number) / number
+    number = 100_000
+    indexed = timeit.timeit(lambda: calendar.is_trade_day(target), number=number)
+    indexed_next = timeit.timeit(
+        lambda: calendar.get_next_trade_day(target), number=number
+    )
+    indexed, indexed_next = indexed / number, indexed_next / number
+    logger.info(
+        f"{len(days)}个交易日, is_trade_day: 线性 {linear * 1e6:.1f}us, "
+        f"二分 {indexed * 1e6:.2f}us; get_next_trade_day: 线性 "
+        f"{linear_next * 1e6:.1f}us, 二分 {indexed_next * 1e6:.2f}us"
+    )
+
+    assert calendar.is_trade_day(target) == linear_is_trade_day()
+    assert calendar.get_next_trade_day(target) == linear_next_trade_day().date()
@@ -0,0 +1,155 @@
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from app.chat import chat_manager, intent
+from app.chat.intent import GENERAL, STOCK, IntentClassifier, match_rule, parse_category
+from app.chat.schemas import ChatCompletionRequest, Message
+from app.models.stock import StockDaily
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "600519 最近怎么样",
+        "看看sh600000",
+        "000001.SZ 的走势",
+        "今天A股表现如何",
+        "MACD 金叉",
+    ],
+)
+def test_match_rule_recognizes_stock_questions(text):
+    intent = match_rule(text, known_codes={"600519"})
+
+    assert intent is not None
+    assert (intent.category, intent.source) == (STOCK, "rule")
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "你好",
+        "订单号 1234567 到哪了",
+        "帮我写一首诗",
+        "电话 13800138000",
+        "我的验证码是 600321",
+        "帮我转账300000元给他",
+        "邮编 310000 是哪里",
+        "把这份持仓清单翻译成英文",
+        "北京房价行情怎么样",
+        "大盘鸡怎么做",
+    ],
+)
+def test_match_rule_leaves_other_questions_undecided(text):
+    assert match_rule(text, known_codes={"600519"}) is None
+
+
+@pytest.mark.parametrize(
+    "reply, category",
+    [
+        ("Stock", STOCK),
+        (" stock\n", STOCK),
+        ("分类：Stock。", STOCK),
+        ("这是一个股票问题", STOCK),
+        ("General", GENERAL),
+        ("general.", GENERAL),
+        ("无法判断", GENERAL),
+    ],
+)
+def test_parse_category_tolerates_free_form_replies(reply, category):
+    assert parse_category(reply) == category
+
+
+def test_classifier_uses_nearest_examples_and_caches_vectors(ngram_embeddings):
+    embeddings = ngram_embeddings
+    classifier = IntentClassifier(embeddings, min_margin=0.05)
+
+    intent = classifier.classify("贵州茅台今天的收盘价")
+
+    assert (intent.category, intent.source) == (STOCK, "embedding")
+    assert classifier.classify("帮我写一首关于秋天的诗").category == GENERAL
+    calls = embeddings.calls
+    classifier.classify("贵州茅台今天的收盘价")
+    assert embeddings.calls == calls
+
+
+def test_classifier_defers_to_llm_when_margin_is_low(ngram_embeddings):
+    classifier = IntentClassifier(ngram_embeddings, min_margin=1.0)
+
+    assert classifier.classify("贵州茅台今天的收盘价") is None
+    assert classifier.classify("贵州茅台今天股价").source == "rule"
+
+
+def test_classifier_survives_embedding_errors(ngram_embeddings, monkeypatch):
+    def embed_query(text: str) -> list[float]:
+        raise ConnectionError("timeout")
+
+    monkeypatch.setattr(ngram_embeddings, "embed_query", embed_query)
+
+    assert IntentClassifier(ngram_embeddings).classify("你好") is None
+
+
+async def test_categorize_skips_llm_for_confident_intents(
+    make_chat_manager, ngram_embeddings
+):
+    model = FakeListChatModel(responses=["股票相关：Stock", "回答"])
+    manager = make_chat_manager(
+        model, intent_classifier=IntentClassifier(ngram_embeddings)
+    )
+
+    await manager.handle_completion(
+        ChatCompletionRequest(
+            model="qwen", messages=[Message(role="user", content="你好呀")]
+        )
+    )
+
+    # 本地分类为通用问题，大模型只用于回答
+    assert model.i == 1
+
+
+def test_load_stock_codes_from_database(memory_session, monkeypatch):
+    memory_session.add_all(
+        [
+            StockDaily(code=code, name=code, trade_date=trade_date)
+            for code in ("600519", "000001")
+            for trade_date in (date(2024, 12, 30), date(2024, 12, 31))
+        ]
+    )
+    memory_session.commit()
+    monkeypatch.setattr(
+        intent, "get_db", contextmanager(lambda: iter([memory_session]))
+    )
+
+    assert intent.load_stock_codes() == {"600519", "000001"}
+
+    def broken_db():
+        raise ConnectionError("db down")
+
+    monkeypatch.setattr(intent, "get_db", broken_db)
+    assert intent.load_stock_codes() == frozenset()
+
+
+async def test_classifier_is_built_on_first_request(make_chat_manager, monkeypatch):
+    built = []
+    classifier = IntentClassifier()
+    monkeypatch.setattr(
+        chat_manager,
+        "get_intent_classifier",
+        lambda: built.append(1) or classifier,
+    )
+    model = FakeListChatModel(responses=["General", "回答"] * 2)
+    manager = make_chat_manager(model)
+    manager.intent_classifier = None
+
+    for content in ("你好", "讲个笑话"):
+        await manager.handle_completion(
+            ChatCompletionRequest(
+                model="qwen", messages=[Message(role="user", content=content)]
+            )
+        )
+
+    # 构建 ChatManager 时不加载，第一次分类时构建一次
+    assert built == [1]
+    assert manager.intent_classifier is classifier
@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.chat.schemas import ChatCompletionRequest, Message
+from app.llm.model_pool import ChatModelPool, Provider
+from app.models.tool import Tool as ToolModel
+from app.tools.tool_manager import ToolManager
+
+
+def test_work_flow_is_compiled_once(make_chat_manager):
+    manager = make_chat_manager(FakeListChatModel(responses=["General"]))
+
+    workflow = manager.get_work_flow()
+
+    assert manager.get_work_flow() is workflow
+    assert manager.stock_workflow.get_stock_graph() is (
+        manager.stock_workflow.get_stock_graph()
+    )
+    assert not workflow.debug
+
+
+async def test_compiled_work_flow_serves_concurrent_requests(make_chat_manager):
+    manager = make_chat_manager(FakeListChatModel(responses=["General", "回答"]))
+    calls = []
+    build = manager._build_work_flow
+    manager._build_work_flow = lambda: calls.append(1) or build()
+
+    responses = await asyncio.gather(
+        *(
+            manager.handle_completion(
+                ChatCompletionRequest(
+                    model="qwen",
+                    messages=[Message(role="user", content=f"问题{i}")],
+                )
+            )
+            for i in range(8)
+        )
+    )
+
+    assert len(calls) == 1
+    assert all(len(response.choices) == 1 for response in responses)
+
+
+async def test_concurrent_requests_overlap_model_calls(
+    make_chat_manager, mock_openai_server
+):
+    mock_openai_server.latency = 0.2
+    pool = ChatModelPool({"mock": Provider(mock_openai_server.base_url, "sk-test")})
+    manager = make_chat_manager(pool.get("mock", "qwen", temperature=0))
+
+    await asyncio.gather(
+        *(
+            manager.handle_completion(
+                ChatCompletionRequest(
+                    model="qwen", messages=[Message(role="user", content=f"问题{i}")]
+                )
+            )
+            for i in range(4)
+        )
+    )
+    pool.close()
+
+    # 每个请求两次模型调用，并发的请求同时等待模型服务
+    assert mock_openai_server.requests == 4 * 2
+    assert mock_openai_server.max_in_flight == 4
+
+
+def slow_quote(symbol: str) -> str:
+    """模拟阻塞的 akshare 接口"""
+    time.sleep(0.2)
+    return f"{symbol}: 10.00"
+
+
+class FakeToolManager:
+    def __init__(self, tools):
+        self.tools = {tool.name: tool for tool in tools}
+
+    async def aget_tool(self, tool_type: str, name: str):
+        return self.tools.get(name)
+
+
+async def test_call_tool_runs_blocking_tools_off_the_event_loop(make_chat_manager):
+    tool_manager = object.__new__(ToolManager)
+    tool = tool_manager._create_tool(
+        ToolModel(
+            name="slow_quote",
+            description="查询股价",
+            tool_type="akshare",
+            function_path=f"{__name__}.slow_quote",
+        )
+    )
+    manager = make_chat_manager(
+        FakeListChatModel(responses=["General"]), FakeToolManager([tool])
+    )
+    message = AIMessage(
+        content="",
+        tool_calls=[
+            {"name": "slow_quote", "args": {"symbol": f"60000{i}"}, "id": f"call{i}"}
+            for i in range(4)
+        ],
+    )
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticking = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    result = await manager.stock_workflow._call_tool(
+        {"messages": [HumanMessage(content="股价"), message]}, None
+    )
+    elapsed = time.perf_counter() - started
+    ticking.cancel()
+
+    assert [m.content for m in result["messages"]] == [
+        f"60000{i}: 10.00" for i in range(4)
+    ]
+    # 四个工具并发执行，期间事件循环没有被阻塞
+    assert elapsed < 0.6
+    assert ticks >= 10
@@ -1,7 +1,49 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
 import pytest
+from langchain_core.embeddings import Embeddings
+from sqlalchemy import BigInteger, StaticPool, create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import Session, sessionmaker
 
-from app.core.database import engine
+import app.models.stock  # noqa: F401
+import app.models.tool  # noqa: F401
+from app.core.database import Base, engine
+
+# aiosqlite 的 DEBUG 日志会逐条输出 SQL 参数
+logging.getLogger("aiosqlite").setLevel(logging.INFO)
+
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(__file__), "benchmark")
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_collection_modifyitems(config, items):
+    """test/benchmark 下的用例标记为 benchmark，未通过 -m benchmark 或 RUN_BENCHMARK 选择时跳过"""
+    selected = os.getenv("RUN_BENCHMARK") or "benchmark" in config.getoption("markexpr")
+    skip = pytest.mark.skip(
+        reason="性能基准测试，使用 -m benchmark 或 RUN_BENCHMARK=1 运行"
+    )
+    for item in items:
+        if str(item.path).startswith(BENCHMARK_DIR):
+            item.add_marker(pytest.mark.benchmark)
+            if not selected:
+                item.add_marker(skip)
+
+
+@compiles(BigInteger, "sqlite")
+def _compile_big_integer_sqlite(type_, compiler, **kw):
+    # SQLite 只有 INTEGER PRIMARY KEY 才会自增
+    return "INTEGER"
 
 
 @pytest.fixture(scope="function")
@@ -22,3 +64,269 @@ def db_session_fixture() -> Session:
     with session() as session:
         yield session
     engine.dispose()
+
+
+@pytest.fixture(name="memory_session")
+def memory_session_fixture() -> Session:
+    """内存 SQLite 会话，用于不依赖外部数据库的测试"""
+    memory_engine = create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(memory_engine)
+    session = sessionmaker(bind=memory_engine, expire_on_commit=False)
+    with session() as session:
+        yield session
+    memory_engine.dispose()
+
+
+@pytest.fixture(name="async_memory_session")
+async def async_memory_session_fixture() -> AsyncSession:
+    """异步内存 SQLite 会话"""
+    memory_engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with memory_engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    session = async_sessionmaker(bind=memory_engine, expire_on_commit=False)
+    async with session() as session:
+        yield session
+    await memory_engine.dispose()
+
+
+def generate_bars(
+    periods: int, end: str = "2024-12-31", seed: int = 0, code: str = "000001"
+) -> pd.DataFrame:
+    """生成随机游走的日线行情，索引为交易日(工作日)"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=end, periods=periods)
+    close = np.round(10 * np.exp(np.cumsum(rng.normal(0, 0.02, periods))), 2)
+    open_ = np.round(close * (1 + rng.normal(0, 0.005, periods)), 2)
+    high = np.round(np.maximum(open_, close) * (1 + rng.uniform(0, 0.02, periods)), 2)
+    low = np.round(np.minimum(open_, close) * (1 - rng.uniform(0, 0.02, periods)), 2)
+    volume = rng.integers(1_000, 1_000_000, periods)
+    return pd.DataFrame(
+        {
+            "code": code,
+            "open": open_,
+            "high": high,
+            "low": low,
+            "close": close,
+            "volume": volume,
+            "amount": (volume * close).astype(np.int64),
+        },
+        index=index,
+    )
+
+
+@pytest.fixture(name="make_bars")
+def make_bars_fixture():
+    """随机日线行情生成器"""
+    return generate_bars
+
+
+class NgramEmbeddings(Embeddings):
+    """字符一元、二元组的哈希词袋向量，本地计算，统计调用次数"""
+
+    def __init__(self, size: int = 512):
+        self.size = size
+        self.calls = 0
+
+    def _embed(self, text: str) -> list[float]:
+        vector = np.zeros(self.size)
+        grams = list(text) + [text[i : i + 2] for i in range(len(text) - 1)]
+        for gram in grams:
+            index = int(hashlib.md5(gram.encode()).hexdigest(), 16) % self.size
+            vector[index] += 1 if len(gram) == 1 else 2
+        return vector.tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        self.calls += 1
+        return self._embed(text)
+
+
+@pytest.fixture(name="ngram_embeddings")
+def ngram_embeddings_fixture():
+    """本地计算的向量模型，代替 DashScope"""
+    return NgramEmbeddings()
+
+
+TOOL_NAMES = [
+    "stock_zh_a_hist",
+    "stock_zh_a_spot_em",
+    "stock_lhb_detail_em",
+    "stock_dzjy_mrmx",
+    "stock_board_industry_name_em",
+    "fund_etf_spot_em",
+]
+
+
+class KeywordEmbeddings(Embeddings):
+    """按名称片段计数的向量"""
+
+    vocabulary = ["hist", "spot", "lhb", "dzjy", "board", "fund", "zh", "em"]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return [text.count(word) + 0.01 for word in self.vocabulary]
+
+
+@pytest.fixture(name="tool_manager")
+def tool_manager_fixture(memory_session):
+    """使用内存 Qdrant 和内存数据库的 ToolManager，预置 TOOL_NAMES 中的工具"""
+    from langchain_qdrant import QdrantVectorStore as Lc_QdrantVectorStore
+    from qdrant_client import QdrantClient
+    from qdrant_client.http.models import Distance, VectorParams
+
+    from app.models.tool import Tool as ToolModel
+    from app.tools.datastore import ToolDatastore
+    from app.tools.tool_manager import ToolManager
+    from app.vectorstore.qdrant import QdrantVectorStore
+
+    datastore = object.__new__(ToolDatastore)
+    datastore.db_session = memory_session
+    tools = [
+        ToolModel(
+            name=name,
+            description=name,
+            tool_type="akshare",
+            function_path=f"akshare.{name}",
+        )
+        for name in TOOL_NAMES
+    ]
+    memory_session.add_all(tools)
+    memory_session.commit()
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        collection_name="tools",
+        vectors_config=VectorParams(
+            size=len(KeywordEmbeddings.vocabulary), distance=Distance.COSINE
+        ),
+    )
+    vector_store = object.__new__(QdrantVectorStore)
+    vector_store._store = Lc_QdrantVectorStore(
+        client=client, collection_name="tools", embedding=KeywordEmbeddings()
+    )
+    vector_store._collection_name = "tools"
+    vector_store.add_texts(
+        TOOL_NAMES, [{"name": name} for name in TOOL_NAMES], [t.id for t in tools]
+    )
+    manager = object.__new__(ToolManager)
+    manager.datastore = datastore
+    manager._session_lock = threading.Lock()
+    manager._vector_store = vector_store
+    return manager
+
+
+def build_chat_manager(
+    model, tool_manager=None, trade_days=None, intent_classifier=None
+):
+    """用给定的对话模型构建 ChatManager，不经过单例，也不连接模型服务和数据库
+
+    默认的意图分类器只做规则匹配，未命中的问题由 model 分类。
+    """
+    from app.chat._workflow import GraphRegistry
+    from app.chat.chat_manager import ChatManager
+    from app.chat.intent import IntentClassifier
+    from app.chat.stock_workflow import StockWorkflow
+    from app.stock.trade_calendar import TradeCalendar
+
+    stock_workflow = object.__new__(StockWorkflow)
+    stock_workflow.tool_manager = tool_manager
+    stock_workflow.trade_calendar = TradeCalendar.from_days(
+        trade_days or pd.bdate_range("2024-01-01", "2024-12-31").date
+    )
+    stock_workflow.graphs = GraphRegistry()
+    manager = object.__new__(ChatManager)
+    manager.tool_manager = tool_manager
+    manager.agent_model = model
+    manager.stock_workflow = stock_workflow
+    manager.intent_classifier = intent_classifier or IntentClassifier()
+    manager.graphs = GraphRegistry()
+    return manager
+
+
+@pytest.fixture(name="make_chat_manager")
+def make_chat_manager_fixture():
+    """使用假对话模型的 ChatManager 生成器"""
+    return build_chat_manager
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    # 默认的监听队列只有 5，并发建连时超出的 SYN 被丢弃，要等 1s 后重传
+    request_queue_size = 128
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    """OpenAI 兼容的 /chat/completions 接口，支持 keep-alive，可注入延迟，统计最大并发请求数"""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(
+                self.server.max_in_flight, self.server.in_flight
+            )
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.in_flight -= 1
+        body = json.dumps(
+            {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": 0,
+                "model": request["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "ok"},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 1,
+                    "completion_tokens": 1,
+                    "total_tokens": 2,
+                },
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(name="mock_openai_server")
+def mock_openai_server_fixture():
+    """本地 OpenAI 兼容服务，统计连接数和请求数"""
+    server = MockOpenAIServer(("127.0.0.1", 0), MockOpenAIHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.requests = 0
+    server.in_flight = 0
+    server.max_in_flight = 0
+    server.latency = 0.0
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,83 @@
+import asyncio
+
+from langchain_core.tools import StructuredTool
+from langchain_openai.chat_models.base import BaseChatOpenAI
+from pydantic import BaseModel
+
+from app.llm.model_pool import ChatModelPool, Provider
+
+
+def _tool(name: str) -> StructuredTool:
+    def query(symbol: str) -> str:
+        return symbol
+
+    return StructuredTool.from_function(func=query, name=name, description=name)
+
+
+class Keywords(BaseModel):
+    keys: list[str]
+
+
+def test_pool_reuses_models_and_wrappers():
+    pool = ChatModelPool({"mock": Provider("http://127.0.0.1:1/v1", "sk-test")})
+
+    base = pool.get("mock", "qwen", temperature=0)
+    # 每轮对话重新创建的工具实例，schema 相同即复用绑定结果
+    bound = pool.get("mock", "qwen", temperature=0, tools=[_tool("a"), _tool("b")])
+    structured = pool.get("mock", "qwen", temperature=0, schema=Keywords)
+
+    assert pool.get("mock", "qwen", temperature=0) is base
+    assert pool.get("mock", "qwen", temperature=0, tools=[_tool("a"), _tool("b")]) is (
+        bound
+    )
+    assert pool.get("mock", "qwen", temperature=0, tools=[_tool("a")]) is not bound
+    assert pool.get("mock", "qwen", temperature=0, schema=Keywords) is structured
+    assert pool.get("mock", "qwen", temperature=0.5) is not base
+    assert pool.get("mock", "qwen", temperature=0.5).root_client._client is (
+        base.root_client._client
+    )
+
+
+def test_pool_evicts_bound_models_first():
+    pool = ChatModelPool({"mock": Provider("http://127.0.0.1:1/v1", "sk")}, max_size=2)
+
+    base = pool.get("mock", "qwen")
+    first = pool.get("mock", "qwen", tools=[_tool("a")])
+    pool.get("mock", "qwen", tools=[_tool("b")])
+
+    assert pool.get("mock", "qwen") is base
+    assert pool.get("mock", "qwen", tools=[_tool("a")]) is not first
+
+
+def test_pool_keeps_connections_alive(mock_openai_server):
+    turns = 3
+    tools = [_tool("stock_zh_a_hist")]
+
+    # 原有实现：每次调用新建模型和 HTTP 客户端
+    for _ in range(turns * 3):
+        BaseChatOpenAI(
+            model_name="qwen",
+            openai_api_base=mock_openai_server.base_url,
+            openai_api_key="sk-test",
+        ).invoke("你好")
+    fresh_connections = mock_openai_server.connections
+
+    mock_openai_server.connections = 0
+    pool = ChatModelPool({"mock": Provider(mock_openai_server.base_url, "sk-test")})
+    for _ in range(turns):
+        # 每轮对话：关键词、选择工具、回答
+        pool.get("mock", "qwen", temperature=0).invoke("关键词")
+        pool.get("mock", "qwen", temperature=0, tools=tools).invoke("选择工具")
+        pool.get("mock", "qwen", temperature=0).invoke("回答")
+
+    async def chat():
+        for _ in range(turns):
+            await pool.get("mock", "qwen", temperature=0).ainvoke("你好")
+
+    asyncio.run(chat())
+    pool.close()
+
+    assert mock_openai_server.requests == turns * 3 * 2 + turns
+    assert fresh_connections == turns * 3
+    # 同步和异步客户端各一条连接
+    assert mock_openai_server.connections == 2
@@ -0,0 +1,156 @@
+from datetime import date
+from test.stock.test_ingestion import StubAkshare
+
+import pytest
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app.models.stock import StockBackfillChunk, StockDaily
+from app.stock.backfill import DailyBackfillJob, month_ranges
+from app.stock.datastore import StockDatastore
+from app.stock.ingestion import DailyIngestionEngine
+from app.stock.service import StockService
+
+CODES = ["000001", "000002", "000003"]
+
+
+class InterruptedAkshare(StubAkshare):
+    """抓取到指定月份时模拟任务被强制停止"""
+
+    def __init__(self, codes: list[str], stop_at: str = None, **kwargs):
+        super().__init__(codes, latency=0, **kwargs)
+        self.stop_at = stop_at
+
+    def stock_zh_a_hist(self, symbol, period, start_date, end_date):
+        if start_date == self.stop_at:
+            raise KeyboardInterrupt
+        return super().stock_zh_a_hist(symbol, period, start_date, end_date)
+
+
+def _job(session: Session, source: StubAkshare) -> DailyBackfillJob:
+    engine = DailyIngestionEngine(
+        source=source,
+        source_name="stub-backfill",
+        max_workers=1,
+        rate_limit=0,
+        retry_backoff=0,
+        max_retries=0,
+    )
+    return DailyBackfillJob(StockService(StockDatastore(session)), engine)
+
+
+def _count(session: Session, model) -> int:
+    return session.scalar(select(func.count()).select_from(model))
+
+
+def test_month_ranges():
+    assert month_ranges(date(2023, 11, 15), date(2024, 2, 10)) == [
+        (date(2023, 11, 15), date(2023, 11, 30)),
+        (date(2023, 12, 1), date(2023, 12, 31)),
+        (date(2024, 1, 1), date(2024, 1, 31)),
+        (date(2024, 2, 1), date(2024, 2, 10)),
+    ]
+    assert month_ranges(date(2024, 1, 1), date(2024, 12, 31), months=6) == [
+        (date(2024, 1, 1), date(2024, 6, 30)),
+        (date(2024, 7, 1), date(2024, 12, 31)),
+    ]
+
+
+def test_backfill_resumes_after_interruption(memory_session: Session):
+    source = InterruptedAkshare(CODES, stop_at="20240301")
+    job = _job(memory_session, source)
+
+    with pytest.raises(KeyboardInterrupt):
+        job.run(date(2024, 1, 1), date(2024, 4, 30))
+
+    # 中断前完成的两个月已经写库并记录检查点
+    assert _count(memory_session, StockDaily) == 2 * len(CODES)
+    assert _count(memory_session, StockBackfillChunk) == 2 * len(CODES)
+
+    source.stop_at = None
+    report = job.run(date(2024, 1, 1), date(2024, 4, 30))
+
+    assert report.chunks == 4 * len(CODES)
+    assert report.skipped == 2 * len(CODES)
+    assert report.done == 2 * len(CODES)
+    assert _count(memory_session, StockDaily) == 4 * len(CODES)
+    # 已完成的月份没有重新下载
+    assert source.calls == {code: 4 for code in CODES}
+
+    again = job.run(date(2024, 1, 1), date(2024, 4, 30))
+    assert again.skipped == again.chunks
+    assert source.calls == {code: 4 for code in CODES}
+
+
+def test_backfill_retries_failed_chunks(memory_session: Session):
+    source = InterruptedAkshare(CODES, broken={"000002"})
+    job = _job(memory_session, source)
+
+    report = job.run(date(2024, 1, 1), date(2024, 2, 29))
+
+    assert report.done == 4
+    assert set(report.failed) == {"000002:20240101", "000002:20240201"}
+    statuses = dict(
+        memory_session.execute(
+            select(StockBackfillChunk.code, StockBackfillChunk.status).where(
+                StockBackfillChunk.start_date == date(2024, 1, 1)
+            )
+        ).all()
+    )
+    assert statuses == {"000001": "done", "000002": "failed", "000003": "done"}
+
+    source.broken = set()
+    retry = job.run(date(2024, 1, 1), date(2024, 2, 29))
+
+    assert retry.skipped == 4
+    assert retry.done == 2
+    assert not retry.failed
+    assert source.calls == {"000001": 2, "000002": 4, "000003": 2}
+    assert _count(memory_session, StockBackfillChunk) == 6
+
+
+def test_backfill_failed_save_is_rolled_back(memory_session: Session, monkeypatch):
+    job = _job(memory_session, InterruptedAkshare(CODES))
+    datastore = job.service.datastore
+    bulk_insert_frame = datastore.bulk_insert_frame
+    execute = memory_session.execute
+    executed = []
+
+    def failing_execute(statement, *args, **kwargs):
+        executed.append(statement)
+        # 依次为检查点查询、去重查询、1 月的两个写入分块，第二个分块失败
+        if len(executed) == 4:
+            raise ConnectionError("connection lost")
+        return execute(statement, *args, **kwargs)
+
+    monkeypatch.setattr(
+        datastore,
+        "bulk_insert_frame",
+        lambda *args, **kwargs: bulk_insert_frame(*args, **kwargs, batch_size=1),
+    )
+    monkeypatch.setattr(memory_session, "execute", failing_execute)
+
+    report = job.run(date(2024, 1, 1), date(2024, 2, 29))
+
+    assert set(report.failed) == {f"{code}:20240101" for code in CODES}
+    trade_dates = memory_session.scalars(select(StockDaily.trade_date)).all()
+    # 失败批次的部分数据没有随 2 月的检查点提交
+    assert trade_dates == [date(2024, 2, 1)] * len(CODES)
+
+
+def test_backfill_records_rows_written(memory_session: Session):
+    job = _job(memory_session, InterruptedAkshare(CODES))
+    job.run(date(2024, 1, 1), date(2024, 1, 31), codes=["000001"])
+    memory_session.execute(delete(StockBackfillChunk))
+    memory_session.commit()
+
+    report = job.run(date(2024, 1, 1), date(2024, 1, 31))
+
+    assert report.rows == 2
+    rows = dict(
+        memory_session.execute(
+            select(StockBackfillChunk.code, StockBackfillChunk.rows)
+        ).all()
+    )
+    # 000001 的日线已入库，本次没有写入
+    assert rows == {"000001": 0, "000002": 1, "000003": 1}
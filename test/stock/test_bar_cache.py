@@ -0,0 +1,148 @@
+import os
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.stock import StockDaily, StockIndicator
+from app.stock.bar_cache import BarCache
+from app.stock.datastore import StockDatastore
+from app.stock.indicator_service import StockIndicatorService
+from app.stock.service import StockService
+
+
+@pytest.fixture(name="bar_cache")
+def bar_cache_fixture(tmp_path) -> BarCache:
+    return BarCache(str(tmp_path / "bars"))
+
+
+def _daily(make_bars, code: str, periods: int = 60, seed: int = 0) -> pd.DataFrame:
+    bars = make_bars(periods, seed=seed, code=code)
+    return bars.assign(name=f"股票{code}", trade_date=bars.index.date)
+
+
+def test_window_is_zero_copy(bar_cache: BarCache, make_bars):
+    df = _daily(make_bars, "000001")
+    bar_cache.rebuild("000001", df, "平安银行")
+
+    window = bar_cache.window("000001", date(2024, 12, 1), date(2024, 12, 20))
+
+    assert len(window) == 15
+    assert np.shares_memory(window, bar_cache.bars("000001"))
+    frame = bar_cache.frame("000001", date(2024, 12, 1), date(2024, 12, 20))
+    expected = df.loc["2024-12-01":"2024-12-20"]
+    assert (frame.index == expected.index).all()
+    assert frame.index.name == "trade_date"
+    for column in ["open", "high", "low", "close", "volume", "amount"]:
+        np.testing.assert_array_equal(frame[column], expected[column].astype(float))
+    assert bar_cache.name("000001") == "平安银行"
+    assert bar_cache.frame("000002").empty
+
+
+def test_append_only(bar_cache: BarCache, make_bars):
+    df = _daily(make_bars, "000001")
+    bar_cache.rebuild("000001", df.iloc[:-5])
+
+    # 已缓存的日期跳过，只追加之后的日线
+    assert bar_cache.append("000001", df.iloc[-10:], "平安银行") == 5
+    assert bar_cache.append("000001", df.iloc[-10:]) == 0
+    # 没有建立过缓存的股票不追加
+    assert bar_cache.append("000002", _daily(make_bars, "000002")) == 0
+
+    assert len(bar_cache.bars("000001")) == len(df)
+    assert bar_cache.last_date("000001") == date(2024, 12, 31)
+    assert not bar_cache.has("000002")
+
+
+def test_append_waits_for_rebuild(bar_cache: BarCache, make_bars, tmp_path):
+    df = _daily(make_bars, "000001")
+    bar_cache.rebuild("000001", df.iloc[:-10])
+    rebuilt = BarCache(str(tmp_path / "rebuilt"))
+    rebuilt.rebuild("000001", df.iloc[:-5])
+    appended = []
+
+    with bar_cache._locked("000001"):
+        thread = threading.Thread(
+            target=lambda: appended.append(bar_cache.append("000001", df.iloc[-5:]))
+        )
+        thread.start()
+        thread.join(0.2)
+        # 重建替换文件期间追加等待，之后写入替换后的文件
+        assert thread.is_alive()
+        os.replace(rebuilt._path("000001"), bar_cache._path("000001"))
+    thread.join()
+
+    assert appended == [5]
+    assert len(bar_cache.bars("000001")) == len(df)
+
+
+def test_ingestion_appends_and_sync(
+    memory_session: Session, bar_cache: BarCache, make_bars
+):
+    datastore = StockDatastore(memory_session, bar_cache=bar_cache)
+    service = StockService(datastore)
+    for seed, code in enumerate(["000001", "000002", "000003"]):
+        datastore.bulk_insert_frame(
+            StockDaily, _daily(make_bars, code, seed=seed).iloc[:-1]
+        )
+
+    # 首次校验建立全部缓存
+    assert set(service.sync_bar_cache()) == {"000001", "000002", "000003"}
+    assert service.sync_bar_cache() == {}
+
+    # 抓取入库时追加到缓存
+    for seed, code in enumerate(["000001", "000002", "000003"]):
+        datastore.bulk_insert_frame(
+            StockDaily, _daily(make_bars, code, seed=seed).iloc[[-1]]
+        )
+    assert bar_cache.last_date("000002") == date(2024, 12, 31)
+    assert service.sync_bar_cache() == {}
+
+    # 缓存被写坏后按数据库重建
+    bar_cache.rebuild("000003", _daily(make_bars, "000003", seed=9))
+    assert list(service.sync_bar_cache()) == ["000003"]
+    np.testing.assert_array_equal(
+        bar_cache.frame("000003")["close"],
+        datastore.get_stock_history_frame("000003")["close"],
+    )
+
+
+def test_history_reads_use_cache(
+    memory_session: Session, bar_cache: BarCache, make_bars
+):
+    datastore = StockDatastore(memory_session, bar_cache=bar_cache)
+    df = _daily(make_bars, "000001")
+    datastore.bulk_insert_frame(StockDaily, df)
+    datastore.bulk_insert_frame(
+        StockIndicator,
+        pd.DataFrame(
+            {
+                "code": "000001",
+                "trade_date": df["trade_date"].iloc[-20:],
+                "ma5": df["close"].iloc[-20:],
+            }
+        ),
+    )
+    expected = datastore.get_history_with_indicators("000001", date(2024, 12, 1))
+    StockService(datastore).sync_bar_cache()
+    statements = []
+    event.listen(
+        memory_session.get_bind(),
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    history = StockIndicatorService(datastore)._get_history_data(
+        "000001", date(2024, 12, 1)
+    )
+    assert statements == []
+    assert len(history) == 22
+
+    actual = StockService(datastore).get_history_with_indicators(
+        "000001", date(2024, 12, 1)
+    )
+    pd.testing.assert_frame_equal(actual, expected)
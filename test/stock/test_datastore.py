@@ -0,0 +1,89 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.models.stock import StockDaily, StockIndicator
+from app.stock.datastore import StockDatastore
+
+
+def test_stock_history_frame(memory_session: Session, make_bars):
+    datastore = StockDatastore(memory_session)
+    bars = make_bars(30)
+    datastore.bulk_insert_frame(
+        StockDaily, bars.assign(name="平安银行", trade_date=bars.index.date)
+    )
+    datastore.bulk_insert_frame(
+        StockDaily,
+        make_bars(30, seed=1, code="000002").pipe(
+            lambda df: df.assign(name="万科A", trade_date=df.index.date)
+        ),
+    )
+
+    df = datastore.get_stock_history_frame(
+        "000001", date(2024, 12, 1), date(2024, 12, 31)
+    )
+
+    expected = bars.loc["2024-12-01":"2024-12-31"]
+    assert isinstance(df.index, pd.DatetimeIndex)
+    assert df.index.name == "trade_date"
+    assert (df.index == expected.index).all()
+    for column in ["open", "high", "low", "close", "volume", "amount"]:
+        assert df[column].dtype == np.float64
+        np.testing.assert_allclose(df[column], expected[column].astype(float))
+    assert set(df["code"]) == {"000001"}
+
+
+def test_history_frame_empty_and_nulls(memory_session: Session):
+    datastore = StockDatastore(memory_session)
+    assert datastore.get_stock_history_frame("000001").empty
+
+    datastore.bulk_insert_frame(
+        StockIndicator,
+        pd.DataFrame(
+            {"code": ["000001"], "trade_date": [date(2024, 12, 31)], "ma5": [10.5]}
+        ),
+    )
+    df = datastore.get_indicator_history_frame("000001")
+    assert df.loc["2024-12-31", "ma5"] == 10.5
+    assert np.isnan(df.loc["2024-12-31", "ma60"])
+    assert df["ma60"].dtype == np.float64
+
+
+def test_history_with_indicators(memory_session: Session, make_bars):
+    datastore = StockDatastore(memory_session)
+    for seed, code in enumerate(["000001", "000002", "000003"]):
+        bars = make_bars(10, seed=seed, code=code)
+        datastore.bulk_insert_frame(
+            StockDaily, bars.assign(name=f"股票{code}", trade_date=bars.index.date)
+        )
+        # 每只股票只有最近 5 天有指标，且各股票同一天的指标不同
+        datastore.bulk_insert_frame(
+            StockIndicator,
+            pd.DataFrame(
+                {
+                    "code": code,
+                    "trade_date": bars.index.date[-5:],
+                    "ma5": bars["close"].to_numpy()[-5:] + seed,
+                }
+            ),
+        )
+
+    df = datastore.get_history_with_indicators(["000001", "000002"])
+
+    assert len(df) == 10
+    assert list(df["code"].unique()) == ["000001", "000002"]
+    for code, group in df.groupby("code"):
+        seed = int(code) - 1
+        np.testing.assert_allclose(group["ma5"] - group["close"], seed)
+        assert group["trade_date"].is_monotonic_increasing
+    assert df["close"].dtype == df["ma5"].dtype == np.float64
+
+    single = datastore.get_history_with_indicators("000003", date(2024, 12, 30))
+    assert list(single["trade_date"].dt.date) == [
+        date(2024, 12, 30),
+        date(2024, 12, 31),
+    ]
+    assert set(single["name"]) == {"股票000003"}
+    assert len(datastore.get_history_with_indicators()) == 15
@@ -1,6 +1,10 @@
+from datetime import date
+
+import pytest
 from sqlalchemy.orm import Session
 
 from app.core.database import Base, engine
+from app.models.stock import StockDaily
 from app.stock.datastore import StockDatastore
 from app.stock.indicator_service import StockIndicatorService
 from app.utils.date import date_parse_to_date
@@ -10,3 +14,26 @@ def test_indicator(session: Session):
     service = StockIndicatorService(StockDatastore(session))
     Base.metadata.create_all(engine)
     service.calculate_indicators("000001", date_parse_to_date("20241227"))
+
+
+def test_calculate_indicator_range(memory_session: Session, make_bars):
+    datastore = StockDatastore(memory_session)
+    bars = make_bars(400)
+    datastore.bulk_insert_frame(
+        StockDaily, bars.assign(name="平安银行", trade_date=bars.index.date)
+    )
+    service = StockIndicatorService(datastore)
+
+    count = service.calculate_indicator_range(
+        "000001", date(2024, 7, 1), date(2024, 12, 31)
+    )
+
+    rows = datastore.get_indicator_history("000001")
+    assert count == len(rows) == len(bars.loc["2024-07-01":])
+    expected = bars["close"].rolling(20).mean().loc["2024-07-01":]
+    actual = [float(row.ma20) for row in rows]
+    assert actual == pytest.approx(expected.tolist(), abs=0.01)
+
+    # 重复计算只更新，不会重复插入
+    service.calculate_indicator_range("000001", date(2024, 12, 1), date(2024, 12, 31))
+    assert len(datastore.get_indicator_history("000001")) == count
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.stock import StockDaily
+from app.stock.datastore import StockDatastore
+from app.stock.indicator_service import INDICATOR_COLUMNS, StockIndicatorService
+from app.utils.indicator_matrix import calculate_indicator_matrix
+
+
+def test_matrix_matches_talib(make_bars):
+    rng = np.random.default_rng(42)
+    universe = [
+        make_bars(int(length), seed=i, code=f"{i:06d}")
+        for i, length in enumerate(rng.integers(30, 160, 40))
+    ]
+    # 一段横盘覆盖最高价等于最低价的情况
+    universe[0].iloc[
+        5:20, universe[0].columns.get_indexer(["high", "low", "close"])
+    ] = 8
+
+    df = pd.concat(universe).rename_axis("trade_date").reset_index()
+    df = df.sort_values(["code", "trade_date"])
+    matrix, codes = StockIndicatorService._to_bar_matrix(
+        df, ["high", "low", "close", "volume"]
+    )
+    result = calculate_indicator_matrix(
+        matrix["high"], matrix["low"], matrix["close"], matrix["volume"]
+    )
+
+    for column, bars in zip(range(len(codes)), universe):
+        expected = StockIndicatorService._compute_indicators(bars)
+        for name in expected.columns:
+            actual = result[name][-len(bars) :, column]
+            np.testing.assert_allclose(
+                actual,
+                expected[name].to_numpy(),
+                rtol=1e-7,
+                atol=1e-6,
+                err_msg=f"{codes[column]} {name}",
+            )
+        # 补齐的部分全部为 NaN
+        assert np.isnan(result["ma5"][: -len(bars), column]).all()
+
+
+def test_calculate_market_indicators(memory_session: Session, make_bars):
+    datastore = StockDatastore(memory_session)
+    universe = [make_bars(150, seed=i, code=f"{i:06d}") for i in range(5)]
+    universe.append(make_bars(20, seed=9, code="301999"))
+    for bars in universe:
+        datastore.bulk_insert_frame(
+            StockDaily, bars.assign(name="测试", trade_date=bars.index.date)
+        )
+    service = StockIndicatorService(datastore)
+    current = universe[0].index[-1].date()
+
+    # 上市不足60日的股票跳过
+    assert service.calculate_market_indicators(current) == 5
+
+    for bars in universe[:5]:
+        row = datastore.get_indicator(bars["code"].iloc[0], current)
+        expected = StockIndicatorService._compute_indicators(
+            bars.loc[str(current - pd.Timedelta(days=120)) :]
+        ).iloc[-1]
+        for name in INDICATOR_COLUMNS:
+            assert float(getattr(row, name)) == pytest.approx(
+                expected[name], abs=0.01
+            ), name
@@ -0,0 +1,102 @@
+import logging
+import time
+from contextlib import contextmanager
+
+import pytest
+from celery import Celery
+from celery.signals import before_task_publish
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.stock import StockDaily
+from app.stock.datastore import StockDatastore
+from app.stock.indicator_service import StockIndicatorService
+from app.tasks import stock_tasks
+from app.utils.date import SHORT_DATE_FORMAT, date_format
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture(name="memory_broker")
+def memory_broker_fixture():
+    """内存 broker，记录发布的任务消息"""
+    celery_app = Celery("test", broker="memory://", backend="cache+memory://")
+    celery_app.set_current()
+    published = []
+
+    def on_publish(sender=None, body=None, **kwargs):
+        published.append(sender)
+
+    before_task_publish.connect(on_publish, weak=False)
+    yield published
+    before_task_publish.disconnect(on_publish)
+
+
+def test_schedule_indicator_tasks_in_chunks(memory_broker):
+    codes = [f"{i:06d}" for i in range(5000)]
+
+    started = time.perf_counter()
+    for code in codes:
+        stock_tasks.stock_indicator_task.apply_async(
+            kwargs={"code": code, "current_date": "20241231"}
+        )
+    per_code_elapsed = time.perf_counter() - started
+    per_code_messages = len(memory_broker)
+    memory_broker.clear()
+
+    started = time.perf_counter()
+    count = stock_tasks.schedule_indicator_tasks(codes, "20241231", chunk_size=500)
+    chunked_elapsed = time.perf_counter() - started
+    logger.info(
+        f"逐只发布: {per_code_messages}条消息 {per_code_elapsed:.3f}s, "
+        f"分组发布: {len(memory_broker)}条消息 {chunked_elapsed:.3f}s"
+    )
+
+    assert count == len(memory_broker) == 10
+    assert set(memory_broker) == {stock_tasks.stock_indicator_batch_task.name}
+    assert per_code_messages / len(memory_broker) >= 100
+
+    memory_broker.clear()
+    assert stock_tasks.schedule_indicator_tasks(codes, "20241231", chunk_size=0) == 1
+    assert memory_broker == [stock_tasks.market_indicator_task.name]
+    assert stock_tasks.schedule_indicator_tasks([], "20241231") == 0
+
+
+def test_stock_indicator_batch_task(memory_session: Session, make_bars, monkeypatch):
+    datastore = StockDatastore(memory_session)
+    codes = [f"{i:06d}" for i in range(20)]
+    for seed, code in enumerate(codes):
+        bars = make_bars(150, seed=seed, code=code)
+        datastore.bulk_insert_frame(
+            StockDaily, bars.assign(name=code, trade_date=bars.index.date)
+        )
+    current = bars.index[-1].date()
+
+    @contextmanager
+    def get_celery_db():
+        yield memory_session
+
+    monkeypatch.setattr(stock_tasks, "get_celery_db", get_celery_db)
+    statements = []
+    event.listen(
+        memory_session.get_bind(),
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    result = stock_tasks.stock_indicator_batch_task.apply(
+        kwargs={
+            "codes": codes,
+            "current_date": date_format(current, SHORT_DATE_FORMAT),
+        }
+    )
+
+    assert result.get() == len(codes)
+    # 状态、行情各一次查询，指标、状态各一次批量写入
+    assert len(statements) == 4
+    service = StockIndicatorService(datastore)
+    assert service.update_indicators_batch(codes, current) == len(codes)
+    for code in codes[:3]:
+        row = datastore.get_indicator(code, current)
+        assert row is not None
+        assert datastore.get_indicator_state(code).trade_date == current
@@ -0,0 +1,76 @@
+import json
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.stock import StockDaily
+from app.stock.datastore import StockDatastore
+from app.stock.indicator_service import INDICATOR_HISTORY_DAYS, StockIndicatorService
+from app.utils.indicator_stream import IndicatorState
+
+
+def _replay(bars: pd.DataFrame, persist_every: int = 1) -> pd.DataFrame:
+    """逐根K线推进状态，每 persist_every 根做一次 JSON 序列化往返"""
+    state = IndicatorState()
+    rows = []
+    for i, bar in enumerate(bars.itertuples()):
+        rows.append(state.update(bar.high, bar.low, bar.close, bar.volume))
+        if (i + 1) % persist_every == 0:
+            state = IndicatorState(json.loads(json.dumps(state.to_dict())))
+    return pd.DataFrame(rows, index=bars.index)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_stream_matches_talib(make_bars, seed):
+    bars = make_bars(300, seed=seed)
+    # 制造一段横盘，覆盖最高价等于最低价等边界情况
+    bars.iloc[100:115, bars.columns.get_indexer(["open", "high", "low", "close"])] = 8.0
+
+    expected = StockIndicatorService._compute_indicators(bars)
+    actual = _replay(bars)[expected.columns]
+
+    for column in expected.columns:
+        # 预热期(NaN)位置必须完全一致
+        np.testing.assert_array_equal(
+            expected[column].isna().to_numpy(),
+            actual[column].isna().to_numpy(),
+            err_msg=column,
+        )
+        np.testing.assert_allclose(
+            actual[column].to_numpy(),
+            expected[column].to_numpy(),
+            rtol=1e-7,
+            atol=1e-6,
+            err_msg=column,
+        )
+
+
+def test_stream_state_resume(make_bars):
+    bars = make_bars(200)
+    full = _replay(bars, persist_every=10**9)
+    resumed = _replay(bars, persist_every=7)
+    pd.testing.assert_frame_equal(full, resumed)
+
+
+def test_update_indicators_resumes_from_state(memory_session: Session, make_bars):
+    datastore = StockDatastore(memory_session)
+    bars = make_bars(200)
+    datastore.bulk_insert_frame(
+        StockDaily, bars.assign(name="平安银行", trade_date=bars.index.date)
+    )
+    service = StockIndicatorService(datastore)
+    previous, current = bars.index[-2].date(), bars.index[-1].date()
+
+    service.update_indicators("000001", previous)
+    assert datastore.get_indicator_state("000001").trade_date == previous
+    service.update_indicators("000001", current)
+
+    start = previous - timedelta(days=INDICATOR_HISTORY_DAYS)
+    expected = _replay(bars.loc[str(start) :]).iloc[-1]
+    row = datastore.get_indicator("000001", current)
+    for column in ["ma60", "diff", "dea", "macd", "k", "d", "rsi6", "cci", "dma"]:
+        assert float(getattr(row, column)) == pytest.approx(expected[column], abs=0.01)
+    assert datastore.get_indicator_state("000001").trade_date == current
@@ -0,0 +1,234 @@
+import logging
+import threading
+import time
+from datetime import date
+
+import pandas as pd
+import pytest
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.models.stock import StockBlockTrade, StockDaily, StockLhb
+from app.stock.datastore import StockDatastore
+from app.stock.ingestion import DailyIngestionEngine, RateLimiter, StockBars
+from app.stock.service import StockService
+
+logger = logging.getLogger(__name__)
+
+
+class StubAkshare:
+    """模拟 akshare 数据源，可注入延迟和失败"""
+
+    def __init__(
+        self,
+        codes: list[str],
+        latency: float = 0.05,
+        flaky: dict[str, int] = None,
+        broken: set[str] = None,
+    ):
+        self.codes = codes
+        self.latency = latency
+        self.flaky = dict(flaky or {})
+        self.broken = broken or set()
+        self.calls: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def stock_info_a_code_name(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {"code": self.codes, "name": [f"股票{c}" for c in self.codes]}
+        )
+
+    def stock_zh_a_hist(self, symbol, period, start_date, end_date) -> pd.DataFrame:
+        with self._lock:
+            self.calls[symbol] = self.calls.get(symbol, 0) + 1
+            remaining = self.flaky.get(symbol, 0)
+            if remaining:
+                self.flaky[symbol] = remaining - 1
+        time.sleep(self.latency)
+        if symbol in self.broken or remaining:
+            raise ConnectionError(f"{symbol} timeout")
+        return pd.DataFrame(
+            {
+                "日期": [start_date],
+                "开盘": [10.0],
+                "最高": [11.0],
+                "最低": [9.5],
+                "收盘": [10.5],
+                "成交量": [1000],
+                "成交额": [10500],
+                "换手率": [1.2],
+            }
+        )
+
+
+def test_ingestion_engine_concurrency_and_retry():
+    codes = [f"{i:06d}" for i in range(200)]
+    source = StubAkshare(codes, latency=0.02, flaky={"000001": 2}, broken={"000002"})
+    engine = DailyIngestionEngine(
+        source=source,
+        source_name="stub-concurrency",
+        max_workers=20,
+        rate_limit=0,
+        max_retries=3,
+        retry_backoff=0.01,
+    )
+    handled = []
+
+    def handler(batch):
+        handled.extend(bars.code for bars in batch)
+        return {bars.code: len(bars.data) for bars in batch}
+
+    report = engine.run(
+        engine.list_stocks(), date(2024, 12, 27), None, handler, batch_size=16
+    )
+    logger.info(f"report: {report.to_dict()}")
+
+    assert report.total == len(codes)
+    assert "000001" in report.succeeded
+    assert source.calls["000001"] == 3
+    assert list(report.failed) == ["000002"]
+    assert source.calls["000002"] == 4
+    assert len(handled) == report.rows == len(codes) - 1
+    # 串行需要 200 * 0.02 = 4 秒
+    assert report.elapsed < 2
+
+
+def test_ingestion_engine_handler_failure_is_isolated():
+    codes = ["000001", "000002", "000003", "000004"]
+    engine = DailyIngestionEngine(
+        source=StubAkshare(codes, latency=0),
+        source_name="stub-handler",
+        max_workers=2,
+        rate_limit=0,
+    )
+
+    def handler(batch):
+        if any(bars.code == "000002" for bars in batch):
+            raise ValueError("db error")
+        return {bars.code: len(bars.data) for bars in batch}
+
+    report = engine.run(
+        engine.list_stocks(), date(2024, 12, 27), None, handler, batch_size=2
+    )
+
+    # 同一批次的股票一起失败
+    assert len(report.succeeded) == 2
+    assert "000002" in report.failed
+    assert len(report.failed) == 2
+    assert set(report.failed.values()) == {"db error"}
+
+
+def test_rate_limiter():
+    limiter = RateLimiter(rate=50, capacity=1)
+    started = time.perf_counter()
+    for _ in range(26):
+        limiter.acquire()
+    elapsed = time.perf_counter() - started
+    assert elapsed >= 0.45
+
+
+def test_fetch_daily_data_is_idempotent(memory_session: Session):
+    codes = [f"{i:06d}" for i in range(50)]
+    engine = DailyIngestionEngine(
+        source=StubAkshare(codes, latency=0),
+        source_name="stub-upsert",
+        rate_limit=0,
+    )
+    service = StockService(StockDatastore(memory_session))
+    statements = []
+    event.listen(
+        memory_session.get_bind(),
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    first = service.fetch_daily_data(date(2024, 12, 27), date(2024, 12, 30), engine)
+    first_statements = len(statements)
+    second = service.fetch_daily_data(date(2024, 12, 27), date(2024, 12, 30), engine)
+
+    assert first.rows == len(codes)
+    # 重复抓取的日线已入库，没有写入
+    assert second.rows == 0
+    count = memory_session.scalar(select(func.count()).select_from(StockDaily))
+    assert count == len(codes)
+    # 每批一次去重查询 + 一次写入，而不是每行一次查询
+    assert first_statements <= 2
+    assert len(statements) - first_statements <= 2
+
+
+def test_refetch_lhb_and_block_trade_does_not_duplicate(
+    memory_session: Session, monkeypatch
+):
+    lhb = pd.DataFrame(
+        {
+            "代码": ["000001", "000001", "000002"],
+            "名称": ["平安银行", "平安银行", "万科A"],
+            "上榜日": ["2024-12-30"] * 3,
+            "上榜原因": ["日涨幅偏离值达7%", "日换手率达20%", "日涨幅偏离值达7%"],
+            "龙虎榜净买额": [1.0, 2.0, 3.0],
+            "龙虎榜买入额": [10.0, 20.0, 30.0],
+            "龙虎榜卖出额": [9.0, 18.0, 27.0],
+            "龙虎榜成交额": [19.0, 38.0, 57.0],
+        }
+    )
+    block_trade = pd.DataFrame(
+        {
+            "证券代码": ["000001", "000001"],
+            "证券简称": ["平安银行", "平安银行"],
+            "交易日期": ["2024-12-30"] * 2,
+            "成交价": [11.5, 11.5],
+            "成交量": [100.0, 200.0],
+            "成交额": [1150.0, 2300.0],
+            "买方营业部": ["机构专用", "机构专用"],
+            "卖方营业部": ["营业部A", "营业部A"],
+            "折溢率": [-0.01, -0.01],
+        }
+    )
+    monkeypatch.setattr("akshare.stock_lhb_detail_em", lambda **kwargs: lhb)
+    monkeypatch.setattr("akshare.stock_dzjy_mrmx", lambda **kwargs: block_trade)
+    service = StockService(StockDatastore(memory_session))
+
+    for _ in range(2):
+        service.fetch_lhb_data(date(2024, 12, 30), None)
+        service.fetch_block_trade_data(date(2024, 12, 30), None)
+
+    # 同一天重复抓取按自然键覆盖，不重复入库
+    assert memory_session.scalar(select(func.count()).select_from(StockLhb)) == 3
+    assert memory_session.scalar(select(func.count()).select_from(StockBlockTrade)) == 2
+
+
+def test_failed_batch_is_rolled_back(memory_session: Session, monkeypatch):
+    datastore = StockDatastore(memory_session)
+    service = StockService(datastore)
+    source = StubAkshare([f"{i:06d}" for i in range(4)], latency=0)
+
+    def bars(code: str) -> StockBars:
+        data = source.stock_zh_a_hist(code, "daily", "20241227", "20241227")
+        return StockBars(code=code, name=f"股票{code}", data=data)
+
+    bulk_insert_frame = datastore.bulk_insert_frame
+    execute = memory_session.execute
+    executed = []
+
+    def failing_execute(statement, *args, **kwargs):
+        executed.append(statement)
+        # 第 1 条为去重查询，第 2 条写入第一个分块，第 3 条写入失败
+        if len(executed) == 3:
+            raise ConnectionError("connection lost")
+        return execute(statement, *args, **kwargs)
+
+    monkeypatch.setattr(
+        datastore,
+        "bulk_insert_frame",
+        lambda *args, **kwargs: bulk_insert_frame(*args, **kwargs, batch_size=1),
+    )
+    monkeypatch.setattr(memory_session, "execute", failing_execute)
+    with pytest.raises(ConnectionError):
+        service.save_daily_bars([bars("000000"), bars("000001")])
+    monkeypatch.setattr(memory_session, "execute", execute)
+
+    written = service.save_daily_bars([bars("000002"), bars("000003")])
+    assert written == {"000002": 1, "000003": 1}
+    codes = memory_session.scalars(select(StockDaily.code)).all()
+    # 失败批次已写入的第一个分块不会随下一批次提交
+    assert sorted(codes) == ["000002", "000003"]
@@ -0,0 +1,205 @@
+import os
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.stock import StockDaily, StockIndicator, StockLhb
+from app.stock.datastore import StockDatastore
+from app.stock.parquet_store import StockParquetStore
+
+
+@pytest.fixture(name="mirror")
+def mirror_fixture(tmp_path) -> StockParquetStore:
+    return StockParquetStore(str(tmp_path / "parquet"))
+
+
+def _daily(make_bars, codes: list[str], periods: int = 60) -> pd.DataFrame:
+    frames = [
+        make_bars(periods, seed=seed, code=code).pipe(
+            lambda df: df.assign(name=f"股票{df['code'].iat[0]}", trade_date=df.index)
+        )
+        for seed, code in enumerate(codes)
+    ]
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_write_and_read(mirror: StockParquetStore, make_bars):
+    df = _daily(make_bars, ["000001", "000002", "600000"])
+
+    assert mirror.write(StockDaily, df) == len(df)
+
+    months = sorted(os.listdir(os.path.join(mirror.root, "cn_stock_daily")))
+    assert months == ["month=2024-10", "month=2024-11", "month=2024-12"]
+    table = mirror.read(
+        StockDaily,
+        ["code", "trade_date", "close"],
+        ["000002", "600000"],
+        date(2024, 12, 2),
+        date(2024, 12, 31),
+    )
+    assert table.column_names == ["code", "trade_date", "close"]
+    assert set(table["code"].to_pylist()) == {"000002", "600000"}
+    assert min(table["trade_date"].to_pylist()) == date(2024, 12, 2)
+
+    frame = mirror.read_frame(
+        StockDaily, ["trade_date", "close", "volume"], "000001", index="trade_date"
+    )
+    expected = df[df["code"] == "000001"]
+    np.testing.assert_allclose(frame["close"], expected["close"])
+    assert frame.index.dtype == "datetime64[ns]"
+    assert frame["volume"].dtype == np.float64
+
+
+def test_write_overwrites_by_key(mirror: StockParquetStore, make_bars):
+    df = _daily(make_bars, ["000001", "000002"], periods=5)
+    mirror.write(StockDaily, df)
+
+    # 重复写入同一天，只覆盖这只股票这一天
+    update = df.iloc[[0]].assign(close=99.999)
+    mirror.write(StockDaily, update)
+
+    table = mirror.read_frame(StockDaily)
+    assert len(table) == len(df)
+    first = table[(table["code"] == "000001")].iloc[0]
+    # 与数据库 Numeric(10, 2) 的精度一致
+    assert first["close"] == 100.0
+
+    lhb = pd.DataFrame(
+        {
+            "code": ["000001", "000002"],
+            "name": ["a", "b"],
+            "trade_date": [date(2024, 12, 31)] * 2,
+            "reason": ["涨幅偏离", "换手率"],
+            "net_buy": [1.0, 2.0],
+        }
+    )
+    mirror.write(StockLhb, lhb)
+    # 龙虎榜按交易日整日覆盖
+    mirror.write(StockLhb, lhb.iloc[[1]])
+    assert mirror.read_frame(StockLhb)["code"].tolist() == ["000002"]
+
+
+def test_concurrent_writes(mirror: StockParquetStore, make_bars):
+    codes = [f"{i:06d}" for i in range(8)]
+    df = _daily(make_bars, codes, periods=10)
+
+    threads = [
+        threading.Thread(target=mirror.write, args=(StockDaily, df[df["code"] == code]))
+        for code in codes
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(mirror.read_frame(StockDaily)) == len(df)
+
+
+def test_datastore_mirror(
+    memory_session: Session, mirror: StockParquetStore, make_bars
+):
+    datastore = StockDatastore(memory_session, mirror=mirror)
+    df = _daily(make_bars, ["000001", "000002", "000003"])
+    datastore.bulk_insert_frame(
+        StockDaily, df.assign(trade_date=df["trade_date"].dt.date)
+    )
+    indicators = df[["code", "trade_date"]].assign(
+        ma5=df["close"].round(2), k=np.where(df.index % 2, 50.0, np.nan)
+    )
+    datastore.bulk_insert_frame(StockIndicator, indicators.iloc[10:])
+    mirrored = StockDatastore(memory_session, mirror=mirror, read_mirror=True)
+    start, end = date(2024, 11, 1), date(2024, 12, 31)
+
+    pairs = [
+        (
+            datastore.get_stock_history_frame("000002", start, end),
+            mirrored.get_stock_history_frame("000002", start, end),
+        ),
+        (
+            datastore.get_indicator_history_frame("000001"),
+            mirrored.get_indicator_history_frame("000001"),
+        ),
+        (
+            datastore.get_market_history(start, end, ["000001", "000003"]),
+            mirrored.get_market_history(start, end, ["000001", "000003"]),
+        ),
+        (
+            datastore.get_history_with_indicators(None, start, end, ["close", "ma5"]),
+            mirrored.get_history_with_indicators(None, start, end, ["close", "ma5"]),
+        ),
+        (
+            datastore.get_history_with_indicators(["000002"]),
+            mirrored.get_history_with_indicators(["000002"]),
+        ),
+    ]
+    for expected, actual in pairs:
+        assert not actual.empty
+        # SQLite 不按 Numeric 精度存储，镜像与 MySQL 一样保留两位小数
+        pd.testing.assert_frame_equal(actual, expected, atol=0.005)
+
+
+def test_memory_mapped_history(
+    memory_session: Session, mirror: StockParquetStore, make_bars
+):
+    datastore = StockDatastore(memory_session, mirror=mirror, read_mirror=True)
+    df = _daily(make_bars, ["000001", "000002"])
+    datastore.bulk_insert_frame(StockDaily, df)
+    datastore.bulk_insert_frame(
+        StockIndicator, df[["code", "trade_date"]].assign(ma5=1.0)
+    )
+    cache_dir = os.path.join(mirror.root, "_cache")
+
+    first = datastore.get_history_with_indicators(fields=["close"], memory_map=True)
+    second = datastore.get_history_with_indicators(fields=["close"], memory_map=True)
+
+    assert len(os.listdir(cache_dir)) == 1
+    pd.testing.assert_frame_equal(first, second)
+    pd.testing.assert_frame_equal(
+        first, datastore.get_history_with_indicators(fields=["close"])
+    )
+
+    # 镜像写入后缓存失效
+    datastore.bulk_insert_frame(
+        StockDaily,
+        df.iloc[[-1]].assign(close=1.0),
+        index_elements=["code", "trade_date"],
+    )
+    third = datastore.get_history_with_indicators(fields=["close"], memory_map=True)
+    assert third["close"].iat[-1] == 1.0
+    assert len(os.listdir(cache_dir)) == 2
+
+
+def test_export_to_mirror(
+    memory_session: Session, mirror: StockParquetStore, make_bars
+):
+    df = _daily(make_bars, ["000001", "000002"])
+    StockDatastore(memory_session, mirror=None).bulk_insert_frame(StockDaily, df)
+    datastore = StockDatastore(memory_session, mirror=mirror)
+
+    count = datastore.export_to_mirror(StockDaily, date(2024, 12, 1))
+
+    assert count == len(mirror.read_frame(StockDaily)) == 2 * 22
+
+    with pytest.raises(ValueError, match="STOCK_PARQUET_DIR"):
+        StockDatastore(memory_session, mirror=None).export_to_mirror(StockDaily)
+
+
+def test_read_falls_back_to_database_before_export(
+    memory_session: Session, mirror: StockParquetStore, make_bars
+):
+    df = _daily(make_bars, ["000001", "000002"])
+    StockDatastore(memory_session, mirror=None).bulk_insert_frame(StockDaily, df)
+    datastore = StockDatastore(memory_session, mirror=mirror, read_mirror=True)
+
+    # 镜像尚未导出，读取数据库而不是返回空数据
+    history = datastore.get_stock_history_frame("000001")
+    assert len(history) == 60
+    assert not mirror.has_table(StockDaily)
+
+    datastore.export_to_mirror(StockDaily)
+    mirror.write(StockDaily, df.assign(close=1.0))
+    assert (datastore.get_stock_history_frame("000001")["close"] == 1.0).all()
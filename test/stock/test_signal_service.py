@@ -0,0 +1,110 @@
+import asyncio
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.stock import StockDaily, StockIndicator, StockSignal
+from app.stock import signal_service
+from app.stock.datastore import AsyncStockDatastore
+from app.stock.signal_service import SignalService
+from app.strategy._strategy import BaseStrategy, cross_down, cross_up
+
+
+class CloseAboveMa5(BaseStrategy):
+    name = "站上5日线"
+
+    def buy_signals(self, df: pd.DataFrame) -> np.ndarray:
+        return cross_up(df, "close", "ma5")
+
+    def sell_signals(self, df: pd.DataFrame) -> np.ndarray:
+        return cross_down(df, "close", "ma5")
+
+
+class FakeTelegram:
+    def __init__(self):
+        self.sent = []
+
+    async def send_signals(self, signals: list, date: str) -> bool:
+        self.sent.append((date, signals))
+        return True
+
+
+async def _insert_day(
+    datastore: AsyncStockDatastore, trade_date: date, close: list, ma5: list
+):
+    codes = [f"{i:06d}" for i in range(len(close))]
+    await datastore.bulk_insert(
+        StockDaily,
+        [
+            {"code": c, "name": f"股票{c}", "trade_date": trade_date, "close": v}
+            for c, v in zip(codes, close)
+        ],
+    )
+    await datastore.bulk_insert(
+        StockIndicator,
+        [{"code": c, "trade_date": trade_date, "ma5": v} for c, v in zip(codes, ma5)],
+    )
+
+
+async def test_generate_signals(async_memory_session: AsyncSession):
+    datastore = AsyncStockDatastore(async_memory_session)
+    # 前一交易日 000000 在5日线下方、000001 在5日线上方
+    await _insert_day(datastore, date(2024, 12, 30), [9, 11, 11], [10, 10, 10])
+    await _insert_day(datastore, date(2024, 12, 31), [11, 9, 10], [10, 10, 10])
+    telegram = FakeTelegram()
+    service = SignalService(datastore, strategies=[CloseAboveMa5()], telegram=telegram)
+
+    signals = await service.generate_signals("20241231")
+
+    assert [(s.code, s.name, s.signal_type) for s in signals] == [
+        ("000000", "股票000000", "buy"),
+        ("000001", "股票000001", "sell"),
+    ]
+    saved = (await async_memory_session.execute(select(StockSignal))).scalars().all()
+    assert {(s.code, s.trade_date, s.strategy) for s in saved} == {
+        ("000000", date(2024, 12, 31), "站上5日线"),
+        ("000001", date(2024, 12, 31), "站上5日线"),
+    }
+    assert telegram.sent[0][0] == "20241231"
+    assert [(m.name, m.buy, m.sell) for m in service.metrics] == [("站上5日线", 1, 1)]
+    assert await service.generate_signals("20250102") == []
+
+
+async def test_calendar_loads_off_the_event_loop(
+    async_memory_session: AsyncSession, monkeypatch
+):
+    class SlowCalendar:
+        """模拟首次构建时同步加载快照的交易日历"""
+
+        def __init__(self):
+            time.sleep(0.2)
+
+        def get_previous_trade_day(self, trade_date: date) -> date:
+            return date(2024, 12, 30)
+
+    monkeypatch.setattr(signal_service, "TradeCalendar", SlowCalendar)
+    datastore = AsyncStockDatastore(async_memory_session)
+    await _insert_day(datastore, date(2024, 12, 30), [9], [10])
+    await _insert_day(datastore, date(2024, 12, 31), [11], [10])
+    service = SignalService(
+        datastore, strategies=[CloseAboveMa5()], telegram=FakeTelegram()
+    )
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker = asyncio.create_task(tick())
+    signals = await service.generate_signals("20241231")
+    ticker.cancel()
+
+    assert [s.code for s in signals] == ["000000"]
+    # 加载日历期间事件循环仍在调度其他任务
+    assert ticks >= 10
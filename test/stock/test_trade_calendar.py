@@ -0,0 +1,127 @@
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import arrow
+import pandas as pd
+import pytest
+from sqlalchemy.orm import Session
+
+from app.core.singleton import Singleton
+from app.stock import trade_calendar
+from app.stock.datastore import StockDatastore
+from app.stock.trade_calendar import TradeCalendar
+
+
+@pytest.fixture(name="calendar")
+def calendar_fixture() -> TradeCalendar:
+    # 2024-12-30(周一) ~ 2025-01-10(周五)，元旦休市
+    days = pd.bdate_range("2024-12-30", "2025-01-10").drop(pd.Timestamp("2025-01-01"))
+    return TradeCalendar.from_days(days.date)
+
+
+def test_is_trade_day(calendar: TradeCalendar):
+    assert calendar.is_trade_day(date(2024, 12, 31))
+    assert not calendar.is_trade_day(date(2025, 1, 1))
+    assert not calendar.is_trade_day(date(2025, 1, 4))
+    assert calendar.is_trade_day(datetime(2025, 1, 2, 15, 30))
+    assert calendar.is_trade_day(arrow.get("2025-01-03"))
+    assert calendar.is_trade_day("20250106")
+
+
+def test_next_and_previous_trade_day(calendar: TradeCalendar):
+    assert calendar.get_next_trade_day(date(2024, 12, 31)) == date(2025, 1, 2)
+    assert calendar.get_next_trade_day(date(2025, 1, 4)) == date(2025, 1, 6)
+    assert calendar.get_next_trade_day(date(2025, 1, 10)) is None
+    assert calendar.get_previous_trade_day(date(2025, 1, 2)) == date(2024, 12, 31)
+    assert calendar.get_previous_trade_day(date(2025, 1, 5)) == date(2025, 1, 3)
+    assert calendar.get_previous_trade_day(date(2024, 12, 30)) is None
+    assert isinstance(calendar.get_last_trade_day(), date)
+
+
+def test_trade_days_between(calendar: TradeCalendar):
+    assert calendar.trade_days_between(date(2024, 12, 31), date(2025, 1, 3)) == [
+        date(2024, 12, 31),
+        date(2025, 1, 2),
+        date(2025, 1, 3),
+    ]
+    assert calendar.trade_days_between(date(2025, 1, 4), date(2025, 1, 5)) == []
+    assert calendar.count_trade_days(date(2024, 12, 30), date(2025, 1, 10)) == 9
+    assert calendar.count_trade_days(date(2025, 1, 1), date(2025, 1, 1)) == 0
+    assert calendar.count_trade_days(date(2025, 1, 10), date(2024, 12, 30)) == 0
+
+
+def test_offset(calendar: TradeCalendar):
+    assert calendar.offset(date(2024, 12, 31), 0) == date(2024, 12, 31)
+    assert calendar.offset(date(2024, 12, 31), 1) == date(2025, 1, 2)
+    assert calendar.offset(date(2025, 1, 6), -3) == date(2024, 12, 31)
+    assert calendar.offset(date(2025, 1, 1), 1) == date(2025, 1, 2)
+    assert calendar.offset(date(2025, 1, 1), -1) == date(2024, 12, 31)
+    assert calendar.offset(date(2025, 1, 1), 0) is None
+    assert calendar.offset(date(2025, 1, 10), 1) is None
+    assert calendar.offset(date(2024, 12, 30), -1) is None
+
+
+@pytest.fixture(name="snapshot_db")
+def snapshot_db_fixture(memory_session: Session, monkeypatch) -> StockDatastore:
+    """交易日历快照使用内存数据库，禁止访问新浪接口"""
+
+    @contextmanager
+    def get_db():
+        yield memory_session
+
+    def offline():
+        raise ConnectionError("network disabled")
+
+    monkeypatch.setattr(trade_calendar, "get_db", get_db)
+    monkeypatch.setattr(trade_calendar.ak, "tool_trade_date_hist_sina", offline)
+    Singleton._instances.pop(TradeCalendar, None)
+    yield StockDatastore(memory_session)
+    Singleton._instances.pop(TradeCalendar, None)
+
+
+def test_load_from_snapshot(snapshot_db: StockDatastore):
+    snapshot_db.save_trade_days([date(2025, 1, 2), date(2025, 1, 3)])
+    snapshot_db.save_trade_days([date(2025, 1, 3), date(2025, 1, 6)])
+
+    calendar = TradeCalendar()
+
+    assert calendar is TradeCalendar()
+    assert calendar.trade_days == [date(2025, 1, 2), date(2025, 1, 3), date(2025, 1, 6)]
+
+
+def test_fallback_without_snapshot(snapshot_db: StockDatastore):
+    calendar = TradeCalendar()
+
+    assert calendar.is_trade_day(date(2024, 9, 30))
+    # 国庆假期和调休的周日都不是交易日
+    assert not calendar.is_trade_day(date(2024, 10, 1))
+    assert not calendar.is_trade_day(date(2024, 9, 29))
+    assert calendar.get_next_trade_day(date(2024, 9, 30)) == date(2024, 10, 8)
+
+
+def test_refresh_saves_snapshot(snapshot_db: StockDatastore, monkeypatch):
+    sina = pd.DataFrame({"trade_date": [date(2025, 1, 2), date(2025, 1, 3)]})
+    monkeypatch.setattr(
+        trade_calendar.ak, "tool_trade_date_hist_sina", lambda: sina.copy()
+    )
+
+    assert TradeCalendar().refresh() == 2
+    assert snapshot_db.get_trade_days() == [date(2025, 1, 2), date(2025, 1, 3)]
+    assert TradeCalendar().trade_days == [date(2025, 1, 2), date(2025, 1, 3)]
+
+
+def test_expired_snapshot_reloads_in_background(
+    snapshot_db: StockDatastore, monkeypatch
+):
+    snapshot_db.save_trade_days([date(2025, 1, 2)])
+    calendar = TradeCalendar()
+    snapshot_db.save_trade_days([date(2025, 1, 3)])
+    monkeypatch.setattr(trade_calendar.settings, "calendar_ttl", 0)
+
+    # 过期后当前调用不等待重新加载
+    calendar.is_trade_day(date(2025, 1, 3))
+    deadline = time.monotonic() + 5
+    while calendar._reload_lock.locked() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert calendar.trade_days[-1] == date(2025, 1, 3)
@@ -0,0 +1,72 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from app.stock.datastore import INDICATOR_VALUE_COLUMNS
+from app.strategy._strategy import BaseStrategy, cross_down, cross_up, prepare_frame
+from app.strategy.factory import StrategyFactory
+
+
+def _history(codes: int = 50, seed: int = 0) -> pd.DataFrame:
+    """两个交易日的随机截面，列与联表读取的结果一致"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for trade_date in [date(2024, 12, 30), date(2024, 12, 31)]:
+        data = {
+            "code": [f"{i:06d}" for i in range(codes)],
+            "name": "测试",
+            "trade_date": pd.Timestamp(trade_date),
+        }
+        for column in ["open", "high", "low", "close", "volume", "amount"]:
+            data[column] = rng.uniform(1, 100, codes)
+        for column in INDICATOR_VALUE_COLUMNS:
+            data[column.key] = rng.uniform(0, 100, codes)
+        frames.append(pd.DataFrame(data))
+    return pd.concat(frames).sort_values(["code", "trade_date"], ignore_index=True)
+
+
+def test_factory_discovers_strategies():
+    factory = StrategyFactory()
+
+    names = factory.list_strategies()
+
+    assert "StrategyFactory" not in names
+    assert {"MaCrossStrategy", "MacdCrossStrategy", "KdjCrossStrategy"} <= set(names)
+    df = prepare_frame(_history(), date(2024, 12, 31))
+    for name in names:
+        strategy = factory.get_strategy(name)
+        assert isinstance(strategy, BaseStrategy)
+        assert strategy.name
+        for mask in (strategy.buy_signals(df), strategy.sell_signals(df)):
+            mask = np.asarray(mask)
+            assert mask.dtype == bool
+            assert mask.shape == (len(df),)
+
+
+def test_prepare_frame():
+    history = _history(codes=3)
+
+    df = prepare_frame(history, date(2024, 12, 31))
+
+    assert list(df["code"]) == ["000000", "000001", "000002"]
+    previous = history[history["trade_date"] == pd.Timestamp("2024-12-30")]
+    np.testing.assert_array_equal(df["prev_close"], previous["close"])
+    np.testing.assert_array_equal(df["prev_ma5"], previous["ma5"])
+    assert "prev_trade_date" not in df
+    assert prepare_frame(history, date(2025, 1, 2)).empty
+
+
+def test_cross():
+    df = pd.DataFrame(
+        {
+            "ma5": [11.0, 9.0, 11.0, 9.0],
+            "ma20": [10.0, 10.0, 10.0, 10.0],
+            "prev_ma5": [9.0, 11.0, 11.0, np.nan],
+            "prev_ma20": [10.0, 10.0, 10.0, 10.0],
+        }
+    )
+
+    assert cross_up(df, "ma5", "ma20").tolist() == [True, False, False, False]
+    assert cross_down(df, "ma5", "ma20").tolist() == [False, True, False, False]
+    assert cross_up(df, "ma5", 10).tolist() == [True, False, False, False]
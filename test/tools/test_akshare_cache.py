@@ -0,0 +1,204 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from app.config.akshare import settings
+from app.tools.akshare_cache import (
+    AkshareCache,
+    DiskTier,
+    MemoryTier,
+    RedisTier,
+    cache_key,
+    call_arguments,
+    ttl_for,
+)
+
+
+class StubSource:
+    """模拟 akshare 接口，记录调用次数"""
+
+    def __init__(self, latency: float = 0):
+        self.latency = latency
+        self.calls = 0
+
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def stock_lhb_detail_em(self, start_date: str = "20230403", end_date: str = ""):
+        with self._lock:
+            self.calls += 1
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.latency)
+        with self._lock:
+            self.running -= 1
+        if start_date == "bad":
+            raise ConnectionError("timeout")
+        return pd.DataFrame({"代码": ["000001"], "上榜日": [start_date]})
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+
+def test_cache_key_normalizes_arguments():
+    func = StubSource().stock_lhb_detail_em
+
+    positional = cache_key(func, call_arguments(func, ("20240101", "20240131"), {}))
+    keyword = cache_key(
+        func,
+        call_arguments(func, (), {"end_date": "20240131", "start_date": "20240101"}),
+    )
+
+    assert positional == keyword
+    assert positional.startswith("akshare:test.tools.test_akshare_cache.StubSource.")
+    assert positional != cache_key(func, call_arguments(func, ("20240102",), {}))
+
+
+def test_ttl_rules(monkeypatch):
+    monkeypatch.setattr(settings, "cache_ttls", {"stock_lhb_jgstatistic_em": 0})
+
+    assert ttl_for("stock_zh_a_spot_em", {}) == settings.cache_realtime_ttl
+    assert ttl_for("stock_zh_a_hist_min_em", {}) == settings.cache_realtime_ttl
+    assert (
+        ttl_for("stock_lhb_detail_em", {"end_date": "20240131"})
+        == settings.cache_history_ttl
+    )
+    assert ttl_for("stock_lhb_detail_em", {"end_date": "29991231"}) == (
+        settings.cache_ttl
+    )
+    assert ttl_for("stock_lhb_jgstatistic_em", {}) == 0
+
+
+def test_memory_hit_returns_in_milliseconds():
+    source = StubSource(latency=0.2)
+    cache = AkshareCache(MemoryTier(16), None)
+
+    first = cache.call(source.stock_lhb_detail_em, "20240101", "20240131")
+    started = time.perf_counter()
+    second = cache.call(
+        source.stock_lhb_detail_em, start_date="20240101", end_date="20240131"
+    )
+    elapsed = time.perf_counter() - started
+
+    assert second is first
+    assert source.calls == 1
+    assert elapsed < 0.005
+    assert cache.stats.to_dict() == {
+        "memory_hits": 1,
+        "shared_hits": 0,
+        "misses": 1,
+        "coalesced": 0,
+        "errors": 0,
+        "hit_rate": 0.5,
+    }
+
+
+def test_errors_are_not_cached():
+    source = StubSource()
+    cache = AkshareCache(MemoryTier(16), None)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            cache.call(source.stock_lhb_detail_em, "bad", "20240131")
+
+    assert source.calls == 2
+
+
+def test_memory_tier_lru_and_expiry():
+    tier = MemoryTier(2)
+    expires_at = time.time() + 60
+    tier.set("a", 1, expires_at)
+    tier.set("b", 2, expires_at)
+    tier.get("a")
+    tier.set("c", 3, expires_at)
+
+    # 最近访问过的 a 保留，淘汰 b
+    assert tier.get("a") == 1
+    assert tier.get("c") == 3
+    assert tier.get("b") is tier.get("missing")
+
+    tier.set("a", 1, time.time() - 1)
+    assert tier.get("a") is tier.get("missing")
+
+
+@pytest.mark.parametrize("backend", ["disk", "redis"])
+def test_shared_tier_across_processes(tmp_path, backend):
+    shared = DiskTier(str(tmp_path)) if backend == "disk" else RedisTier(FakeRedis())
+    source = StubSource()
+    # 两个缓存实例模拟两个进程，只共享第二层
+    worker = AkshareCache(MemoryTier(16), shared)
+    api = AkshareCache(MemoryTier(16), shared)
+
+    expected = worker.call(source.stock_lhb_detail_em, "20240101", "20240131")
+    result = api.call(source.stock_lhb_detail_em, "20240101", "20240131")
+    api.call(source.stock_lhb_detail_em, "20240101", "20240131")
+
+    pd.testing.assert_frame_equal(result, expected)
+    assert source.calls == 1
+    assert api.stats.shared_hits == 1
+    assert api.stats.memory_hits == 1
+
+
+def test_shared_tier_failure_falls_back_to_source():
+    class BrokenRedis(FakeRedis):
+        def get(self, key):
+            raise ConnectionError("redis down")
+
+    source = StubSource()
+    cache = AkshareCache(MemoryTier(16), RedisTier(BrokenRedis()))
+
+    result = cache.call(source.stock_lhb_detail_em, "20240101", "20240131")
+
+    assert len(result) == 1
+    assert cache.stats.errors == 1
+    assert cache.stats.misses == 1
+
+
+def test_concurrent_identical_calls_share_one_fetch():
+    source = StubSource(latency=0.2)
+    cache = AkshareCache(MemoryTier(16), None)
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        results = list(
+            executor.map(
+                lambda _: cache.call(
+                    source.stock_lhb_detail_em, "20240101", "20240131"
+                ),
+                range(10),
+            )
+        )
+
+    assert source.calls == 1
+    assert all(result is results[0] for result in results)
+    assert cache.stats.misses == 1
+    assert cache.stats.coalesced + cache.stats.memory_hits == 9
+
+
+def test_outbound_requests_are_capped():
+    source = StubSource(latency=0.05)
+    cache = AkshareCache(MemoryTier(16), None, limiter=threading.BoundedSemaphore(2))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(
+            executor.map(
+                lambda day: cache.call(
+                    source.stock_lhb_detail_em, f"202401{day:02d}", "20240131"
+                ),
+                range(1, 9),
+            )
+        )
+
+    assert source.calls == 8
+    assert source.peak == 2
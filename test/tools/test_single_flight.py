@@ -0,0 +1,55 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.tools.single_flight import SingleFlight
+
+
+def test_single_flight_shares_result():
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return object()
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        leader = executor.submit(flight.do, "key", fetch)
+        started.wait()
+        followers = [executor.submit(flight.do, "key", fetch) for _ in range(4)]
+        value, shared = leader.result()
+        results = [future.result() for future in followers]
+
+    assert len(calls) == 1
+    assert not shared
+    assert results == [(value, True)] * 4
+    assert flight.in_flight() == 0
+    # 执行结束后不保留结果
+    flight.do("key", fetch)
+    assert len(calls) == 2
+
+
+def test_single_flight_shares_error_and_separates_keys():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def fail():
+        started.set()
+        time.sleep(0.1)
+        raise ConnectionError("timeout")
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        leader = executor.submit(flight.do, "a", fail)
+        started.wait()
+        follower = executor.submit(flight.do, "a", fail)
+        other = executor.submit(flight.do, "b", lambda: 1)
+        with pytest.raises(ConnectionError):
+            leader.result()
+        with pytest.raises(ConnectionError):
+            follower.result()
+        assert other.result() == (1, False)
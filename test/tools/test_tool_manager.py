@@ -0,0 +1,111 @@
+import asyncio
+import time
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from sqlalchemy import event
+
+from app.chat.stock_workflow import Keywords, StockWorkflow
+from app.config.chat import settings as chat_settings
+
+
+def count_queries(session) -> list[str]:
+    statements = []
+    event.listen(
+        session.get_bind(),
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    return statements
+
+
+def test_get_tools_fetches_configs_in_one_query(tool_manager, memory_session):
+    statements = count_queries(memory_session)
+
+    tools = tool_manager.datastore.get_tools([1, 3, 5, 99])
+
+    assert sorted(tool.id for tool in tools) == [1, 3, 5]
+    assert len(statements) == 1
+    assert tool_manager.datastore.get_tools([]) == []
+
+
+def test_search_batch_sends_one_query(tool_manager, monkeypatch):
+    client = tool_manager._vector_store._store.client
+    requests = []
+    query_batch_points = client.query_batch_points
+    monkeypatch.setattr(
+        client,
+        "query_batch_points",
+        lambda **kwargs: requests.append(kwargs) or query_batch_points(**kwargs),
+    )
+
+    results = tool_manager._vector_store.search_batch(["lhb", "dzjy", "fund"], k=1)
+
+    assert [[doc.metadata["name"] for doc in docs] for docs in results] == [
+        ["stock_lhb_detail_em"],
+        ["stock_dzjy_mrmx"],
+        ["fund_etf_spot_em"],
+    ]
+    assert len(requests) == 1
+    assert tool_manager._vector_store.search_batch([]) == []
+
+
+def test_search_batch_matches_similarity_search(tool_manager):
+    vector_store = tool_manager._vector_store
+
+    [docs] = vector_store.search_batch(["board"], k=2)
+
+    assert docs == vector_store.search("board", k=2)
+    assert docs[0].page_content == "stock_board_industry_name_em"
+    assert docs[0].metadata["_collection_name"] == "tools"
+
+
+def test_search_and_create_tools_deduplicates_in_query_order(
+    tool_manager, memory_session
+):
+    statements = count_queries(memory_session)
+
+    tools = tool_manager.search_and_create_tools(["lhb", "lhb detail", "zh spot"], 1)
+
+    assert [tool.name for tool in tools] == [
+        "stock_lhb_detail_em",
+        "stock_zh_a_spot_em",
+    ]
+    assert len(statements) == 1
+
+
+async def test_question_retrieval_runs_alongside_keyword_generation(
+    tool_manager, make_chat_manager, monkeypatch
+):
+    async def keywords(_):
+        await asyncio.sleep(0.2)
+        return Keywords(keys=["lhb"])
+
+    bound = []
+
+    def get_model(tools=None, schema=None):
+        if schema is not None:
+            return RunnableLambda(keywords)
+        bound.append([tool.name for tool in tools])
+        return RunnableLambda(lambda _: AIMessage(content="done"))
+
+    search = tool_manager.search_tool_ids
+
+    def slow_search(query, top_k=5):
+        time.sleep(0.2)
+        return search(query, 1)
+
+    monkeypatch.setattr(chat_settings, "retrieve_from_question", True)
+    monkeypatch.setattr(StockWorkflow, "_get_model", staticmethod(get_model))
+    monkeypatch.setattr(tool_manager, "search_tool_ids", slow_search)
+    manager = make_chat_manager(FakeListChatModel(responses=[]), tool_manager)
+
+    started = time.perf_counter()
+    await manager.stock_workflow.get_stock_graph().ainvoke(
+        {"messages": [("user", "dzjy")]}
+    )
+
+    # 原问题检索与关键词生成并行，总耗时约为两段 0.2s 而不是三段
+    assert time.perf_counter() - started < 0.55
+    assert bound == [["stock_lhb_detail_em", "stock_dzjy_mrmx"]]